@@ -1,6 +1,7 @@
 import abc
 import os
 import time
+from multiprocessing.pool import ThreadPool
 
 import markupsafe
 import requests
@@ -615,6 +616,35 @@ class BaseStorageAddon(object):
         ]
         return filenode
 
+    def _iter_file_tree(self, user=None, cookie=None, version=None, workers=1):
+        """Yield the metadata of every file in the addon without building the file tree.
+
+        Folders are listed one level at a time, ``workers`` WaterButler requests at once.
+        """
+        if user and not cookie:
+            cookie = user.get_or_create_cookie()
+        # Load the owner up front rather than from each of the pool's threads
+        self.owner
+
+        def list_folder(folder):
+            return self._get_fileobj_child_metadata(folder, user, cookie=cookie, version=version)
+
+        pool = ThreadPool(workers)
+        try:
+            folders = [{'path': '/', 'kind': 'folder', 'name': self.root_node.name}]
+            while folders:
+                listings = pool.imap_unordered(list_folder, folders)
+                folders = []
+                for children in listings:
+                    for child in children:
+                        if child['kind'] == 'file':
+                            yield child
+                        else:
+                            folders.append(child)
+        finally:
+            pool.close()
+            pool.join()
+
 
 class BaseOAuthNodeSettings(BaseNodeSettings):
     # TODO: Validate this field to be sure it matches the provider's short_name
@@ -1,4 +1,6 @@
 import datetime
+import hashlib
+import hmac
 import httplib
 import os
 import uuid
@@ -12,6 +14,7 @@ from flask import request
 import furl
 import jwe
 import jwt
+from django.core import signing
 from django.db import transaction
 
 from addons.base.models import BaseStorageAddon
@@ -34,6 +37,7 @@ from addons.base import signals as file_signals
 from osf.models import (BaseFileNode, TrashedFileNode,
                         OSFUser, AbstractNode,
                         NodeLog, DraftRegistration, MetaSchema)
+from osf.utils.caching import get_cache_version, get_shared_cache
 from website.profile.utils import get_profile_image_url
 from website.project import decorators
 from website.project.decorators import must_be_contributor_or_public, must_be_valid_project
@@ -214,6 +218,46 @@ def check_access(node, auth, action, cas_resp):
     raise HTTPError(httplib.FORBIDDEN if auth.user else httplib.UNAUTHORIZED)
 
 
+def get_auth_decision_key(node, action, auth, cas_resp, cookie):
+    """Return the shared cache key of a ``get_auth`` decision, or None if it can't be cached.
+
+    Keys are an HMAC of everything ``check_access`` depends on, including the node's cache
+    version stamp, which is dropped whenever the node or the contributors of it or any of its
+    ancestors change.
+    """
+    if not settings.WATERBUTLER_AUTH_CACHE_TIMEOUT:
+        return None
+    version = get_cache_version(node)
+    if version is None:
+        return None
+    identity = 'user:{}'.format(auth.user._id) if auth.user else 'cookie:{}'.format(cookie or '')
+    if cas_resp:
+        scopes = ' '.join(sorted(cas_resp.attributes.get('accessTokenScope', [])))
+        identity = '{}:{}:{}'.format(identity, cas_resp.authenticated, scopes)
+    message = u'\n'.join([identity, auth.private_key or '', node._id, version, action])
+    digest = hmac.new(settings.SECRET_KEY, message.encode('utf-8'), hashlib.sha256).hexdigest()
+    return 'waterbutler_auth:{}'.format(digest)
+
+
+def get_auth_decision(key):
+    """Return the id of the user granted access under ``key``, wrapped in a dict, or None on a miss."""
+    if key is None:
+        return None
+    cached = get_shared_cache().get(key)
+    if cached is None:
+        return None
+    try:
+        return signing.loads(cached, salt=key, max_age=settings.WATERBUTLER_AUTH_CACHE_TIMEOUT)
+    except signing.BadSignature:
+        return None
+
+
+def set_auth_decision(key, user):
+    if key is not None:
+        value = signing.dumps({'user': user._id if user else None}, salt=key)
+        get_shared_cache().set(key, value, settings.WATERBUTLER_AUTH_CACHE_TIMEOUT)
+
+
 def make_auth(user):
     if user is not None:
         return {
@@ -231,10 +275,9 @@ def get_auth(auth, **kwargs):
         # Central Authentication Server OAuth Bearer Token
         authorization = request.headers.get('Authorization')
         if authorization and authorization.startswith('Bearer '):
-            client = cas.get_client()
             try:
                 access_token = cas.parse_auth_header(authorization)
-                cas_resp = client.profile(access_token)
+                cas_resp = cas.get_profile(access_token)
             except cas.CasError as err:
                 sentry.log_exception()
                 # NOTE: We assume that the request is an AJAX request
@@ -253,9 +296,6 @@ def get_auth(auth, **kwargs):
         sentry.log_message(str(err))
         raise HTTPError(httplib.FORBIDDEN)
 
-    if not auth.user:
-        auth.user = OSFUser.from_cookie(data.get('cookie', ''))
-
     try:
         action = data['action']
         node_id = data['nid']
@@ -267,7 +307,18 @@ def get_auth(auth, **kwargs):
     if not node:
         raise HTTPError(httplib.NOT_FOUND)
 
-    check_access(node, auth, action, cas_resp)
+    # Bulk uploads and zip downloads repeat the same request many times over, so
+    # granted decisions are briefly cached
+    cookie = data.get('cookie', '')
+    decision_key = get_auth_decision_key(node, action, auth, cas_resp, cookie)
+    decision = get_auth_decision(decision_key)
+    if decision is None:
+        if not auth.user:
+            auth.user = OSFUser.from_cookie(cookie)
+        check_access(node, auth, action, cas_resp)
+        set_auth_decision(decision_key, auth.user)
+    elif not auth.user and decision['user']:
+        auth.user = OSFUser.load(decision['user'])
 
     provider_settings = node.get_addon(provider_name)
     if not provider_settings:
@@ -251,6 +251,54 @@ class TestOsfstorageFileNode(StorageTestCase):
         child = self.node_settings.get_root().append_folder('Cloud').append_file('Carp')
         assert_equals('/Cloud/Carp', child.materialized_path)
 
+    def test_materialized_path_is_stored(self):
+        child = self.node_settings.get_root().append_folder('Cloud').append_file('Carp')
+        assert_equals('/Cloud/Carp', OsfStorageFileNode.objects.values_list('_materialized_path', flat=True).get(id=child.id))
+        child = OsfStorageFileNode.load(child._id)
+        with mock.patch.object(OsfStorageFileNode, '_compute_materialized_path') as mock_compute:
+            assert_equals('/Cloud/Carp', child.materialized_path)
+        assert_false(mock_compute.called)
+
+    def test_materialized_path_move_folder_updates_descendants(self):
+        root = self.node_settings.get_root()
+        to_move = root.append_folder('Cloud')
+        nested = to_move.append_folder('Nested')
+        child = nested.append_file('Carp')
+
+        to_move.move_under(root.append_folder('Sky'), name='Fog')
+
+        nested.reload()
+        child.reload()
+        assert_equals('/Sky/Fog/', to_move.materialized_path)
+        assert_equals('/Sky/Fog/Nested/', nested.materialized_path)
+        assert_equals('/Sky/Fog/Nested/Carp', child.materialized_path)
+
+    def test_materialized_path_stale_child_saved_after_move(self):
+        root = self.node_settings.get_root()
+        to_move = root.append_folder('Cloud')
+        nested = to_move.append_folder('Nested')
+        child = nested.append_file('Carp')
+        stale_child = OsfStorageFileNode.load(child._id)
+        stale_child.parent.materialized_path  # parent loaded with its old path
+
+        to_move.move_under(root.append_folder('Sky'), name='Fog')
+
+        stale_child.name = 'Koi'
+        stale_child.save()
+        assert_equals('/Sky/Fog/Nested/Koi', stale_child.materialized_path)
+        assert_equals('/Sky/Fog/Nested/Koi', OsfStorageFileNode.objects.values_list('_materialized_path', flat=True).get(id=child.id))
+
+    def test_materialized_path_copy(self):
+        to_copy = self.node_settings.get_root().append_folder('Cloud')
+        to_copy.append_file('Carp')
+        copy_to = self.node_settings.get_root().append_folder('Sky')
+
+        copied = to_copy.copy_under(copy_to)
+
+        assert_equals('/Sky/Cloud/', copied.materialized_path)
+        assert_equals('/Sky/Cloud/Carp', copied.children.get().materialized_path)
+        assert_equals('/Cloud/Carp', to_copy.children.get().materialized_path)
+
     def test_copy(self):
         to_copy = self.node_settings.get_root().append_file('Carp')
         copy_to = self.node_settings.get_root().append_folder('Cloud')
@@ -106,6 +106,52 @@ class TestGetMetadataHook(HookTestCase):
         assert_equal(res_date_created, expected_date_created)
         assert_equal(res_data, expected_data)
 
+    def test_children_metadata_paginated(self):
+        root = self.node_settings.get_root()
+        children = sorted([root.append_file('file-{}'.format(i)) for i in range(3)], key=lambda child: child._id)
+
+        res = self.send_hook('osfstorage_get_children', {'fid': root._id}, {'limit': 2})
+        assert_equal([child['id'] for child in res.json['data']], [child._id for child in children[:2]])
+        assert_equal(res.json['next'], children[1]._id)
+
+        res = self.send_hook('osfstorage_get_children', {'fid': root._id}, {'limit': 2, 'after': res.json['next']})
+        assert_equal([child['id'] for child in res.json['data']], [children[2]._id])
+        assert_is_none(res.json['next'])
+
+    def test_children_metadata_invalid_limit(self):
+        root = self.node_settings.get_root()
+        for limit in (0, 'many'):
+            res = self.send_hook('osfstorage_get_children', {'fid': root._id}, {'limit': limit}, expect_errors=True)
+            assert_equal(res.status_code, 400)
+
+    def test_children_metadata_download_count(self):
+        record = recursively_create_file(self.node_settings, 'downloaded.txt')
+        record.versions.add(factories.FileVersionFactory())
+        res = self.send_hook('osfstorage_get_children', {'fid': record.parent._id}, {})
+        assert_equal(res.json[0]['downloads'], 0)
+
+        for count in (1, 2):
+            self.send_hook('osfstorage_download', {'fid': record._id}, {})
+            record.refresh_from_db()
+            assert_equal(record.download_count, count)
+            res = self.send_hook('osfstorage_get_children', {'fid': record.parent._id}, {})
+            assert_equal(res.json[0]['downloads'], count)
+
+    def test_version_fields(self):
+        record = recursively_create_file(self.node_settings, 'versioned.txt')
+        first, second = factories.FileVersionFactory(), factories.FileVersionFactory()
+        record.versions.add(first)
+        record.versions.add(second)
+        record.refresh_from_db()
+        assert_equal(record.latest_version, second)
+        assert_equal(record.earliest_version, first)
+        assert_equal(record.version_count, 2)
+
+        record.versions.remove(second)
+        record.refresh_from_db()
+        assert_equal(record.latest_version, first)
+        assert_equal(record.version_count, 1)
+
     def test_osf_storage_root(self):
         auth = Auth(self.project.creator)
         result = osf_storage_root(self.node_settings.config, self.node_settings, auth)
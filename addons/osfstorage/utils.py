@@ -6,7 +6,11 @@ import httplib
 import logging
 import functools
 
+from django.db.models import Subquery
+from django.db.models.functions import Coalesce
+
 from osf.exceptions import ValidationValueError
+from osf.models import BaseFileNode, PageCounter
 from framework.exceptions import HTTPError
 from framework.analytics import update_counter
 
@@ -31,9 +35,15 @@ def update_analytics(node, file_id, version_idx):
         'contributors': contributors
     }
 
-    update_counter('download:{0}:{1}'.format(node._id, file_id), node_info=node_info)
+    page = 'download:{0}:{1}'.format(node._id, file_id)
+    update_counter(page, node_info=node_info)
     update_counter('download:{0}:{1}:{2}'.format(node._id, file_id, version_idx), node_info=node_info)
 
+    # Copy the new total onto the file so folder listings don't have to look it up
+    BaseFileNode.objects.filter(_id=file_id).update(
+        download_count=Coalesce(Subquery(PageCounter.objects.filter(_id=PageCounter.clean_page(page)).values('total')[:1]), 0)
+    )
+
 
 def serialize_revision(node, record, version, index, anon=False):
     """Serialize revision for use in revisions table.
@@ -163,8 +163,21 @@ def osfstorage_get_metadata(file_node, **kwargs):
 
 @must_be_signed
 @decorators.autoload_filenode(must_be='folder')
-def osfstorage_get_children(file_node, **kwargs):
+def osfstorage_get_children(file_node, payload, **kwargs):
+    """List the children of a folder, ordered by id.
+
+    If the payload includes a ``limit``, at most that many children after the ``after`` id
+    are returned in ``data``, along with the id to pass as ``after`` for the ``next`` page.
+    """
     from django.contrib.contenttypes.models import ContentType
+    try:
+        limit = int(payload['limit']) if payload.get('limit') is not None else None
+    except (TypeError, ValueError):
+        raise HTTPError(httplib.BAD_REQUEST)
+    if limit is not None and limit < 1:
+        raise HTTPError(httplib.BAD_REQUEST)
+    after = payload.get('after')
+
     with connection.cursor() as cursor:
         # Read the documentation on FileVersion's fields before reading this code
         cursor.execute('''
@@ -176,8 +189,8 @@ def osfstorage_get_children(file_node, **kwargs):
                         , 'name', F.name
                         , 'kind', 'file'
                         , 'size', LATEST_VERSION.size
-                        , 'downloads',  COALESCE(DOWNLOAD_COUNT, 0)
-                        , 'version', (SELECT COUNT(*) FROM osf_basefilenode_versions WHERE osf_basefilenode_versions.basefilenode_id = F.id)
+                        , 'downloads', F.download_count
+                        , 'version', F.version_count
                         , 'contentType', LATEST_VERSION.content_type
                         , 'modified', LATEST_VERSION.created
                         , 'created', EARLIEST_VERSION.created
@@ -193,38 +206,38 @@ def osfstorage_get_children(file_node, **kwargs):
                         , 'kind', 'folder'
                     )
                 END
-            )
-            FROM osf_basefilenode AS F
-            LEFT JOIN LATERAL (
-                SELECT * FROM osf_fileversion
-                JOIN osf_basefilenode_versions ON osf_fileversion.id = osf_basefilenode_versions.fileversion_id
-                WHERE osf_basefilenode_versions.basefilenode_id = F.id
-                ORDER BY created DESC
-                LIMIT 1
-            ) LATEST_VERSION ON TRUE
-            LEFT JOIN LATERAL (
-                SELECT * FROM osf_fileversion
-                JOIN osf_basefilenode_versions ON osf_fileversion.id = osf_basefilenode_versions.fileversion_id
-                WHERE osf_basefilenode_versions.basefilenode_id = F.id
-                ORDER BY created ASC
-                LIMIT 1
-            ) EARLIEST_VERSION ON TRUE
+            ORDER BY F._id)
+            FROM (
+                SELECT * FROM osf_basefilenode
+                WHERE parent_id = %(parent_id)s
+                AND (NOT type IN ('osf.trashedfilenode', 'osf.trashedfile', 'osf.trashedfolder'))
+                AND (%(after)s::text IS NULL OR _id > %(after)s::text)
+                ORDER BY _id
+                LIMIT %(limit)s
+            ) AS F
+            LEFT JOIN osf_fileversion AS LATEST_VERSION ON LATEST_VERSION.id = F.latest_version_id
+            LEFT JOIN osf_fileversion AS EARLIEST_VERSION ON EARLIEST_VERSION.id = F.earliest_version_id
             LEFT JOIN LATERAL (
                 SELECT _id from osf_guid
                 WHERE object_id = F.checkout_id
-                AND content_type_id = %s
+                AND content_type_id = %(user_content_type_id)s
                 LIMIT 1
             ) CHECKOUT_GUID ON TRUE
-            LEFT JOIN LATERAL (
-                SELECT P.total AS DOWNLOAD_COUNT FROM osf_pagecounter AS P
-                WHERE P._id = 'download:' || %s || ':' || F._id
-                LIMIT 1
-            ) DOWNLOAD_COUNT ON TRUE
-            WHERE parent_id = %s
-            AND (NOT F.type IN ('osf.trashedfilenode', 'osf.trashedfile', 'osf.trashedfolder'))
-        ''', [ContentType.objects.get_for_model(OSFUser).id, file_node.node._id, file_node.id])
+        ''', {
+            'parent_id': file_node.id,
+            'after': after,
+            'limit': limit,
+            'user_content_type_id': ContentType.objects.get_for_model(OSFUser).id,
+        })
+
+        children = cursor.fetchone()[0] or []
 
-        return cursor.fetchone()[0] or []
+    if limit is None:
+        return children
+    return {
+        'data': children,
+        'next': children[-1]['id'] if len(children) == limit else None,
+    }
 
 
 @must_be_signed
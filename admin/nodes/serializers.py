@@ -1,5 +1,6 @@
 import json
 
+from osf.models import NodeStorageUsage
 from website.util.permissions import reduce_permissions
 
 from admin.users.serializers import serialize_simple_node
@@ -34,7 +35,8 @@ def serialize_node(node):
         'spam_data': json.dumps(node.spam_data, indent=4),
         'is_public': node.is_public,
         'registrations': [serialize_node(registration) for registration in node.registrations.all()],
-        'registered_from': node.registered_from._id if node.registered_from else None
+        'registered_from': node.registered_from._id if node.registered_from else None,
+        'storage_usage': NodeStorageUsage.get_subtree_usage(node),
     }
 
 def serialize_log(log):
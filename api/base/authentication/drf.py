@@ -34,6 +34,22 @@ def get_session_from_cookie(cookie_val):
         return None
 
 
+def get_session_user_id_from_cookie(cookie_val):
+    """
+    Given a cookie value, return the id of the user logged in to its session, or `None`.
+    See `Session.get_user_id`.
+
+    :param cookie_val: the cookie
+    :return: the user's guid or None
+    """
+
+    try:
+        session_id = itsdangerous.Signer(settings.SECRET_KEY).unsign(cookie_val)
+    except itsdangerous.BadSignature:
+        return None
+    return Session.get_user_id(session_id)
+
+
 def check_user(user):
     """
     Verify users' status.
@@ -94,10 +110,9 @@ class OSFSessionAuthentication(authentication.BaseAuthentication):
         cookie_val = request.COOKIES.get(settings.COOKIE_NAME)
         if not cookie_val:
             return None
-        session = get_session_from_cookie(cookie_val)
-        if not session:
+        user_id = get_session_user_id_from_cookie(cookie_val)
+        if not user_id:
             return None
-        user_id = session.data.get('auth_user_id')
         user = OSFUser.load(user_id)
         if user:
             check_user(user)
@@ -187,7 +202,6 @@ class OSFCASAuthentication(authentication.BaseAuthentication):
         :return: the user who owns the bear token and the cas repsonse
         """
 
-        client = cas.get_client()
         try:
             auth_header_field = request.META['HTTP_AUTHORIZATION']
             auth_token = cas.parse_auth_header(auth_header_field)
@@ -195,7 +209,7 @@ class OSFCASAuthentication(authentication.BaseAuthentication):
             return None
 
         try:
-            cas_auth_response = client.profile(auth_token)
+            cas_auth_response = cas.get_profile(auth_token)
         except cas.CasHTTPError:
             raise exceptions.NotAuthenticated(_('User provided an invalid OAuth2 access token'))
 
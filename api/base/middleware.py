@@ -19,6 +19,7 @@ from framework.celery_tasks.handlers import (
 )
 from .api_globals import api_globals
 from api.base import settings as api_settings
+from api.caching.utils import SURROGATE_KEY_HEADER, get_response_surrogate_keys
 
 
 class CeleryTaskMiddleware(object):
@@ -107,6 +108,19 @@ class PostcommitTaskMiddleware(object):
         return response
 
 
+class SurrogateKeyMiddleware(object):
+    """
+    Tag cacheable responses with the surrogate keys of the objects they represent, so Varnish
+    bans sent by api.caching.tasks only evict the affected responses.
+    """
+    def process_response(self, request, response):
+        if settings.ENABLE_VARNISH and request.method in ('GET', 'HEAD') and response.status_code < 400:
+            keys = get_response_surrogate_keys(request)
+            if keys:
+                response[SURROGATE_KEY_HEADER] = ' '.join(sorted(keys))
+        return response
+
+
 # Adapted from http://www.djangosnippets.org/snippets/186/
 # Original author: udfalkso
 # Modified by: Shwagroo Team and Gun.io
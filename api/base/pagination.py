@@ -1,8 +1,12 @@
+import operator
+
 from django.utils import six
 from collections import OrderedDict
 from django.core.urlresolvers import reverse
 from django.core.paginator import InvalidPage, Paginator as DjangoPaginator
-from django.db.models import QuerySet
+from django.db import connection
+from django.db.models import F, QuerySet
+from django.db.models.expressions import OrderBy
 
 from rest_framework import pagination
 from rest_framework.exceptions import NotFound
@@ -14,10 +18,115 @@ from api.base.serializers import is_anonymized
 from api.base.settings import MAX_PAGE_SIZE
 from api.base.utils import absolute_reverse
 
-from osf.models import AbstractNode, Comment, Guid
+from osf.models import AbstractNode, Comment, Contributor, Guid
 from website.search.elastic_search import DOC_TYPE_TO_MODEL
 
 
+class PrefetchedPaginator(DjangoPaginator):
+    """A paginator over an already fetched first page, whose total ``count`` is known."""
+
+    def __init__(self, object_list, per_page, count):
+        super(PrefetchedPaginator, self).__init__(object_list, per_page)
+        self.__dict__['count'] = count
+
+
+def _get_ordering(queryset):
+    """Return `(expression, descending)` for each term of `queryset`'s ordering.
+
+    :raises ValueError: if the ordering can't be expressed with model fields, e.g. random or extra ordering
+    """
+    query = queryset.query
+    if query.extra_order_by:
+        raise ValueError('extra ordering is not supported')
+    ordering = query.order_by or (query.default_ordering and queryset.model._meta.ordering) or []
+    terms = []
+    for term in ordering:
+        if isinstance(term, OrderBy):
+            terms.append((term.expression, term.descending))
+        elif hasattr(term, 'resolve_expression'):
+            terms.append((term, False))
+        elif term == '?' or '.' in term:
+            raise ValueError('Ordering by {} is not supported'.format(term))
+        else:
+            terms.append((F(term.lstrip('-')), term.startswith('-')))
+    return terms
+
+
+def get_first_pages(querysets, page_size, extra_counts=None):
+    """Fetch the first page and total count of every queryset in `querysets` at once.
+
+    Page ids and totals for all of the querysets are read in one query, using window
+    functions for the positions and counts, and the objects themselves in a second query.
+
+    :param list extra_counts: for each queryset, an optional dict of other querysets to count
+        in the same query, by name
+    :return list: `(objects, count, counts)` for each queryset, in order, where `counts` maps
+        the names in `extra_counts` to their counts. `counts` is empty for an empty page.
+    :raises ValueError: if a queryset's ordering is not supported, see `_get_ordering`
+    """
+    if not querysets:
+        return []
+    extra_counts = extra_counts or [None] * len(querysets)
+    branches = []
+    params = []
+    for index, (queryset, counted) in enumerate(zip(querysets, extra_counts)):
+        if hasattr(queryset, 'include'):
+            queryset = queryset.include(None)
+        pk = queryset.model._meta.pk.column
+        ordering = _get_ordering(queryset)
+        aliases = ['_page_order_{}'.format(i) for i in range(len(ordering))]
+        queryset = queryset.annotate(**{alias: expression for alias, (expression, _) in zip(aliases, ordering)})
+        sql, sql_params = queryset.values_list('pk', *aliases).query.sql_with_params()
+        # Positions follow the queryset's ordering, with the primary key breaking ties
+        order_by = ['page."{}"{}'.format(alias, ' DESC' if descending else '') for alias, (_, descending) in zip(aliases, ordering)]
+        order_by.append('page."{}"'.format(pk))
+        # Other counts are read as uncorrelated subqueries, which Postgres runs once per branch
+        count_args = []
+        count_params = []
+        for name, counted_queryset in sorted((counted or {}).items()):
+            if hasattr(counted_queryset, 'include'):
+                counted_queryset = counted_queryset.include(None)
+            count_sql, count_sql_params = counted_queryset.values('pk').query.sql_with_params()
+            count_args.append('%s, (SELECT COUNT(*) FROM ({}) AS counted)'.format(count_sql))
+            count_params.extend([name] + list(count_sql_params))
+        branches.append(
+            '(SELECT %s AS embed_index, page."{pk}" AS pk, ROW_NUMBER() OVER (ORDER BY {order_by}) AS position, '
+            'COUNT(*) OVER () AS total, json_build_object({counts}) AS counts '
+            'FROM ({sql}) AS page ORDER BY position LIMIT %s)'.format(
+                pk=pk, order_by=', '.join(order_by), counts=', '.join(count_args), sql=sql
+            )
+        )
+        params.extend([index] + count_params + list(sql_params) + [page_size])
+    with connection.cursor() as cursor:
+        cursor.execute(' UNION ALL '.join(branches), params)
+        rows = cursor.fetchall()
+
+    page_ids = [[] for _ in querysets]
+    totals = [0] * len(querysets)
+    counts = [{} for _ in querysets]
+    for index, pk, position, total, page_counts in sorted(rows, key=lambda row: (row[0], row[2])):
+        page_ids[index].append(pk)
+        totals[index] = total
+        counts[index] = page_counts
+
+    all_ids = set(pk for ids in page_ids for pk in ids)
+    if all_ids:
+        try:
+            combined = reduce(operator.or_, querysets)
+        except (AssertionError, TypeError):
+            objects = {}
+            for queryset, ids in zip(querysets, page_ids):
+                objects.update((obj.pk, obj) for obj in queryset.filter(pk__in=ids))
+        else:
+            objects = {obj.pk: obj for obj in combined.filter(pk__in=all_ids)}
+    else:
+        objects = {}
+    return [
+        ([objects[pk] for pk in ids if pk in objects], total, page_counts)
+        for ids, total, page_counts in zip(page_ids, totals, counts)
+    ]
+
+
 class JSONAPIPagination(pagination.PageNumberPagination):
     """
     Custom paginator that formats responses in a JSON-API compatible format.
@@ -29,6 +138,9 @@ class JSONAPIPagination(pagination.PageNumberPagination):
     page_size_query_param = 'page[size]'
     max_page_size = MAX_PAGE_SIZE
 
+    # Counts read along with a prefetched page, see `get_page_counts`
+    prefetched_counts = {}
+
     def page_number_query(self, url, page_number):
         """
         Builds uri and adds page param.
@@ -159,6 +271,19 @@ class JSONAPIPagination(pagination.PageNumberPagination):
         else:
             return super(JSONAPIPagination, self).paginate_queryset(queryset, request, view=None)
 
+    def paginate_prefetched(self, objects, count, request, counts=None):
+        """Paginate an embedded resource whose first page was fetched by `get_first_pages`."""
+        self.page = PrefetchedPaginator(objects, self.page_size, count).page(1)
+        self.prefetched_counts = counts or {}
+        self.request = request
+        return list(self.page)
+
+    def get_page_counts(self):
+        """Return querysets whose counts are added to the paginated response, by name.
+        Prefetched pages read these counts in the same query as the page.
+        """
+        return {}
+
 
 class MaxSizePagination(JSONAPIPagination):
     page_size = 1000
@@ -203,14 +328,19 @@ class CommentPagination(JSONAPIPagination):
 
 class NodeContributorPagination(JSONAPIPagination):
 
+    def get_page_counts(self):
+        node_id = self.request.parser_context['kwargs'].get('node_id', None)
+        return {
+            'total_bibliographic': Contributor.objects.filter(node__guids___id=node_id, visible=True),
+        }
+
     def get_paginated_response(self, data):
         """ Add number of bibliographic contributors to links.meta"""
         response = super(NodeContributorPagination, self).get_paginated_response(data)
         response_dict = response.data
-        kwargs = self.request.parser_context['kwargs'].copy()
-        node_id = kwargs.get('node_id', None)
-        node = AbstractNode.load(node_id)
-        total_bibliographic = node.visible_contributors.count()
+        total_bibliographic = self.prefetched_counts.get('total_bibliographic')
+        if total_bibliographic is None:
+            total_bibliographic = self.get_page_counts()['total_bibliographic'].count()
         if self.request.version < '2.1':
             response_dict['links']['meta']['total_bibliographic'] = total_bibliographic
         else:
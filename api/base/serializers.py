@@ -21,6 +21,7 @@ from api.base.exceptions import TargetNotSupportedError
 from api.base.exceptions import RelationshipPostMakesNoChanges
 from api.base.settings import BULK_SETTINGS
 from api.base.utils import absolute_reverse, extend_querystring_params, get_user_auth, extend_querystring_if_key_exists
+from api.caching.utils import add_surrogate_key
 from framework.auth import core as auth_core
 from osf.models import AbstractNode, MaintenanceState
 from website import settings
@@ -1050,6 +1051,9 @@ class JSONAPIListSerializer(ser.ListSerializer):
         if isinstance(data, collections.Mapping):
             errors = data.get('errors', None)
             data = data.get('data', None)
+        if data is not None:
+            data = list(data)
+            self.child.preload(data)
         if enable_esi:
             ret = [
                 self.child.to_esi_representation(item, envelope=None) for item in data
@@ -1173,6 +1177,18 @@ class JSONAPISerializer(BaseAPISerializer):
         kwargs['child'] = cls(*args, **kwargs)
         return JSONAPIListSerializer(*args, **kwargs)
 
+    def preload(self, objs):
+        """Called with every object of a list before any of them is serialized. Override to
+        batch-load per-object data that would otherwise cost a query per object, and call
+        super so requested embeds are resolved for the whole list.
+        """
+        if self.context.get('enable_esi', False):
+            return
+        for embed in self.context.get('embed', {}).values():
+            prefetch = getattr(embed, 'prefetch', None)
+            if prefetch:
+                prefetch(objs)
+
     def invalid_embeds(self, fields, embeds):
         fields_check = fields[:]
         for index, field in enumerate(fields_check):
@@ -1221,6 +1237,8 @@ class JSONAPISerializer(BaseAPISerializer):
             context_envelope = None
         enable_esi = self.context.get('enable_esi', False)
         is_anonymous = is_anonymized(self.context['request'])
+        if settings.ENABLE_VARNISH:
+            add_surrogate_key(self.context['request'], obj)
         to_be_removed = set()
         if is_anonymous and hasattr(self, 'non_anonymized_fields'):
             # Drop any fields that are not specified in the `non_anonymized_fields` variable.
@@ -1,8 +1,9 @@
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 
 from django_bulk_update.helper import bulk_update
 from django.conf import settings as django_settings
 from django.db import transaction
+from django.db.models import QuerySet
 from django.http import JsonResponse
 from rest_framework import generics
 from rest_framework import permissions as drf_permissions
@@ -16,6 +17,7 @@ from api.base import permissions as base_permissions
 from api.base import utils
 from api.base.exceptions import RelationshipPostMakesNoChanges
 from api.base.filters import ListFilterMixin
+from api.base.pagination import JSONAPIPagination, get_first_pages
 from api.base.parsers import JSONAPIRelationshipParser
 from api.base.parsers import JSONAPIRelationshipParserForRegularJSON
 from api.base.requests import EmbeddedRequest
@@ -26,13 +28,13 @@ from api.base.serializers import (
 )
 from api.base.throttling import RootAnonThrottle, UserRateThrottle
 from api.base.utils import is_bulk_request, get_user_auth
-from api.nodes.utils import get_file_object
+from api.nodes.utils import get_file_object, get_permission_resolver
 from api.nodes.permissions import ContributorOrPublic
 from api.nodes.permissions import ContributorOrPublicForRelationshipPointers
 from api.nodes.permissions import ReadOnlyIfRegistration
 from api.users.serializers import UserSerializer
 from framework.auth.oauth_scopes import CoreScopes
-from osf.models import Contributor, MaintenanceState, BaseFileNode
+from osf.models import AbstractNode, Contributor, MaintenanceState, BaseFileNode
 
 
 class JSONAPIBaseView(generics.GenericAPIView):
@@ -47,6 +49,9 @@ class JSONAPIBaseView(generics.GenericAPIView):
         """Create a partial function to fetch the values of an embedded field. A basic
         example is to include a Node's children in a single response.
 
+        The partial's `prefetch` attribute resolves the embeds of a whole page of objects
+        at once, see `JSONAPISerializer.preload`.
+
         :param str field_name: Name of field of the view's serializer_class to load
         results for
         :return function object -> dict:
@@ -54,7 +59,7 @@ class JSONAPIBaseView(generics.GenericAPIView):
         if getattr(field, 'field', None):
             field = field.field
 
-        def partial(item):
+        def get_view(item):
             # resolve must be implemented on the field
             v, view_args, view_kwargs = field.resolve(item, field_name, self.request)
             if not v:
@@ -65,10 +70,6 @@ class JSONAPIBaseView(generics.GenericAPIView):
             else:
                 request = EmbeddedRequest(self.request)
 
-            if not hasattr(request._request._request, '_embed_cache'):
-                request._request._request._embed_cache = {}
-            cache = request._request._request._embed_cache
-
             request.parents.setdefault(type(item), {})[item._id] = item
 
             view_kwargs.update({
@@ -84,6 +85,21 @@ class JSONAPIBaseView(generics.GenericAPIView):
             view.request = request
             view.request.parser_context['kwargs'] = view_kwargs
             view.format_kwarg = view.get_format_suffix(**view_kwargs)
+            return view
+
+        def get_cache():
+            # Embedded requests wrap the original DRF request, which wraps the HttpRequest
+            request = self.request._request if isinstance(self.request, EmbeddedRequest) else self.request
+            if not hasattr(request._request, '_embed_cache'):
+                request._request._embed_cache = {}
+            return request._request._embed_cache
+
+        def get_cache_key(view, item):
+            return (type(view), field_name, view.get_serializer_class(), (type(item), item.id))
+
+        def serialize(view, item, prefetched=None):
+            request = view.request
+            cache = get_cache()
 
             if not isinstance(view, ListModelMixin):
                 try:
@@ -93,7 +109,7 @@ class JSONAPIBaseView(generics.GenericAPIView):
                         ret = view.handle_exception(e).data
                     return ret
 
-            _cache_key = (v.cls, field_name, view.get_serializer_class(), (type(item), item.id))
+            _cache_key = get_cache_key(view, item)
             if _cache_key in cache:
                 # We already have the result for this embed, return it
                 return cache[_cache_key]
@@ -110,10 +126,14 @@ class JSONAPIBaseView(generics.GenericAPIView):
                 if not isinstance(view, ListModelMixin):
                     ret = ser.to_representation(item)
                 else:
-                    queryset = view.filter_queryset(view.get_queryset())
-                    page = view.paginate_queryset(getattr(queryset, '_results_cache', None) or queryset)
+                    if prefetched is not None:
+                        queryset, objects, count, counts = prefetched
+                        page = view.paginator.paginate_prefetched(objects, count, request, counts=counts)
+                    else:
+                        queryset = view.filter_queryset(view.get_queryset())
+                        page = view.paginate_queryset(getattr(queryset, '_results_cache', None) or queryset)
 
-                    ret = ser.to_representation(page or queryset)
+                    ret = ser.to_representation(page if prefetched is not None else (page or queryset))
 
                     if page is not None:
                         request.parser_context['view'] = view
@@ -132,6 +152,64 @@ class JSONAPIBaseView(generics.GenericAPIView):
 
             return ret
 
+        def partial(item):
+            view = get_view(item)
+            if view is None:
+                return None
+            return serialize(view, item)
+
+        def prefetch(items):
+            """Serialize the embedded lists of every object in `items`, reading the first page
+            of all of them with `get_first_pages` instead of paginating each one separately.
+            Objects whose embed can't be prefetched are left for `partial`.
+
+            Permissions on the nodes in `items` are loaded at once, so checking each embedded
+            view's permissions doesn't query per object.
+            """
+            cache = get_cache()
+            get_permission_resolver(self.request).prime([item for item in items if isinstance(item, AbstractNode)])
+            pending = []
+            for item in items:
+                try:
+                    view = get_view(item)
+                    if view is None:
+                        continue
+                    if not isinstance(view, ListModelMixin) or not isinstance(view.paginator, JSONAPIPagination):
+                        # Every item resolves to the same view class, so there is nothing to batch
+                        return
+                    if type(view.paginator).paginate_queryset.__func__ is not JSONAPIPagination.paginate_queryset.__func__:
+                        # Prefetched pages would bypass the paginator's own pagination
+                        return
+                    if get_cache_key(view, item) in cache:
+                        continue
+                    queryset = view.filter_queryset(view.get_queryset())
+                    view.paginator.request = view.request
+                    counts = view.paginator.get_page_counts()
+                except Exception:
+                    # Let partial report the error for this item
+                    continue
+                if not isinstance(queryset, QuerySet) or queryset._result_cache is not None:
+                    continue
+                if not queryset.ordered:
+                    # Pagination requires an order by clause, see JSONAPIPagination.paginate_queryset
+                    queryset = queryset.order_by(queryset.model._meta.pk.name)
+                pending.append((view, item, queryset, counts))
+
+            if len(pending) < 2:
+                return
+            try:
+                pages = get_first_pages(
+                    [pending_queryset for _, _, pending_queryset, _ in pending],
+                    pending[0][0].paginator.page_size,
+                    extra_counts=[pending_counts for _, _, _, pending_counts in pending],
+                )
+            except ValueError:
+                # The ordering can't be reproduced for the page positions; paginate each item instead
+                return
+            for (view, item, queryset, _), (objects, count, counts) in zip(pending, pages):
+                serialize(view, item, prefetched=(queryset, objects, count, counts))
+
+        partial.prefetch = prefetch
         return partial
 
     def get_serializer_context(self):
@@ -886,15 +964,15 @@ class WaterButlerMixin(object):
 
     def bulk_get_file_nodes_from_wb_resp(self, files_list):
         """Takes a list of file data from wb response, touches/updates metadata for each, and returns list of file objects.
-        This function mirrors all the actions of get_file_node_from_wb_resp except the create and updates are done in bulk.
-        The bulk_update and bulk_create do not call the base class update and create so the actions of those functions are
+        This function mirrors all the actions of get_file_node_from_wb_resp except the lookups, creates and updates are
+        done in bulk: one query per file node class to find existing file nodes, one upsert per class to create the
+        missing ones and one update for the rest, whatever the size of the folder.
+        The bulk_update and bulk_upsert do not call the base class update and create so the actions of those functions are
         done here where needed
         """
         node = self.get_node(check_object_permissions=False)
 
-        objs_to_create = defaultdict(lambda: [])
-        file_objs = []
-
+        attrs_by_class = defaultdict(OrderedDict)
         for item in files_list:
             attrs = item['attributes']
             base_class = BaseFileNode.resolve_class(
@@ -902,24 +980,34 @@ class WaterButlerMixin(object):
                 BaseFileNode.FOLDER if attrs['kind'] == 'folder'
                 else BaseFileNode.FILE
             )
+            attrs_by_class[base_class]['/' + attrs['path'].lstrip('/')] = attrs
 
+        file_objs = []
+        objs_to_update = []
+        for base_class, attrs_by_path in attrs_by_class.items():
             # mirrors BaseFileNode get_or_create
-            try:
-                file_obj = base_class.objects.get(node=node, _path='/' + attrs['path'].lstrip('/'))
-            except base_class.DoesNotExist:
-                # create method on BaseFileNode appends provider, bulk_create bypasses this step so it is added here
-                file_obj = base_class(node=node, _path='/' + attrs['path'].lstrip('/'), provider=base_class._provider)
-                objs_to_create[base_class].append(file_obj)
-            else:
-                file_objs.append(file_obj)
+            existing = {
+                file_obj._path: file_obj
+                for file_obj in base_class.objects.filter(node=node, _path__in=list(attrs_by_path))
+            }
+            objs_to_create = []
+            for path, attrs in attrs_by_path.items():
+                file_obj = existing.get(path)
+                if file_obj is None:
+                    # create method on BaseFileNode appends provider, bulk_upsert bypasses this step so it is added here
+                    file_obj = base_class(node=node, _path=path, provider=base_class._provider)
+                    objs_to_create.append(file_obj)
+                else:
+                    # Avoid loading the node again for every file
+                    file_obj.node = node
+                    objs_to_update.append(file_obj)
 
-            file_obj.update(None, attrs, user=self.request.user, save=False)
+                file_obj.update(None, attrs, user=self.request.user, save=False)
+                file_objs.append(file_obj)
 
-        bulk_update(file_objs)
+            base_class.bulk_upsert(objs_to_create)
 
-        for base_class in objs_to_create:
-            base_class.objects.bulk_create(objs_to_create[base_class])
-            file_objs += objs_to_create[base_class]
+        bulk_update(objs_to_update)
 
         return file_objs
 
@@ -60,4 +60,7 @@ Request.__getattribute__ = object.__getattribute__
 init_app(set_backends=True, routes=False, attach_request_handlers=False)
 api_settings.load_origins_whitelist()
 
+from api.citations.utils import warm_style_cache  # noqa
+warm_style_cache()
+
 application = get_wsgi_application()
@@ -1,85 +1,108 @@
+import logging
+import threading
 import urlparse
 
 import requests
-import logging
 
+from framework.celery_tasks import app as celery_app
+from framework.postcommit_tasks.handlers import enqueue_postcommit_task, postcommit_queue
 from website import settings
 
 logger = logging.getLogger(__name__)
 
+_local = threading.local()
+
 
 def get_varnish_servers():
     #  TODO: this should get the varnish servers from HAProxy or a setting
     return settings.VARNISH_SERVERS
 
 
-def get_bannable_urls(instance):
+def get_surrogate_key(obj):
+    """Return the surrogate key tagging API representations of ``obj``, or None."""
+    return getattr(obj, '_id', None)
+
+
+def get_surrogate_keys(instance):
+    """Return the surrogate keys of every cached representation affected by a change to ``instance``."""
     from osf.models import Comment
-    bannable_urls = []
-    parsed_absolute_url = {}
+    keys = [get_surrogate_key(instance)]
+    if isinstance(instance, Comment):
+        # Comment lists are tagged with their target and root target
+        for guid in (instance.target, instance.root_target):
+            if guid is not None:
+                keys.append(guid._id)
+    return {key for key in keys if key}
+
+
+class SurrogateKeySet(set):
+    """Surrogate keys pending a ban for the current request.
+
+    The repr is constant so that ``enqueue_postcommit_task`` dedupes every ``ban_url``
+    call in a request into a single dispatch of the whole set.
+    """
+    def __repr__(self):
+        return '<{}>'.format(type(self).__name__)
 
+
+def pending_surrogate_keys():
+    # Postcommit queues are replaced at the start of every request, so keys are scoped to it
+    queue = postcommit_queue()
+    if getattr(_local, 'queue', None) is not queue:
+        _local.queue = queue
+        _local.keys = SurrogateKeySet()
+    return _local.keys
+
+
+def ban_url(instance):
+    """Ban every cached API representation of ``instance`` once the current request finishes.
+
+    Bans for the whole request are combined and sent by ``ban_surrogate_keys``.
+    """
+    if not settings.ENABLE_VARNISH:
+        return
     if not hasattr(instance, 'absolute_api_v2_url'):
         logger.warning('Tried to ban {}:{} but it didn\'t have a absolute_api_v2_url method'.format(instance.__class__, instance))
-        return [], ''
-
-    for host in get_varnish_servers():
-        # add instance url
-        varnish_parsed_url = urlparse.urlparse(host)
-        parsed_absolute_url = urlparse.urlparse(instance.absolute_api_v2_url)
-        url_string = '{scheme}://{netloc}{path}.*'.format(scheme=varnish_parsed_url.scheme,
-                                                          netloc=varnish_parsed_url.netloc,
-                                                          path=parsed_absolute_url.path)
-        bannable_urls.append(url_string)
-        if isinstance(instance, Comment):
-            try:
-                parsed_target_url = urlparse.urlparse(instance.target.referent.absolute_api_v2_url)
-            except AttributeError:
-                # some referents don't have an absolute_api_v2_url
-                # I'm looking at you NodeWikiPage
-                pass
-            else:
-                url_string = '{scheme}://{netloc}{path}.*'.format(scheme=varnish_parsed_url.scheme,
-                                                                  netloc=varnish_parsed_url.netloc,
-                                                                  path=parsed_target_url.path)
-                bannable_urls.append(url_string)
+        return
+    keys = pending_surrogate_keys()
+    keys.update(get_surrogate_keys(instance))
+    enqueue_postcommit_task(dispatch_bans, (keys, ), {}, celery=False, once_per_request=True)
 
-            try:
-                parsed_root_target_url = urlparse.urlparse(instance.root_target.referent.absolute_api_v2_url)
-            except AttributeError:
-                # some root_targets don't have an absolute_api_v2_url
-                pass
-            else:
-                url_string = '{scheme}://{netloc}{path}.*'.format(scheme=varnish_parsed_url.scheme,
-                                                              netloc=varnish_parsed_url.netloc,
-                                                              path=parsed_root_target_url.path)
-                bannable_urls.append(url_string)
 
-    return bannable_urls, parsed_absolute_url.hostname
+def dispatch_bans(keys):
+    if not keys:
+        return
+    keys = sorted(keys)
+    if settings.USE_CELERY:
+        ban_surrogate_keys.delay(keys)
+    else:
+        ban_surrogate_keys(keys)
 
 
-def ban_url(instance):
-    # TODO: Refactor; Pull url generation into postcommit_task handling so we only ban urls once per request
-    timeout = 0.3  # 300ms timeout for bans
-    if settings.ENABLE_VARNISH:
-        bannable_urls, hostname = get_bannable_urls(instance)
+@celery_app.task(bind=True, max_retries=5, default_retry_delay=10)
+def ban_surrogate_keys(self, keys, servers=None):
+    """Purge every cached response tagged with any of ``keys`` from each Varnish server.
 
-        for url_to_ban in set(bannable_urls):
+    Keys are sent ``VARNISH_BAN_BATCH_SIZE`` at a time in the ``xkey-purge`` header. Servers
+    that fail are retried without resending to the ones that succeeded.
+    """
+    servers = servers or get_varnish_servers()
+    batch_size = settings.VARNISH_BAN_BATCH_SIZE
+    failed = []
+    for server in servers:
+        for i in range(0, len(keys), batch_size):
+            batch = keys[i:i + batch_size]
             try:
-                response = requests.request('BAN', url_to_ban, timeout=timeout, headers=dict(
-                    Host=hostname
-                ))
+                response = requests.request('PURGE', server, timeout=settings.VARNISH_BAN_TIMEOUT, headers={
+                    'Host': urlparse.urlparse(settings.API_DOMAIN).hostname,
+                    'xkey-purge': ' '.join(batch),
+                })
+                response.raise_for_status()
             except Exception as ex:
-                logger.error('Banning {} failed: {}'.format(
-                    url_to_ban,
-                    ex.message
-                ))
-            else:
-                if not response.ok:
-                    logger.error('Banning {} failed: {}'.format(
-                        url_to_ban,
-                        response.text
-                    ))
-                else:
-                    logger.info('Banning {} succeeded'.format(
-                        url_to_ban
-                    ))
+                logger.error('Banning {} keys from {} failed: {}'.format(len(batch), server, ex))
+                failed.append(server)
+                break
+        else:
+            logger.info('Banned {} keys from {}'.format(len(keys), server))
+    if failed and not self.request.called_directly:
+        raise self.retry(kwargs={'keys': keys, 'servers': failed})
@@ -0,0 +1,28 @@
+import re
+
+from api.caching.tasks import get_surrogate_key
+
+SURROGATE_KEY_HEADER = 'xkey'
+
+# The guid or id of the resource that owns a detail or nested list view, e.g. abc12 in /v2/nodes/abc12/children/
+OWNER_ID_RE = re.compile(r'^/v2/[^/]+/(?P<owner_id>[^/]+)/')
+
+
+def add_surrogate_key(request, obj):
+    """Tag the response to ``request`` with the surrogate key of ``obj``."""
+    key = get_surrogate_key(obj)
+    if not key:
+        return
+    # Keys must be stored on the underlying HttpRequest for the middleware to see them
+    request = getattr(request, '_request', request)
+    if not hasattr(request, '_surrogate_keys'):
+        request._surrogate_keys = set()
+    request._surrogate_keys.add(key)
+
+
+def get_response_surrogate_keys(request):
+    keys = set(getattr(request, '_surrogate_keys', ()))
+    match = OWNER_ID_RE.match(request.path)
+    if match:
+        keys.add(match.group('owner_id'))
+    return keys
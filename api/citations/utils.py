@@ -1,6 +1,9 @@
+import logging
 import os
 import re
+import threading
 import httplib as http
+from collections import OrderedDict
 
 from citeproc import CitationStylesStyle, CitationStylesBibliography
 from citeproc import Citation, CitationItem
@@ -10,9 +13,68 @@ from citeproc.source.json import CiteProcJSON
 from framework.exceptions import HTTPError
 from framework.auth import utils
 from osf.models import PreprintService
+from osf.utils.caching import get_cache_version, get_shared_cache
+from website import settings
 from website.citations.utils import datetime_to_csl
 from website.settings import CITATION_STYLES_PATH, BASE_PATH, CUSTOM_CITATIONS
 
+logger = logging.getLogger(__name__)
+
+
+class StyleCache(object):
+    """Thread-safe LRU cache of parsed CSL styles, keyed on style name.
+
+    Each style is stored with a lock, as rendering a bibliography sets the formatter on the
+    shared style tree. At most ``max_size`` styles are kept.
+    """
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, style):
+        """Return ``(parsed_style, lock)`` for ``style``, parsing it if it is not cached.
+
+        :raises: ValueError if the style does not exist
+        """
+        with self._lock:
+            entry = self._entries.pop(style, None)
+            if entry is not None:
+                self._entries[style] = entry
+                return entry
+        entry = (parse_style(style), threading.Lock())
+        with self._lock:
+            entry = self._entries.pop(style, None) or entry
+            self._entries[style] = entry
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def parse_style(style):
+    custom = CUSTOM_CITATIONS.get(style, False)
+    path = os.path.join(BASE_PATH, 'static', custom) if custom else os.path.join(CITATION_STYLES_PATH, style)
+    return CitationStylesStyle(path, validate=False)
+
+
+style_cache = StyleCache(settings.CITATION_STYLE_CACHE_SIZE)
+
+
+def warm_style_cache(styles=None):
+    """Parse the commonly used citation styles ahead of the first request for them."""
+    for style in styles or settings.CITATION_STYLES_PRELOAD:
+        try:
+            style_cache.get(style)
+        except Exception as err:
+            logger.warning('Could not preload citation style {}: {}'.format(style, err))
+
 
 def clean_up_common_errors(cit):
     cit = re.sub(r"\.+", '.', cit)
@@ -70,31 +132,69 @@ def process_name(node, user):
     }
 
 
+def get_citation_cache_key(node, style):
+    """Return the shared cache key of the rendered citation of ``node`` in ``style``.
+
+    The node's version stamp changes when it is saved or its contributors change, and
+    ``last_logged`` when its issued date does. Preprints also key on their own ``modified``.
+    """
+    cit_node = node.node if isinstance(node, PreprintService) else node
+    stamp = '{}:{}'.format(get_cache_version(cit_node), cit_node.last_logged.isoformat() if cit_node.last_logged else '')
+    if isinstance(node, PreprintService):
+        stamp = '{}:{}'.format(stamp, node.modified.isoformat())
+    return 'citation:{}:{}:{}:{}'.format(node._meta.model_name, node.pk, stamp, style)
+
+
 def render_citation(node, style='apa'):
     """Given a node, return a citation"""
-    csl = None
-    if isinstance(node, PreprintService):
-        csl = preprint_csl(node, node.node)
-        data = [csl, ]
-    else:
-        data = [node.csl, ]
+    return render_citations(node, [style])[style]
+
+
+def render_citations(node, styles):
+    """Given a node, return a dict of its citation in each of ``styles``.
+
+    The node's CSL and contributors are read once for all of the styles. Citations are
+    cached in the shared cache for ``settings.CITATION_CACHE_TIMEOUT`` seconds.
+    """
+    cache = get_shared_cache()
+    keys = {}
+    citations = {}
+    if cache is not None and settings.CITATION_CACHE_TIMEOUT:
+        keys = {style: get_citation_cache_key(node, style) for style in styles}
+        cached = cache.get_many(keys.values())
+        citations = {style: cached[key] for style, key in keys.items() if key in cached}
+
+    missing = [style for style in styles if style not in citations]
+    if missing:
+        if isinstance(node, PreprintService):
+            csl = preprint_csl(node, node.node)
+            cit_node = node.node
+        else:
+            csl = node.csl
+            cit_node = node
+        contributors = list(cit_node.visible_contributors)
+        for style in missing:
+            citations[style] = _render_citation(node, cit_node, csl, contributors, style)
+        if keys:
+            cache.set_many({keys[style]: citations[style] for style in missing}, settings.CITATION_CACHE_TIMEOUT)
+    return citations
 
-    bib_source = CiteProcJSON(data)
 
-    custom = CUSTOM_CITATIONS.get(style, False)
-    path = os.path.join(BASE_PATH, 'static', custom) if custom else os.path.join(CITATION_STYLES_PATH, style)
-    bib_style = CitationStylesStyle(path, validate=False)
+def _render_citation(node, cit_node, csl, contributors, style):
+    bib_source = CiteProcJSON([csl, ])
 
-    bibliography = CitationStylesBibliography(bib_style, bib_source, formatter.plain)
+    bib_style, lock = style_cache.get(style)
+    with lock:
+        bibliography = CitationStylesBibliography(bib_style, bib_source, formatter.plain)
 
-    citation = Citation([CitationItem(node._id)])
+        citation = Citation([CitationItem(node._id)])
 
-    bibliography.register(citation)
+        bibliography.register(citation)
 
-    bib = bibliography.bibliography()
+        bib = bibliography.bibliography()
     cit = unicode(bib[0] if len(bib) else '')
 
-    title = csl['title'] if csl else node.csl['title']
+    title = csl['title']
     if cit.count(title) == 1:
         i = cit.index(title)
         prefix = clean_up_common_errors(cit[0:i])
@@ -103,24 +203,19 @@ def render_citation(node, style='apa'):
     elif cit.count(title) == 0:
         cit = clean_up_common_errors(cit)
 
-    if isinstance(node, PreprintService):
-        cit_node = node.node
-    else:
-        cit_node = node
-
     if style == 'apa':
-        cit = apa_reformat(cit_node, cit)
+        cit = apa_reformat(cit_node, cit, contributors)
     if style == 'chicago-author-date':
-        cit = chicago_reformat(cit_node, cit)
+        cit = chicago_reformat(cit_node, cit, contributors)
     if style == 'modern-language-association':
-        cit = mla_reformat(cit_node, cit)
+        cit = mla_reformat(cit_node, cit, contributors)
 
     return cit
 
 
-def apa_reformat(node, cit):
+def apa_reformat(node, cit, contributors=None):
     new_csl = cit.split('(')
-    contributors_list = list(node.visible_contributors)
+    contributors_list = list(node.visible_contributors) if contributors is None else contributors
     contributors_list_length = len(contributors_list)
 
     # throw error if there is no visible contributor
@@ -161,8 +256,8 @@ def apa_name(name):
     return apa
 
 
-def mla_reformat(node, cit):
-    contributors_list = list(node.visible_contributors)
+def mla_reformat(node, cit, contributors=None):
+    contributors_list = list(node.visible_contributors) if contributors is None else contributors
     contributors_list_length = len(contributors_list)
     retrive_from = cit.split('Open')[-1]
 
@@ -193,9 +288,9 @@ def mla_reformat(node, cit):
     return cit
 
 
-def chicago_reformat(node, cit):
+def chicago_reformat(node, cit, contributors=None):
     new_csl = cit.split('20')
-    contributors_list = list(node.visible_contributors)
+    contributors_list = list(node.visible_contributors) if contributors is None else contributors
     contributors_list_length = len(contributors_list)
 
     # throw error if there is no visible contributor
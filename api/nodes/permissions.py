@@ -17,6 +17,7 @@ from website.project.metadata.utils import is_prereg_admin
 from website.util import permissions as osf_permissions
 
 from api.base.utils import get_user_auth, is_deprecated
+from api.nodes.utils import get_permission_resolver
 
 
 class ContributorOrPublic(permissions.BasePermission):
@@ -28,26 +29,24 @@ class ContributorOrPublic(permissions.BasePermission):
         if isinstance(obj, (NodeProvider, PreprintService)):
             obj = obj.node
         assert isinstance(obj, (AbstractNode, NodeRelation)), 'obj must be an Node, NodeProvider, NodeRelation, PreprintService, or AddonSettings; got {}'.format(obj)
-        auth = get_user_auth(request)
+        resolver = get_permission_resolver(request)
         if request.method in permissions.SAFE_METHODS:
-            return obj.is_public or obj.can_view(auth)
+            return obj.is_public or resolver.can_view(obj)
         else:
-            return obj.can_edit(auth)
+            return resolver.can_edit(obj)
 
 
 class IsPublic(permissions.BasePermission):
 
     def has_object_permission(self, request, view, obj):
         assert isinstance(obj, AbstractNode), 'obj must be an Node got {}'.format(obj)
-        auth = get_user_auth(request)
-        return obj.is_public or obj.can_view(auth)
+        return obj.is_public or get_permission_resolver(request).can_view(obj)
 
 
 class IsAdmin(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         assert isinstance(obj, AbstractNode), 'obj must be an Node, got {}'.format(obj)
-        auth = get_user_auth(request)
-        return obj.has_permission(auth.user, osf_permissions.ADMIN)
+        return get_permission_resolver(request).has_permission(obj, osf_permissions.ADMIN)
 
 
 class IsAdminOrReviewer(permissions.BasePermission):
@@ -68,6 +67,8 @@ class AdminOrPublic(permissions.BasePermission):
         assert isinstance(obj, (AbstractNode, OSFUser, Institution, BaseAddonSettings, DraftRegistration, PrivateLink)), 'obj must be an Node, User, Institution, Draft Registration, PrivateLink, or AddonSettings; got {}'.format(obj)
         auth = get_user_auth(request)
         if request.method in permissions.SAFE_METHODS:
+            if isinstance(obj, AbstractNode):
+                return obj.is_public or get_permission_resolver(request).can_view(obj)
             return obj.is_public or obj.can_view(auth)
         else:
             return obj.has_permission(auth.user, osf_permissions.ADMIN)
@@ -104,17 +105,18 @@ class ContributorOrPublicForPointers(permissions.BasePermission):
 
     def has_object_permission(self, request, view, obj):
         assert isinstance(obj, (AbstractNode, NodeRelation)), 'obj must be an Node or NodeRelation, got {}'.format(obj)
-        auth = get_user_auth(request)
         parent_node = AbstractNode.load(request.parser_context['kwargs']['node_id'])
         pointer_node = NodeRelation.load(request.parser_context['kwargs']['node_link_id']).child
+        resolver = get_permission_resolver(request)
+        resolver.prime([parent_node, pointer_node])
         if request.method in permissions.SAFE_METHODS:
-            has_parent_auth = parent_node.can_view(auth)
-            has_pointer_auth = pointer_node.can_view(auth)
+            has_parent_auth = resolver.can_view(parent_node)
+            has_pointer_auth = resolver.can_view(pointer_node)
             public = pointer_node.is_public
             has_auth = public or (has_parent_auth and has_pointer_auth)
             return has_auth
         else:
-            has_auth = parent_node.can_edit(auth)
+            has_auth = resolver.can_edit(parent_node)
             return has_auth
 
 
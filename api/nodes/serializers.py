@@ -13,6 +13,7 @@ from api.base.serializers import (VersionedDateTimeField, HideIfRegistration, ID
 from api.base.settings import ADDONS_FOLDER_CONFIGURABLE
 from api.base.utils import (absolute_reverse, get_object_or_error,
                             get_user_auth, is_truthy)
+from api.nodes.utils import get_permission_resolver
 from django.apps import apps
 from django.conf import settings
 from django.core.exceptions import ValidationError
@@ -78,6 +79,28 @@ class NodeCitationSerializer(JSONAPISerializer):
     class Meta:
         type_ = 'node-citation'
 
+class NodeStorageSerializer(JSONAPISerializer):
+    id = IDField(read_only=True)
+    file_count = ser.IntegerField(read_only=True)
+    version_count = ser.IntegerField(read_only=True)
+    live_bytes = ser.IntegerField(read_only=True)
+    trashed_bytes = ser.IntegerField(read_only=True)
+    total = ser.DictField(read_only=True)
+
+    links = LinksField({'self': 'get_absolute_url'})
+
+    def get_absolute_url(self, obj):
+        return absolute_reverse(
+            'nodes:node-storage',
+            kwargs={
+                'node_id': obj['id'],
+                'version': self.context['request'].parser_context['kwargs']['version']
+            }
+        )
+
+    class Meta:
+        type_ = 'node-storage'
+
 class NodeCitationStyleSerializer(JSONAPISerializer):
 
     id = ser.CharField(read_only=True)
@@ -321,19 +344,21 @@ class NodeSerializer(JSONAPISerializer):
         related_view_kwargs={'node_id': '<_id>'}
     ))
 
+    def preload(self, objs):
+        get_permission_resolver(self.context['request']).prime(objs)
+        super(NodeSerializer, self).preload(objs)
+
     def get_current_user_permissions(self, obj):
         user = self.context['request'].user
         if user.is_anonymous:
             return ['read']
-        permissions = obj.get_permissions(user=user)
+        permissions = get_permission_resolver(self.context['request']).get_permissions(obj)
         if not permissions:
             permissions = ['read']
         return permissions
 
     def get_current_user_can_comment(self, obj):
-        user = self.context['request'].user
-        auth = Auth(user if not user.is_anonymous else None)
-        return obj.can_comment(auth)
+        return get_permission_resolver(self.context['request']).can_comment(obj)
 
     class Meta:
         type_ = 'nodes'
@@ -351,15 +376,11 @@ class NodeSerializer(JSONAPISerializer):
         user_id = getattr(auth.user, 'id', None)
         with connection.cursor() as cursor:
             cursor.execute('''
-                WITH RECURSIVE parents AS (
-                  SELECT parent_id, child_id
-                  FROM osf_noderelation
-                  WHERE child_id = %s AND is_node_link IS FALSE
-                UNION ALL
-                  SELECT osf_noderelation.parent_id, parents.parent_id AS child_id
-                  FROM parents JOIN osf_noderelation ON parents.PARENT_ID = osf_noderelation.child_id
-                  WHERE osf_noderelation.is_node_link IS FALSE
-                ), has_admin AS (SELECT * FROM osf_contributor WHERE (node_id IN (SELECT parent_id FROM parents) OR node_id = %s) AND user_id = %s AND admin IS TRUE LIMIT 1)
+                WITH has_admin AS (
+                  SELECT * FROM osf_contributor
+                  WHERE (node_id IN (SELECT ancestor_id FROM osf_nodeclosure WHERE descendant_id = %s) OR node_id = %s)
+                  AND user_id = %s AND admin IS TRUE LIMIT 1
+                )
                 SELECT DISTINCT
                   COUNT(child_id)
                 FROM
@@ -384,28 +405,25 @@ class NodeSerializer(JSONAPISerializer):
         return len(obj.contributors)
 
     def get_registration_count(self, obj):
-        auth = get_user_auth(self.context['request'])
-        registrations = [node for node in obj.registrations_all if node.can_view(auth)]
-        return len(registrations)
+        resolver = get_permission_resolver(self.context['request'])
+        registrations = list(obj.registrations_all)
+        resolver.prime(registrations)
+        return len([node for node in registrations if resolver.can_view(node)])
 
     def get_pointers_count(self, obj):
         return obj.linked_nodes.count()
 
     def get_node_links_count(self, obj):
-        count = 0
-        auth = get_user_auth(self.context['request'])
-        for pointer in obj.linked_nodes.filter(is_deleted=False).exclude(type='osf.collection').exclude(type='osf.registration'):
-            if pointer.can_view(auth):
-                count += 1
-        return count
+        resolver = get_permission_resolver(self.context['request'])
+        pointers = list(obj.linked_nodes.filter(is_deleted=False).exclude(type='osf.collection').exclude(type='osf.registration'))
+        resolver.prime(pointers)
+        return len([pointer for pointer in pointers if resolver.can_view(pointer)])
 
     def get_registration_links_count(self, obj):
-        count = 0
-        auth = get_user_auth(self.context['request'])
-        for pointer in obj.linked_nodes.filter(is_deleted=False, type='osf.registration').exclude(type='osf.collection'):
-            if pointer.can_view(auth):
-                count += 1
-        return count
+        resolver = get_permission_resolver(self.context['request'])
+        pointers = list(obj.linked_nodes.filter(is_deleted=False, type='osf.registration').exclude(type='osf.collection'))
+        resolver.prime(pointers)
+        return len([pointer for pointer in pointers if resolver.can_view(pointer)])
 
     def get_unread_comments_count(self, obj):
         user = get_user_auth(self.context['request']).user
@@ -1,4 +1,5 @@
 import re
+from collections import OrderedDict
 
 from django.apps import apps
 from django.db.models import Q, OuterRef, Exists
@@ -50,7 +51,7 @@ from api.base.views import (
     WaterButlerMixin
 )
 from api.caching.tasks import ban_url
-from api.citations.utils import render_citation
+from api.citations.utils import render_citation, render_citations, style_cache
 from api.comments.permissions import CanCommentOrPublic
 from api.comments.serializers import (CommentCreateSerializer,
                                       NodeCommentSerializer)
@@ -90,22 +91,24 @@ from api.nodes.serializers import (
     NodeViewOnlyLinkSerializer,
     NodeViewOnlyLinkUpdateSerializer,
     NodeCitationSerializer,
-    NodeCitationStyleSerializer
+    NodeCitationStyleSerializer,
+    NodeStorageSerializer,
 )
+from api.nodes.utils import get_permission_resolver
 from api.preprints.serializers import PreprintSerializer
 from api.registrations.serializers import RegistrationSerializer
 from api.users.views import UserMixin
 from api.wikis.serializers import NodeWikiSerializer
 from framework.auth.oauth_scopes import CoreScopes
-from framework.postcommit_tasks.handlers import enqueue_postcommit_task
 from osf.models import AbstractNode
 from osf.models import (Node, PrivateLink, Institution, Comment, DraftRegistration,)
 from osf.models import OSFUser
 from osf.models import NodeRelation, Guid
-from osf.models import BaseFileNode
+from osf.models import BaseFileNode, NodeStorageUsage
 from osf.models.files import File, Folder
 from addons.wiki.models import NodeWikiPage
 from website import mails
+from website import settings as website_settings
 from website.exceptions import NodeStateError
 from website.util.permissions import ADMIN, PERMISSIONS
 
@@ -294,8 +297,10 @@ class NodeList(JSONAPIBaseView, bulk_views.BulkUpdateJSONAPIView, bulk_views.Bul
                 has_permission = nodes.filter(contributor__user_id=auth.user.id, contributor__write=True).values_list('guids___id', flat=True)
                 return Node.objects.filter(guids___id__in=has_permission)
 
+            resolver = get_permission_resolver(self.request)
+            resolver.prime(nodes)
             for node in nodes:
-                if not node.can_edit(auth):
+                if not resolver.can_edit(node):
                     raise PermissionDenied
             return nodes
         else:
@@ -324,9 +329,11 @@ class NodeList(JSONAPIBaseView, bulk_views.BulkUpdateJSONAPIView, bulk_views.Bul
     # overrides BulkDestroyJSONAPIView
     def allow_bulk_destroy_resources(self, user, resource_list):
         """User must have admin permissions to delete nodes."""
+        resolver = get_permission_resolver(self.request)
+        resolver.prime(resource_list)
         if is_truthy(self.request.query_params.get('skip_uneditable', False)):
-            return any([node.has_permission(user, ADMIN) for node in resource_list])
-        return all([node.has_permission(user, ADMIN) for node in resource_list])
+            return any([resolver.has_permission(node, ADMIN) for node in resource_list])
+        return all([resolver.has_permission(node, ADMIN) for node in resource_list])
 
     def bulk_destroy_skip_uneditable(self, resource_object_list, user, object_type):
         """
@@ -339,8 +346,10 @@ class NodeList(JSONAPIBaseView, bulk_views.BulkUpdateJSONAPIView, bulk_views.Bul
         if not is_truthy(self.request.query_params.get('skip_uneditable', False)):
             return None
 
+        resolver = get_permission_resolver(self.request)
+        resolver.prime(resource_object_list)
         for resource in resource_object_list:
-            if resource.has_permission(user, ADMIN):
+            if resolver.has_permission(resource, ADMIN):
                 allowed.append(resource)
             else:
                 skipped.append({'id': resource._id, 'type': object_type})
@@ -1339,6 +1348,61 @@ class NodeCitationStyleDetail(JSONAPIBaseView, generics.RetrieveAPIView, NodeMix
         return {'citation': citation, 'id': style}
 
 
+class NodeCitationStyleList(JSONAPIBaseView, generics.ListAPIView, NodeMixin):
+    """ The node citation for a node in each of several styles' formats *read only*
+
+        ##Note
+        **This API endpoint is under active development, and is subject to change in the future**
+
+    ##NodeCitationStyleList Attributes
+
+        name                     type                description
+        =================================================================================
+        citation                string               complete citation for a node in the given style
+
+    ##Query Params
+
+    + `styles=<Str>` -- comma-separated ids of the styles to render, e.g. `apa,modern-language-association`
+
+    """
+    permission_classes = (
+        drf_permissions.IsAuthenticatedOrReadOnly,
+        base_permissions.TokenHasScope,
+    )
+
+    required_read_scopes = [CoreScopes.NODE_CITATIONS_READ]
+    required_write_scopes = [CoreScopes.NULL]
+
+    serializer_class = NodeCitationStyleSerializer
+    view_category = 'nodes'
+    view_name = 'node-citation-styles'
+
+    def get_queryset(self):
+        node = self.get_node()
+        auth = get_user_auth(self.request)
+        if not node.is_public and not node.can_view(auth):
+            raise PermissionDenied if auth.user else NotAuthenticated
+
+        styles = [style for style in self.request.query_params.get('styles', '').split(',') if style]
+        if not styles:
+            raise ValidationError('The styles query parameter is required.')
+        if len(styles) > website_settings.MAX_CITATION_STYLES_PER_REQUEST:
+            raise ValidationError('At most {} styles may be requested at once.'.format(website_settings.MAX_CITATION_STYLES_PER_REQUEST))
+        styles = list(OrderedDict.fromkeys(styles))
+        for style in styles:
+            # Style ids are limited as in the node-citation route, so they can't name other files
+            if not re.match(r'^[-\w]+$', style):
+                raise NotFound('{} is not a known style.'.format(style))
+            try:
+                style_cache.get(style)
+            except ValueError:  # style requested could not be found
+                raise NotFound('{} is not a known style.'.format(style))
+
+        citations = render_citations(node=node, styles=styles)
+
+        return [{'citation': citations[style], 'id': style} for style in styles]
+
+
 # TODO: Make NodeLinks filterable. They currently aren't filterable because we have can't
 # currently query on a Pointer's node's attributes.
 # e.g. Pointer.find(MQ('node.title', 'eq', ...)) doesn't work
@@ -2393,6 +2457,44 @@ class NodeProviderDetail(JSONAPIBaseView, generics.RetrieveAPIView, NodeMixin):
         return NodeProvider(self.kwargs['provider'], self.get_node())
 
 
+class NodeStorageDetail(JSONAPIBaseView, generics.RetrieveAPIView, NodeMixin):
+    """OSF Storage usage of this node *read only*
+
+    ##NodeStorageDetail Attributes
+
+        name           type      description
+        =================================================================================
+        id             string    id of the node
+        file_count     integer   number of live files in the node's OSF Storage
+        version_count  integer   number of versions of those files
+        live_bytes     integer   total size of those versions, in bytes
+        trashed_bytes  integer   total size of the versions of deleted files, in bytes
+        total          object    the same counts for the node and all of its components you can view
+    """
+    permission_classes = (
+        drf_permissions.IsAuthenticatedOrReadOnly,
+        ContributorOrPublic,
+        ExcludeWithdrawals,
+        base_permissions.TokenHasScope,
+    )
+
+    required_read_scopes = [CoreScopes.NODE_FILE_READ]
+    required_write_scopes = [CoreScopes.NULL]
+
+    serializer_class = NodeStorageSerializer
+    view_category = 'nodes'
+    view_name = 'node-storage'
+
+    def get_object(self):
+        node = self.get_node()
+        usage = NodeStorageUsage.objects.filter(node=node).values(
+            'file_count', 'version_count', 'live_bytes', 'trashed_bytes'
+        ).first() or {'file_count': 0, 'version_count': 0, 'live_bytes': 0, 'trashed_bytes': 0}
+        auth = get_user_auth(self.request)
+        components = AbstractNode.objects.get_children(node, active=True).can_view(user=auth.user, private_link=auth.private_link)
+        return dict(usage, id=node._id, total=NodeStorageUsage.get_subtree_usage(node, components=components))
+
+
 class NodeLogList(JSONAPIBaseView, generics.ListAPIView, NodeMixin, ListFilterMixin):
     """List of Logs associated with a given Node. *Read-only*.
 
@@ -3331,7 +3433,7 @@ class NodeViewOnlyLinkDetail(JSONAPIBaseView, generics.RetrieveUpdateDestroyAPIV
         assert isinstance(link, PrivateLink), 'link must be a PrivateLink'
         link.is_deleted = True
         link.save()
-        enqueue_postcommit_task(ban_url, (self.get_node(),), {}, celery=True, once_per_request=True)
+        ban_url(self.get_node())
 
 
 class NodeIdentifierList(NodeMixin, IdentifierList):
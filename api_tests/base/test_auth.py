@@ -2,12 +2,15 @@
 Tests related to authenticating API requests
 """
 
+import itsdangerous
 import mock
 
 import pytest
 from nose.tools import *  # flake8: noqa
 
 from framework.auth import cas, core, oauth_scopes
+from osf.models import Session
+from website import settings
 from website.util import api_v2_url
 from addons.twofactor.tests import _valid_code
 from website.settings import API_DOMAIN
@@ -228,6 +231,57 @@ class TestOAuthValidation(ApiTestCase):
         assert_equal(res.status_code, 403, msg=res.json)
 
 
+class TestCachedAuthentication(ApiTestCase):
+    """Bearer token profiles and session users are cached when the shared cache is enabled"""
+
+    def setUp(self):
+        super(TestCachedAuthentication, self).setUp()
+        from django.core.cache import caches
+        self.cache = caches['default']
+        self.cache.clear()
+        self.backend_patcher = mock.patch.object(settings, 'CACHED_PROPERTY_BACKEND', 'default')
+        self.backend_patcher.start()
+        self.user = AuthUserFactory()
+        self.project = ProjectFactory(creator=self.user)
+        self.url = '/{}nodes/{}/'.format(API_BASE, self.project._id)
+
+    def tearDown(self):
+        self.backend_patcher.stop()
+        self.cache.clear()
+        super(TestCachedAuthentication, self).tearDown()
+
+    @mock.patch('framework.auth.cas.CasClient.profile')
+    def test_token_profile_is_cached_until_invalidated(self, mock_user_info):
+        mock_user_info.return_value = cas.CasResponse(
+            authenticated=True, user=self.user._id,
+            attributes={'accessTokenScope': ['osf.full_read']}
+        )
+        for _ in range(2):
+            res = self.app.get(self.url, auth='some_valid_token', auth_type='jwt')
+            assert_equal(res.status_code, 200)
+        assert_equal(mock_user_info.call_count, 1)
+
+        cas.invalidate_profiles()
+        self.app.get(self.url, auth='some_valid_token', auth_type='jwt')
+        assert_equal(mock_user_info.call_count, 2)
+
+    def test_session_user_is_cached_until_session_is_removed(self):
+        session = Session(data={'auth_user_id': self.user._id})
+        session.save()
+        cookie = itsdangerous.Signer(settings.SECRET_KEY).sign(session._id)
+        self.app.set_cookie(settings.COOKIE_NAME, str(cookie))
+
+        with mock.patch.object(Session, 'load', wraps=Session.load) as mock_load:
+            for _ in range(2):
+                res = self.app.get(self.url)
+                assert_equal(res.status_code, 200)
+        assert_equal(mock_load.call_count, 1)
+
+        session.delete()
+        res = self.app.get(self.url, expect_errors=True)
+        assert_equal(res.status_code, 401)
+
+
 class TestOAuthScopedAccess(ApiTestCase):
     """Verify that OAuth2 scopes restrict APIv2 access for a few sample views. These tests cover basic mechanics,
         but are not intended to be an exhaustive list of how all views respond to all scopes."""
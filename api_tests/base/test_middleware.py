@@ -11,7 +11,8 @@ from django.test.utils import override_settings
 
 from website.util import api_v2_url
 from api.base import settings
-from api.base.middleware import CorsMiddleware
+from api.base.middleware import CorsMiddleware, SurrogateKeyMiddleware
+from api.caching.utils import add_surrogate_key
 from tests.base import ApiTestCase
 from osf_tests import factories
 
@@ -115,3 +116,24 @@ class TestCorsMiddleware(MiddlewareTestCase):
         self.middleware.process_request(request)
         processed = self.middleware.process_response(request, response)
         assert_equal(response['Access-Control-Allow-Origin'], domain.geturl())
+
+
+class TestSurrogateKeyMiddleware(MiddlewareTestCase):
+    MIDDLEWARE = SurrogateKeyMiddleware
+
+    @override_settings(ENABLE_VARNISH=True)
+    def test_response_tagged_with_serialized_objects_and_owner(self):
+        project = factories.ProjectFactory(is_public=True)
+        component = factories.NodeFactory(parent=project, is_public=True)
+        request = self.request_factory.get('/v2/nodes/{}/children/'.format(project._id))
+        add_surrogate_key(request, component)
+        response = HttpResponse()
+        self.middleware.process_response(request, response)
+        assert_equal(set(response['xkey'].split(' ')), {project._id, component._id})
+
+    @override_settings(ENABLE_VARNISH=False)
+    def test_response_not_tagged_without_varnish(self):
+        request = self.request_factory.get('/v2/nodes/abc12/')
+        response = HttpResponse()
+        self.middleware.process_response(request, response)
+        assert_not_in('xkey', response)
@@ -5,7 +5,7 @@ from osf_tests import factories
 from tests.base import ApiTestCase
 
 from api.base import settings
-from api.base.pagination import MaxSizePagination
+from api.base.pagination import MaxSizePagination, get_first_pages
 
 
 class TestMaxPagination(ApiTestCase):
@@ -54,3 +54,61 @@ class TestJSONAPIPagination(ApiTestCase):
         assert_not_in('meta', links)
         assert_in('total', meta)
         assert_in('per_page', meta)
+
+
+class TestGetFirstPages(ApiTestCase):
+
+    def test_pages_and_counts_for_each_queryset(self):
+        user = factories.AuthUserFactory()
+        first = factories.ProjectFactory(creator=user)
+        second = factories.ProjectFactory(creator=user)
+        for i in range(3):
+            first.add_contributor(factories.UserFactory(), save=True)
+
+        querysets = [
+            first.contributor_set.order_by('-_order'),
+            second.contributor_set.order_by('-_order'),
+            first.contributor_set.filter(pk=-1).order_by('pk'),
+        ]
+        pages = get_first_pages(querysets, 2)
+
+        assert_equal(len(pages), 3)
+        for queryset, (objects, count, counts) in zip(querysets, pages):
+            assert_equal(objects, list(queryset[:2]))
+            assert_equal(count, queryset.count())
+            assert_equal(counts, {})
+        assert_equal(pages[0][1], 4)
+        assert_equal(pages[2], ([], 0, {}))
+
+    def test_extra_counts_are_read_with_the_page(self):
+        first = factories.ProjectFactory()
+        second = factories.ProjectFactory()
+        first.add_contributor(factories.UserFactory(), visible=False, save=True)
+        first.add_contributor(factories.UserFactory(), save=True)
+
+        querysets = [first.contributor_set.order_by('_order'), second.contributor_set.order_by('_order')]
+        pages = get_first_pages(querysets, 2, extra_counts=[
+            {'visible': first.contributor_set.filter(visible=True), 'hidden': first.contributor_set.filter(visible=False)},
+            None,
+        ])
+
+        assert_equal(pages[0][1], 3)
+        assert_equal(pages[0][2], {'visible': 2, 'hidden': 1})
+        assert_equal(pages[1][2], {})
+
+    def test_positions_follow_the_queryset_ordering(self):
+        user = factories.AuthUserFactory()
+        project = factories.ProjectFactory(creator=user)
+        for name in ('Bravo', 'Alpha', 'Charlie'):
+            project.add_contributor(factories.UserFactory(fullname=name), save=True)
+
+        queryset = project.contributor_set.order_by('user__fullname')
+        objects, count, _ = get_first_pages([queryset, project.contributor_set.order_by('-_order')], 3)[0]
+        assert_equal(objects, list(queryset[:3]))
+        assert_not_equal(objects, list(project.contributor_set.order_by('-_order')[:3]))
+        assert_equal(count, 4)
+
+    def test_random_ordering_is_not_supported(self):
+        project = factories.ProjectFactory()
+        with assert_raises(ValueError):
+            get_first_pages([project.contributor_set.order_by('?')], 2)
@@ -0,0 +1,65 @@
+import mock
+import pytest
+
+from api.caching import tasks
+from framework.postcommit_tasks.handlers import postcommit_after_request, postcommit_before_request
+from osf_tests.factories import CommentFactory, ProjectFactory
+from website import settings
+
+
+@pytest.fixture()
+def varnish():
+    with mock.patch.object(settings, 'ENABLE_VARNISH', True), \
+            mock.patch.object(settings, 'USE_CELERY', False), \
+            mock.patch.object(settings, 'VARNISH_SERVERS', ['http://varnish1', 'http://varnish2']):
+        yield
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('varnish')
+class TestBanDispatcher:
+
+    @pytest.fixture()
+    def project(self):
+        return ProjectFactory(is_public=True)
+
+    @mock.patch('api.caching.tasks.requests.request')
+    def test_bans_in_request_are_combined(self, mock_request, project):
+        comment = CommentFactory(node=project)
+        mock_request.return_value.raise_for_status.return_value = None
+
+        postcommit_before_request()
+        tasks.ban_url(project)
+        tasks.ban_url(comment)
+        tasks.ban_url(project)
+        assert not mock_request.called
+        postcommit_after_request(mock.Mock(status_code=200))
+
+        assert mock_request.call_count == 2
+        for (method, server), kwargs in mock_request.call_args_list:
+            assert method == 'PURGE'
+            assert set(kwargs['headers']['xkey-purge'].split(' ')) == {project._id, comment._id}
+        assert [call[0][1] for call in mock_request.call_args_list] == settings.VARNISH_SERVERS
+
+    @mock.patch('api.caching.tasks.requests.request')
+    def test_failed_request_does_not_ban(self, mock_request, project):
+        postcommit_before_request()
+        tasks.ban_url(project)
+        postcommit_after_request(mock.Mock(status_code=500))
+        assert not mock_request.called
+
+        # Keys from the failed request are not carried into the next one
+        postcommit_before_request()
+        assert not tasks.pending_surrogate_keys()
+
+    @mock.patch('api.caching.tasks.requests.request')
+    def test_keys_are_batched(self, mock_request):
+        mock_request.return_value.raise_for_status.return_value = None
+        with mock.patch.object(settings, 'VARNISH_BAN_BATCH_SIZE', 2):
+            tasks.ban_surrogate_keys(['a', 'b', 'c'], servers=['http://varnish1'])
+        assert [call[1]['headers']['xkey-purge'] for call in mock_request.call_args_list] == ['a b', 'c']
+
+    def test_comment_keys_include_targets(self, project):
+        comment = CommentFactory(node=project)
+        reply = CommentFactory(node=project, target=comment.guids.first())
+        assert tasks.get_surrogate_keys(reply) == {reply._id, comment._id, project._id}
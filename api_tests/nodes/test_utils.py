@@ -0,0 +1,73 @@
+import pytest
+
+from api.nodes.utils import NodePermissionResolver
+from framework.auth.core import Auth
+from osf_tests.factories import (
+    AuthUserFactory,
+    NodeFactory,
+    ProjectFactory,
+)
+from website.util import permissions
+
+
+@pytest.fixture()
+def user():
+    return AuthUserFactory()
+
+
+@pytest.mark.django_db
+class TestNodePermissionResolver:
+
+    @pytest.fixture()
+    def project(self, user):
+        return ProjectFactory(creator=user)
+
+    @pytest.fixture()
+    def component(self, project):
+        return NodeFactory(parent=project, creator=AuthUserFactory())
+
+    @pytest.fixture()
+    def read_project(self, user):
+        project = ProjectFactory()
+        project.add_contributor(user, permissions=[permissions.READ], save=True)
+        return project
+
+    @pytest.fixture()
+    def private_project(self):
+        return ProjectFactory()
+
+    def test_matches_node_permissions(self, user, project, component, read_project, private_project):
+        auth = Auth(user)
+        resolver = NodePermissionResolver(auth)
+        resolver.prime([project, component, read_project, private_project])
+        for node in (project, component, read_project, private_project):
+            assert resolver.can_view(node) == node.can_view(auth)
+            assert resolver.can_edit(node) == node.can_edit(auth)
+            for permission in permissions.PERMISSIONS:
+                assert resolver.has_permission(node, permission) == node.has_permission(user, permission)
+
+    def test_admin_parent_grants_read(self, user, component):
+        resolver = NodePermissionResolver(Auth(user))
+        assert resolver.is_admin_parent(component)
+        assert resolver.has_permission(component, permissions.READ)
+        assert not resolver.has_permission(component, permissions.READ, check_parent=False)
+        assert not resolver.can_edit(component)
+
+    def test_anonymous_can_only_view_public(self, project):
+        resolver = NodePermissionResolver(Auth())
+        assert not resolver.can_view(project)
+        project.is_public = True
+        project.save()
+        assert resolver.can_view(project)
+        assert not resolver.can_edit(project)
+
+    @pytest.mark.django_assert_num_queries
+    def test_prime_batches_queries(self, django_assert_num_queries, user, project, component, read_project, private_project):
+        nodes = [project, component, read_project, private_project]
+        resolver = NodePermissionResolver(Auth(user))
+        with django_assert_num_queries(2):
+            resolver.prime(nodes)
+        with django_assert_num_queries(0):
+            for node in nodes:
+                resolver.get_permissions(node)
+                resolver.has_permission(node, permissions.READ)
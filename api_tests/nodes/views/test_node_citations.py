@@ -1,12 +1,15 @@
+import mock
 import pytest
 
 from api.base.settings.defaults import API_BASE
+from api.citations import utils as citation_utils
 from framework.auth.core import Auth
 from rest_framework import exceptions
 from osf_tests.factories import (
     ProjectFactory,
     AuthUserFactory,
 )
+from website import settings
 
 
 @pytest.fixture()
@@ -143,3 +146,85 @@ class TestNodeCitationsStyle(NodeCitationsMixin):
     def private_url(self, private_project):
         return '/{}nodes/{}/citation/apa/'.format(
             API_BASE, private_project._id)
+
+
+class TestNodeCitationStyleList(NodeCitationsMixin):
+    @pytest.fixture()
+    def public_url(self, public_project):
+        return '/{}nodes/{}/citation/styles/?styles=apa,modern-language-association'.format(
+            API_BASE, public_project._id)
+
+    @pytest.fixture()
+    def private_url(self, private_project):
+        return '/{}nodes/{}/citation/styles/?styles=apa,modern-language-association'.format(
+            API_BASE, private_project._id)
+
+    def test_renders_each_style(self, app, public_project, public_url):
+        res = app.get(public_url)
+        assert res.status_code == 200
+        data = res.json['data']
+        assert [citation['id'] for citation in data] == ['apa', 'modern-language-association']
+        assert data[0]['attributes']['citation'] == citation_utils.render_citation(public_project, 'apa')
+
+    def test_invalid_styles(self, app, public_project):
+        url = '/{}nodes/{}/citation/styles/'.format(API_BASE, public_project._id)
+        res = app.get(url, expect_errors=True)
+        assert res.status_code == 400
+
+        res = app.get('{}?styles=apa,not-a-style'.format(url), expect_errors=True)
+        assert res.status_code == 404
+        assert res.json['errors'][0]['detail'] == 'not-a-style is not a known style.'
+
+        res = app.get('{}?styles=apa2'.format(url), expect_errors=True)
+        assert res.status_code == 404
+
+    @pytest.mark.parametrize('style', ['/etc/passwd', '../../apa', 'apa.csl'])
+    def test_styles_cannot_name_other_files(self, app, public_project, style):
+        url = '/{}nodes/{}/citation/styles/?styles={}'.format(API_BASE, public_project._id, style)
+        with mock.patch('api.citations.utils.parse_style') as mock_parse:
+            res = app.get(url, expect_errors=True)
+        assert res.status_code == 404
+        assert not mock_parse.called
+
+
+@pytest.mark.django_db
+class TestRenderedCitationCache:
+
+    @pytest.fixture(autouse=True)
+    def shared_cache(self):
+        from django.core.cache import caches
+        cache = caches['default']
+        cache.clear()
+        with mock.patch.object(settings, 'CACHED_PROPERTY_BACKEND', 'default'):
+            yield cache
+        cache.clear()
+
+    def test_citations_are_cached_until_the_node_changes(self, public_project):
+        with mock.patch.object(citation_utils, '_render_citation', wraps=citation_utils._render_citation) as mock_render:
+            first = citation_utils.render_citations(public_project, ['apa', 'modern-language-association'])
+            assert citation_utils.render_citations(public_project, ['apa', 'modern-language-association']) == first
+            assert mock_render.call_count == 2
+
+            public_project.title = 'A new title'
+            public_project.save()
+            assert 'A new title' in citation_utils.render_citation(public_project, 'apa')
+            assert mock_render.call_count == 3
+
+    def test_citations_are_invalidated_by_contributor_changes(self, public_project):
+        citation_utils.render_citation(public_project, 'apa')
+        contributor = AuthUserFactory(fullname='Rosalind Franklin')
+        public_project.add_contributor(contributor, auth=Auth(public_project.creator), save=True)
+        assert 'Franklin' in citation_utils.render_citation(public_project, 'apa')
+
+        contributor.fullname = 'Rosalind Elsie Franklin'
+        contributor.family_name = 'Franklin-Smith'
+        contributor.save()
+        assert 'Franklin-Smith' in citation_utils.render_citation(public_project, 'apa')
+
+    def test_style_cache_is_bounded(self):
+        style_cache = citation_utils.StyleCache(1)
+        apa, _ = style_cache.get('apa')
+        assert style_cache.get('apa')[0] is apa
+        style_cache.get('modern-language-association')
+        assert len(style_cache) == 1
+        assert style_cache.get('apa')[0] is not apa
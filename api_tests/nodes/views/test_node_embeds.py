@@ -1,5 +1,7 @@
 import functools
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from api.base.settings.defaults import API_BASE
 from framework.auth.core import Auth
@@ -154,3 +156,51 @@ class TestNodeEmbeds:
         res = app.get(url, auth=write_contrib_one.auth)
         assert res.status_code == 200
         assert res.json['data']['embeds']['contributors']['meta']['total_bibliographic'] == 3
+
+    def test_node_list_embeds_are_resolved_per_node(
+            self, app, user, write_contribs, root_node,
+            child_one, child_two):
+        url = '/{}nodes/?embed=contributors&embed=children&version=2.1'.format(API_BASE)
+        res = app.get(url, auth=user.auth)
+        assert res.status_code == 200
+        nodes = {node['id']: node for node in res.json['data']}
+        assert set(nodes) == {root_node._id, child_one._id, child_two._id}
+
+        for node in (root_node, child_one, child_two):
+            contributors = nodes[node._id]['embeds']['contributors']
+            expected = [
+                '{}-{}'.format(node._id, contrib.user._id)
+                for contrib in node.contributor_set.order_by('_order')
+            ]
+            assert [contrib['id'] for contrib in contributors['data']] == expected
+            assert contributors['meta']['total'] == len(expected)
+            assert contributors['meta']['total_bibliographic'] == node.visible_contributors.count()
+
+        children = nodes[root_node._id]['embeds']['children']
+        assert set(child['id'] for child in children['data']) == {child_one._id, child_two._id}
+        assert children['meta']['total'] == 2
+        assert nodes[child_one._id]['embeds']['children']['data'] == []
+
+    @pytest.mark.django_assert_num_queries
+    def test_node_list_contributor_embeds_use_constant_queries(
+            self, app, user, auth, django_assert_num_queries):
+        url = '/{}nodes/?embed=contributors&fields[nodes]=title,contributors&fields[contributors]=bibliographic,index&version=2.1'.format(API_BASE)
+
+        def create_nodes(count):
+            for _ in range(count):
+                node = ProjectFactory(creator=user, is_public=False)
+                node.add_contributor(AuthUserFactory(), ['read'], visible=False, auth=auth, save=True)
+
+        create_nodes(2)
+        app.get(url, auth=user.auth)
+        with CaptureQueriesContext(connection) as queries:
+            res = app.get(url, auth=user.auth)
+        assert len(res.json['data']) == 2
+
+        create_nodes(3)
+        with django_assert_num_queries(len(queries)):
+            res = app.get(url, auth=user.auth)
+        assert len(res.json['data']) == 5
+        for node in res.json['data']:
+            assert node['embeds']['contributors']['meta']['total'] == 2
+            assert node['embeds']['contributors']['meta']['total_bibliographic'] == 1
@@ -8,6 +8,7 @@ from nose.tools import *  # flake8: noqa
 
 from framework.auth.core import Auth
 
+from addons.github.models import GithubFile, GithubFolder
 from addons.github.tests.factories import GitHubAccountFactory
 from website.util import waterbutler_api_url_for
 from api.base.settings.defaults import API_BASE
@@ -297,6 +298,30 @@ class TestNodeFilesList(ApiTestCase):
         assert_equal(res.json['data'][0]['attributes']['name'], 'NewFile')
         assert_equal(res.json['data'][0]['attributes']['provider'], 'github')
 
+    def test_node_files_list_bulk_gets_file_nodes(self):
+        self.add_github()
+        existing = GithubFile.create(node=self.project, path='/Existing', name='Existing', materialized_path='/Existing')
+        existing.save()
+        self._prepare_mock_wb_response(
+            provider='github', files=[
+                {'name': 'Existing', 'path': '/Existing', 'materialized': '/Folder/Existing'},
+                {'name': 'NewFile', 'path': '/NewFile', 'materialized': '/NewFile'},
+                {'name': 'NewFolder', 'path': '/NewFolder/', 'materialized': '/NewFolder/', 'kind': 'folder'},
+            ])
+        url = '/{}nodes/{}/files/github/'.format(API_BASE, self.project._id)
+
+        for _ in range(2):
+            res = self.app.get(url, auth=self.user.auth)
+            assert_equal(
+                sorted(each['attributes']['name'] for each in res.json['data']),
+                ['Existing', 'NewFile', 'NewFolder']
+            )
+        assert_equal(GithubFile.objects.filter(node=self.project).count(), 2)
+        assert_equal(GithubFolder.objects.filter(node=self.project, _path='/NewFolder/').count(), 1)
+        existing.reload()
+        assert_equal(existing.materialized_path, '/Folder/Existing')
+        assert_is_not_none(existing.last_touched)
+
     def test_returns_node_file(self):
         self._prepare_mock_wb_response(
             provider='github', files=[{'name': 'NewFile'}],
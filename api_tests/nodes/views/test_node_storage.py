@@ -0,0 +1,77 @@
+import pytest
+
+from api.base.settings.defaults import API_BASE
+from api_tests.utils import create_test_file
+from osf_tests.factories import (
+    AuthUserFactory,
+    NodeFactory,
+    ProjectFactory,
+)
+
+
+@pytest.fixture()
+def user():
+    return AuthUserFactory()
+
+
+@pytest.mark.django_db
+class TestNodeStorageDetail:
+
+    @pytest.fixture()
+    def project(self, user):
+        project = ProjectFactory(creator=user)
+        create_test_file(project, user, size=100)
+        create_test_file(NodeFactory(parent=project, creator=user), user, size=10)
+        return project
+
+    @pytest.fixture()
+    def url(self, project):
+        return '/{}nodes/{}/storage/'.format(API_BASE, project._id)
+
+    def test_node_storage(self, app, user, project, url):
+        res = app.get(url, auth=user.auth)
+        assert res.status_code == 200
+        data = res.json['data']
+        assert data['id'] == project._id
+        assert data['type'] == 'node-storage'
+        assert data['attributes']['file_count'] == 1
+        assert data['attributes']['version_count'] == 1
+        assert data['attributes']['live_bytes'] == 100
+        assert data['attributes']['trashed_bytes'] == 0
+        assert data['attributes']['total']['live_bytes'] == 110
+        assert data['attributes']['total']['file_count'] == 2
+
+    def test_node_without_files(self, app, user):
+        project = ProjectFactory(creator=user)
+        res = app.get('/{}nodes/{}/storage/'.format(API_BASE, project._id), auth=user.auth)
+        assert res.status_code == 200
+        assert res.json['data']['attributes']['live_bytes'] == 0
+        assert res.json['data']['attributes']['total']['live_bytes'] == 0
+
+    def test_private_node_requires_permission(self, app, url):
+        res = app.get(url, expect_errors=True)
+        assert res.status_code == 401
+
+        res = app.get(url, auth=AuthUserFactory().auth, expect_errors=True)
+        assert res.status_code == 403
+
+    def test_total_counts_only_viewable_components(self, app, user):
+        project = ProjectFactory(creator=user, is_public=True)
+        create_test_file(project, user, size=100)
+        create_test_file(NodeFactory(parent=project, creator=user, is_public=True), user, size=10)
+        create_test_file(NodeFactory(parent=project, creator=user, is_public=False), user, size=20)
+        deleted = NodeFactory(parent=project, creator=user, is_public=True)
+        create_test_file(deleted, user, size=40)
+        deleted.is_deleted = True
+        deleted.save()
+        url = '/{}nodes/{}/storage/'.format(API_BASE, project._id)
+
+        res = app.get(url, auth=AuthUserFactory().auth)
+        assert res.status_code == 200
+        assert res.json['data']['attributes']['total']['live_bytes'] == 110
+        assert res.json['data']['attributes']['total']['file_count'] == 2
+
+        res = app.get(url, auth=user.auth)
+        assert res.status_code == 200
+        assert res.json['data']['attributes']['total']['live_bytes'] == 130
+        assert res.json['data']['attributes']['total']['file_count'] == 3
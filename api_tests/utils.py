@@ -2,20 +2,26 @@ from urlparse import urlparse
 from addons.osfstorage import settings as osfstorage_settings
 
 
-def create_test_file(node, user, filename='test_file', create_guid=True):
-    osfstorage = node.get_addon('osfstorage')
-    root_node = osfstorage.get_root()
-    test_file = root_node.append_file(filename)
+def create_test_file(node, user, filename='test_file', create_guid=True, size=1337, parent=None):
+    parent = parent or node.get_addon('osfstorage').get_root()
+    test_file = parent.append_file(filename)
 
     if create_guid:
         test_file.get_guid(create=True)
 
+    create_test_file_version(test_file, user, size=size)
+    return test_file
+
+
+def create_test_file_version(test_file, user, size=1337):
+    # Versions at the same location are duplicates, so each new version gets its own object
+    version_count = test_file.versions.count()
     test_file.create_version(user, {
-        'object': '06d80e',
+        'object': '06d80e{}'.format(version_count or ''),
         'service': 'cloud',
         osfstorage_settings.WATERBUTLER_RESOURCE: 'osf',
     }, {
-        'size': 1337,
+        'size': size,
         'contentType': 'img/png'
     }).save()
     return test_file
@@ -1,12 +1,17 @@
 # -*- coding: utf-8 -*-
 
 import furl
+import hashlib
 import httplib as http
 import json
+import logging
+import time
 import urllib
+import uuid
 
 from lxml import etree
 import requests
+from requests.adapters import HTTPAdapter
 
 from framework.auth import authenticate, external_first_login_authenticate
 from framework.auth.core import get_user, generate_verification_key
@@ -14,6 +19,24 @@ from framework.flask import redirect
 from framework.exceptions import HTTPError
 from website import settings
 
+logger = logging.getLogger(__name__)
+
+_session = None
+
+
+def get_session():
+    """Return the `requests.Session` shared by CAS clients, which keeps a pool of
+    `settings.CAS_CONNECTION_POOL_SIZE` connections open to the CAS server.
+    """
+    global _session
+    if _session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=settings.CAS_CONNECTION_POOL_SIZE)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        _session = session
+    return _session
+
 
 class CasError(HTTPError):
     """General CAS-related error."""
@@ -114,7 +137,7 @@ class CasClient(object):
         url.args['ticket'] = ticket
         url.args['service'] = service_url
 
-        resp = requests.get(url.url)
+        resp = get_session().get(url.url)
         if resp.status_code == 200:
             return self._parse_service_validation(resp.content)
         else:
@@ -133,7 +156,9 @@ class CasClient(object):
         headers = {
             'Authorization': 'Bearer {}'.format(access_token),
         }
-        resp = requests.get(url, headers=headers)
+        start = time.time()
+        resp = get_session().get(url, headers=headers)
+        logger.debug('CAS profile request returned {} in {:.3f}s'.format(resp.status_code, time.time() - start))
         if resp.status_code == 200:
             return self._parse_profile(resp.content, access_token)
         else:
@@ -182,7 +207,7 @@ class CasClient(object):
         """Revoke a tokens based on payload"""
         url = self.get_auth_token_revocation_url()
 
-        resp = requests.post(url, data=payload)
+        resp = get_session().post(url, data=payload)
         if resp.status_code == 204:
             return True
         else:
@@ -212,6 +237,88 @@ def get_client():
     return CasClient(settings.CAS_SERVER_URL)
 
 
+PROFILE_GENERATION_KEY = 'cas_profile_generation'
+
+
+def _profile_generation(cache):
+    generation = cache.get(PROFILE_GENERATION_KEY)
+    if generation is None:
+        generation = uuid.uuid4().hex
+        if not cache.add(PROFILE_GENERATION_KEY, generation, None):
+            generation = cache.get(PROFILE_GENERATION_KEY) or generation
+    return generation
+
+
+def _profile_cache_key(cache, access_token):
+    return 'cas_profile:{}:{}'.format(
+        _profile_generation(cache),
+        hashlib.sha256(access_token.encode('utf-8')).hexdigest(),
+    )
+
+
+def get_profile(access_token):
+    """
+    Get the CAS profile of an access token, caching successful responses in the shared cache
+    for `settings.CAS_PROFILE_CACHE_TIMEOUT` seconds. Cached responses are signed.
+
+    :param str access_token: CAS access_token.
+    :rtype: CasResponse
+    :raises: CasError if an unexpected response is returned.
+    """
+    from django.core import signing
+    from osf.utils.caching import get_shared_cache
+
+    cache = get_shared_cache()
+    if cache is None or not settings.CAS_PROFILE_CACHE_TIMEOUT:
+        return get_client().profile(access_token)
+
+    key = _profile_cache_key(cache, access_token)
+    cached = cache.get(key)
+    if cached is not None:
+        try:
+            data = signing.loads(cached, salt=key, max_age=settings.CAS_PROFILE_CACHE_TIMEOUT)
+        except signing.BadSignature:
+            pass
+        else:
+            logger.debug('CAS profile cache hit')
+            resp = CasResponse(authenticated=True, user=data['user'], attributes=data['attributes'])
+            resp.attributes['accessToken'] = access_token
+            resp.attributes['accessTokenScope'] = set(data['scope'])
+            return resp
+
+    logger.debug('CAS profile cache miss')
+    resp = get_client().profile(access_token)
+    if resp.authenticated:
+        attributes = {
+            name: value for name, value in resp.attributes.items()
+            if name not in ('accessToken', 'accessTokenScope')
+        }
+        cache.set(key, signing.dumps({
+            'user': resp.user,
+            'attributes': attributes,
+            'scope': sorted(resp.attributes.get('accessTokenScope', [])),
+        }, salt=key), settings.CAS_PROFILE_CACHE_TIMEOUT)
+    return resp
+
+
+def invalidate_profile(access_token):
+    """Discard the cached CAS profile of an access token, e.g. after it is revoked."""
+    from osf.utils.caching import delete_shared, get_shared_cache
+
+    cache = get_shared_cache()
+    if cache is not None and access_token:
+        delete_shared(cache, [_profile_cache_key(cache, access_token)])
+
+
+def invalidate_profiles():
+    """Discard every cached CAS profile, e.g. after all tokens of an application are revoked."""
+    from osf.utils.caching import delete_shared, get_shared_cache
+
+    cache = get_shared_cache()
+    if cache is not None:
+        delete_shared(cache, [PROFILE_GENERATION_KEY])
+
+
 def get_login_url(*args, **kwargs):
     """
     Convenience function for getting a login URL for a service.
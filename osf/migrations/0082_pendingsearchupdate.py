@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.9 on 2018-02-15 10:21
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import osf.utils.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('osf', '0081_nodeclosure'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingSearchUpdate',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('doc_type', models.CharField(choices=[('node', 'Node'), ('user', 'User'), ('file', 'File')], max_length=8)),
+                ('doc_id', models.CharField(max_length=255)),
+                ('reindex_files', models.BooleanField(default=False)),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('created', osf.utils.fields.NonNaiveDateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='pendingsearchupdate',
+            unique_together=set([('doc_type', 'doc_id')]),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.9 on 2018-02-16 14:08
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('osf', '0082_pendingsearchupdate'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='notificationdigest',
+            index_together=set([('send_type', 'user')]),
+        ),
+    ]
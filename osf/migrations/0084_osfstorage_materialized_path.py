@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+POPULATE_MATERIALIZED_PATHS = """
+    WITH RECURSIVE materialized_path_cte(id, gen_path) AS (
+        SELECT id, name || '/'
+        FROM osf_basefilenode
+        WHERE parent_id IS NULL AND type = 'osf.osfstoragefolder'
+    UNION ALL
+        SELECT F.id, P.gen_path || F.name || CASE WHEN F.type = 'osf.osfstoragefolder' THEN '/' ELSE '' END
+        FROM materialized_path_cte AS P
+            JOIN osf_basefilenode AS F ON F.parent_id = P.id
+        WHERE F.type IN ('osf.osfstoragefile', 'osf.osfstoragefolder')
+    ) UPDATE osf_basefilenode AS F
+    SET _materialized_path = P.gen_path
+    FROM materialized_path_cte AS P
+    WHERE F.id = P.id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('osf', '0083_notificationdigest_send_type_user_index'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            POPULATE_MATERIALIZED_PATHS,
+            "UPDATE osf_basefilenode SET _materialized_path = '' WHERE type IN ('osf.osfstoragefile', 'osf.osfstoragefolder');"
+        ),
+        migrations.RunSQL(
+            [
+                """
+                CREATE INDEX osf_basefilenode_node_materialized_path_index
+                ON public.osf_basefilenode (node_id, _materialized_path text_pattern_ops);
+                """
+            ], [
+                """
+                DROP INDEX IF EXISTS osf_basefilenode_node_materialized_path_index RESTRICT;
+                """
+            ]
+        ),
+    ]
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.9 on 2018-02-20 11:47
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+import osf.utils.fields
+
+
+POPULATE_NODE_STORAGE_USAGE = """
+    INSERT INTO osf_nodestorageusage (node_id, file_count, version_count, live_bytes, trashed_bytes, modified)
+    SELECT F.node_id,
+        COUNT(DISTINCT F.id) FILTER (WHERE F.type = 'osf.osfstoragefile'),
+        COUNT(V.id) FILTER (WHERE F.type = 'osf.osfstoragefile'),
+        COALESCE(SUM(GREATEST(V.size, 0)) FILTER (WHERE F.type = 'osf.osfstoragefile'), 0),
+        COALESCE(SUM(GREATEST(V.size, 0)) FILTER (WHERE F.type = 'osf.trashedfile'), 0),
+        NOW()
+    FROM osf_basefilenode AS F
+        LEFT JOIN osf_basefilenode_versions AS FV ON FV.basefilenode_id = F.id
+        LEFT JOIN osf_fileversion AS V ON V.id = FV.fileversion_id
+    WHERE F.node_id IS NOT NULL
+        AND F.provider = 'osfstorage'
+        AND F.type IN ('osf.osfstoragefile', 'osf.trashedfile')
+    GROUP BY F.node_id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('osf', '0084_osfstorage_materialized_path'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NodeStorageUsage',
+            fields=[
+                ('node', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='storage_usage', serialize=False, to='osf.AbstractNode')),
+                ('file_count', models.BigIntegerField(default=0)),
+                ('version_count', models.BigIntegerField(default=0)),
+                ('live_bytes', models.BigIntegerField(default=0)),
+                ('trashed_bytes', models.BigIntegerField(default=0)),
+                ('modified', osf.utils.fields.NonNaiveDateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunSQL(POPULATE_NODE_STORAGE_USAGE, 'DELETE FROM osf_nodestorageusage;'),
+    ]
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.9 on 2018-02-21 09:12
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+POPULATE_VERSION_FIELDS = """
+    UPDATE osf_basefilenode AS F
+    SET latest_version_id = V.latest_version_id,
+        earliest_version_id = V.earliest_version_id,
+        version_count = V.version_count
+    FROM (
+        SELECT FV.basefilenode_id AS id,
+            (array_agg(V.id ORDER BY V.created DESC))[1] AS latest_version_id,
+            (array_agg(V.id ORDER BY V.created ASC))[1] AS earliest_version_id,
+            COUNT(*) AS version_count
+        FROM osf_basefilenode_versions AS FV
+            JOIN osf_fileversion AS V ON V.id = FV.fileversion_id
+        GROUP BY FV.basefilenode_id
+    ) AS V
+    WHERE F.id = V.id;
+"""
+
+POPULATE_DOWNLOAD_COUNTS = """
+    UPDATE osf_basefilenode AS F
+    SET download_count = P.total
+    FROM osf_guid AS G, osf_pagecounter AS P
+    WHERE F.type = 'osf.osfstoragefile'
+        AND G.object_id = F.node_id
+        AND G.content_type_id = (SELECT id FROM django_content_type WHERE app_label = 'osf' AND model = 'abstractnode')
+        AND P._id = 'download:' || G._id || ':' || F._id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('osf', '0085_nodestorageusage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='basefilenode',
+            name='download_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='basefilenode',
+            name='earliest_version',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='osf.FileVersion'),
+        ),
+        migrations.AddField(
+            model_name='basefilenode',
+            name='latest_version',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='osf.FileVersion'),
+        ),
+        migrations.AddField(
+            model_name='basefilenode',
+            name='version_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunSQL(POPULATE_VERSION_FIELDS, migrations.RunSQL.noop),
+        migrations.RunSQL(POPULATE_DOWNLOAD_COUNTS, migrations.RunSQL.noop),
+    ]
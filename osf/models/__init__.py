@@ -29,10 +29,12 @@ from osf.models.files import (  # noqa
     File, Folder,  # noqa
     FileVersion, TrashedFile, TrashedFileNode, TrashedFolder,  # noqa
 )  # noqa
-from osf.models.node_relation import NodeRelation  # noqa
+from osf.models.node_relation import NodeRelation, NodeClosure  # noqa
 from osf.models.analytics import UserActivityCounter, PageCounter  # noqa
 from osf.models.admin_profile import AdminProfile  # noqa
 from osf.models.admin_log_entry import AdminLogEntry  # noqa
 from osf.models.maintenance_state import MaintenanceState  # noqa
 from osf.models.quickfiles import QuickFilesNode  # noqa
 from osf.models.action import ReviewAction  # noqa
+from osf.models.search_queue import PendingSearchUpdate  # noqa
+from osf.models.storage_usage import NodeStorageUsage  # noqa
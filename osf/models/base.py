@@ -1,5 +1,6 @@
 import logging
 import random
+import uuid
 
 import bson
 from django.contrib.contenttypes.fields import (GenericForeignKey,
@@ -9,12 +10,12 @@ from django.core.exceptions import MultipleObjectsReturned
 from django.core.exceptions import ValidationError as DjangoValidationError
 from django.db import models
 from django.db.models import ForeignKey
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django_extensions.db.models import TimeStampedModel
 from include import IncludeQuerySet
 
-from osf.utils.caching import cached_property
+from osf.utils.caching import cached_property, get_shared_cache
 from osf.exceptions import ValidationError
 from osf.utils.fields import LowercaseCharField, NonNaiveDateTimeField
 
@@ -329,3 +330,44 @@ def ensure_guid(sender, instance, created, **kwargs):
             del instance._prefetched_objects_cache['guids']
         Guid.objects.create(object_id=instance.pk, content_type=ContentType.objects.get_for_model(instance),
                             _id=generate_guid(instance.__guid_min_length__))
+
+
+def guid_resolution_cache_key(guid):
+    return 'guid_resolution:{}'.format(guid)
+
+
+def _referent_version_key(content_type_id, object_id):
+    return 'guid_referent:{}:{}'.format(content_type_id, object_id)
+
+
+def get_referent_version(cache, content_type_id, object_id):
+    """Return the version stamp of a guid referent in `cache`, starting a new one if needed.
+
+    Cached guid resolutions record the stamp of their referent, which changes whenever the
+    referent is saved or deleted.
+    """
+    key = _referent_version_key(content_type_id, object_id)
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(key, version, None):
+            version = cache.get(key) or version
+    return version
+
+
+def get_current_referent_version(cache, content_type_id, object_id):
+    return cache.get(_referent_version_key(content_type_id, object_id))
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_guid_resolution(sender, instance, **kwargs):
+    if not issubclass(sender, (Guid, GuidMixin, OptionalGuidMixin)):
+        return
+    cache = get_shared_cache()
+    if cache is None:
+        return
+    if issubclass(sender, Guid):
+        cache.delete(guid_resolution_cache_key(instance._id))
+    else:
+        cache.delete(_referent_version_key(ContentType.objects.get_for_model(instance).id, instance.pk))
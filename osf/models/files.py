@@ -5,8 +5,11 @@ import os
 
 import requests
 from dateutil.parser import parse as parse_date
-from django.db import models
+from django.db import connection, models
 from django.db.models import Manager
+from django.db.models.sql import InsertQuery
+from django.db.models.signals import m2m_changed
+from django.dispatch import receiver
 from django.core.exceptions import ObjectDoesNotExist
 from django.utils import timezone
 from typedmodels.models import TypedModel, TypedModelManager
@@ -17,6 +20,7 @@ from framework import sentry
 from osf.models.base import BaseModel, OptionalGuidMixin, ObjectIDMixin
 from osf.models.comment import CommentableMixin
 from osf.models.mixins import Taggable
+from osf.models.storage_usage import NodeStorageUsage
 from osf.models.validators import validate_location
 from osf.utils.datetime_aware_jsonfield import DateTimeAwareJSONField
 from osf.utils.fields import NonNaiveDateTimeField
@@ -90,6 +94,13 @@ class BaseFileNode(TypedModel, CommentableMixin, OptionalGuidMixin, Taggable, Ob
     _history = DateTimeAwareJSONField(default=list, blank=True)
     # A concrete version of a FileNode, must have an identifier
     versions = models.ManyToManyField('FileVersion')
+    # Denormalized from versions by update_version_fields so folders can be listed without
+    # aggregating every file's versions
+    latest_version = models.ForeignKey('FileVersion', blank=True, null=True, related_name='+', on_delete=models.SET_NULL)
+    earliest_version = models.ForeignKey('FileVersion', blank=True, null=True, related_name='+', on_delete=models.SET_NULL)
+    version_count = models.PositiveIntegerField(default=0)
+    # Mirrors the total of the file's download PageCounter, see addons.osfstorage.utils.update_analytics
+    download_count = models.PositiveIntegerField(default=0)
 
     node = models.ForeignKey('osf.AbstractNode', blank=True, null=True, related_name='files', on_delete=models.CASCADE)
     parent = models.ForeignKey('self', blank=True, null=True, default=None, related_name='_children', on_delete=models.CASCADE)
@@ -183,6 +194,42 @@ class BaseFileNode(TypedModel, CommentableMixin, OptionalGuidMixin, Taggable, Ob
             obj = cls(node=node, _path='/' + path.lstrip('/'))
         return obj
 
+    @classmethod
+    def bulk_upsert(cls, file_nodes):
+        """Insert unsaved, parentless `file_nodes` with a single query and set their primary keys,
+        object ids and creation times from the stored rows.
+
+        Rows that already exist with the same node, path, name and type, e.g. because a
+        concurrent request created them, have their materialized path, history and last touched
+        time updated instead. Like bulk_create, this bypasses `save` and its signals.
+        """
+        if not file_nodes:
+            return
+        fields = [field for field in cls._meta.concrete_fields if not field.primary_key]
+        query = InsertQuery(cls)
+        query.insert_values(fields, file_nodes)
+        (insert_sql, params), = query.get_compiler(connection=connection).as_sql()
+        with connection.cursor() as cursor:
+            # The conflict target matches active_file_node_path_name_type_unique_index
+            cursor.execute("""
+                {insert}
+                ON CONFLICT (node_id, _path, name, type)
+                    WHERE (type NOT IN ('osf.trashedfilenode', 'osf.trashedfile', 'osf.trashedfolder')
+                      AND parent_id IS NULL)
+                DO UPDATE SET
+                    _materialized_path = EXCLUDED._materialized_path,
+                    _history = EXCLUDED._history,
+                    last_touched = EXCLUDED.last_touched,
+                    modified = EXCLUDED.modified
+                RETURNING id, _id, created;
+            """.format(insert=insert_sql), params)
+            # Rows that already existed keep their own object id and creation time
+            for file_node, (pk, _id, created) in zip(file_nodes, cursor.fetchall()):
+                file_node.pk = pk
+                file_node._id = _id
+                file_node.created = created
+                file_node._state.adding = False
+
     @classmethod
     def get_file_guids(cls, materialized_path, provider, node):
         guids = []
@@ -574,6 +621,8 @@ class TrashedFileNode(BaseFileNode):
 
         if save:
             self.save(update_modified=False)
+            if self.provider == 'osfstorage' and type_cls is File:
+                NodeStorageUsage.adjust_for_trash(self, restored=True)
 
         return self
 
@@ -696,3 +745,47 @@ class FileVersion(ObjectIDMixin, BaseModel):
 
     class Meta:
         ordering = ('-created',)
+
+
+@receiver(m2m_changed, sender=BaseFileNode.versions.through)
+def update_version_fields(sender, instance, action, reverse, pk_set, **kwargs):
+    """Keep the denormalized version fields of file nodes in sync with their versions."""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        file_nodes = [instance]
+    elif pk_set:
+        file_nodes = BaseFileNode.objects.filter(id__in=pk_set).only('id')
+    else:
+        return
+    file_nodes = {file_node.id: file_node for file_node in file_nodes}
+
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            UPDATE "{files}" AS F
+            SET latest_version_id = V.latest_version_id,
+                earliest_version_id = V.earliest_version_id,
+                version_count = V.version_count
+            FROM (
+                SELECT F2.id,
+                    (SELECT V2.id FROM "{versions}" AS V2 JOIN "{file_versions}" AS FV ON FV.fileversion_id = V2.id
+                     WHERE FV.basefilenode_id = F2.id ORDER BY V2.created DESC LIMIT 1) AS latest_version_id,
+                    (SELECT V2.id FROM "{versions}" AS V2 JOIN "{file_versions}" AS FV ON FV.fileversion_id = V2.id
+                     WHERE FV.basefilenode_id = F2.id ORDER BY V2.created ASC LIMIT 1) AS earliest_version_id,
+                    (SELECT COUNT(*) FROM "{file_versions}" AS FV WHERE FV.basefilenode_id = F2.id) AS version_count
+                FROM "{files}" AS F2
+                WHERE F2.id = ANY(%s)
+            ) AS V
+            WHERE F.id = V.id
+            RETURNING F.id, F.latest_version_id, F.earliest_version_id, F.version_count;
+        """.format(
+            files=BaseFileNode._meta.db_table,
+            versions=FileVersion._meta.db_table,
+            file_versions=sender._meta.db_table,
+        ), [list(file_nodes.keys())])
+        for file_id, latest_version_id, earliest_version_id, version_count in cursor.fetchall():
+            # Update in memory too so a later save of the instance doesn't revert them
+            file_node = file_nodes[file_id]
+            file_node.latest_version_id = latest_version_id
+            file_node.earliest_version_id = earliest_version_id
+            file_node.version_count = version_count
@@ -1,3 +1,4 @@
+import collections
 import functools
 import itertools
 import logging
@@ -5,25 +6,24 @@ import re
 import urlparse
 import warnings
 
-import bson
 from django.db.models import Q
 from dirtyfields import DirtyFieldsMixin
 from django.apps import apps
 from django.contrib.contenttypes.fields import GenericRelation
-from django.core.paginator import Paginator
+from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import ValidationError
 from django.core.urlresolvers import reverse
 from django.db import models, transaction, connection
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
 from django.utils import timezone
 from django.utils.functional import cached_property
 from keen import scoped_keys
-from psycopg2._psycopg import AsIs
 from typedmodels.models import TypedModel, TypedModelManager
 from include import IncludeManager
 
 from framework import status
+from framework.analytics import increment_user_activity_counters
 from framework.celery_tasks.handlers import enqueue_task
 from framework.exceptions import PermissionsError
 from framework.sentry import log_exception
@@ -35,7 +35,7 @@ from osf.models.identifiers import Identifier, IdentifierMixin
 from osf.models.licenses import NodeLicenseRecord
 from osf.models.mixins import (AddonModelMixin, CommentableMixin, Loggable,
                                NodeLinkMixin, Taggable)
-from osf.models.node_relation import NodeRelation
+from osf.models.node_relation import NodeClosure, NodeRelation
 from osf.models.nodelog import NodeLog
 from osf.models.sanctions import RegistrationApproval
 from osf.models.private_link import PrivateLink
@@ -44,6 +44,7 @@ from osf.models.tag import Tag
 from osf.models.user import OSFUser
 from osf.models.validators import validate_doi, validate_title
 from framework.auth.core import Auth, get_user
+from osf.utils.caching import get_shared_cache, invalidate_cached_properties, shared_cached_property
 from osf.utils.datetime_aware_jsonfield import DateTimeAwareJSONField
 from osf.utils.fields import NonNaiveDateTimeField
 from osf.utils.requests import DummyRequest, get_request_and_user_id
@@ -77,52 +78,12 @@ class AbstractNodeQuerySet(GuidMixinQuerySet):
         return self.filter(id__in=self.exclude(type='osf.collection').exclude(type='osf.quickfilesnode').values_list('root_id', flat=True))
 
     def get_children(self, root, active=False):
-        # If `root` is a root node, we can use the 'descendants' related name
-        # rather than doing a recursive query
-        if root.id == root.root_id:
-            query = root.descendants.exclude(id=root.id)
-            if active:
-                query = query.filter(is_deleted=False)
-            return query
-        else:
-            sql = """
-                WITH RECURSIVE descendants AS (
-                SELECT
-                    parent_id,
-                    child_id,
-                    1 AS LEVEL,
-                    ARRAY[parent_id] as pids
-                FROM %s
-                %s
-                WHERE is_node_link IS FALSE AND parent_id = %s %s
-                UNION ALL
-                SELECT
-                    d.parent_id,
-                    s.child_id,
-                    d.level + 1,
-                    d.pids || s.parent_id
-                FROM descendants AS d
-                    JOIN %s AS s
-                    ON d.child_id = s.parent_id
-                WHERE s.is_node_link IS FALSE AND %s = ANY(pids)
-                ) SELECT array_agg(DISTINCT child_id)
-                FROM descendants
-                WHERE parent_id = %s;
-            """
-            with connection.cursor() as cursor:
-                node_relation_table = AsIs(NodeRelation._meta.db_table)
-                cursor.execute(sql, [
-                    node_relation_table,
-                    AsIs('LEFT JOIN osf_abstractnode ON {}.child_id = osf_abstractnode.id'.format(node_relation_table) if active else ''),
-                    root.pk,
-                    AsIs('AND osf_abstractnode.is_deleted IS FALSE' if active else ''),
-                    node_relation_table,
-                    root.pk,
-                    root.pk])
-                row = cursor.fetchone()[0]
-                if not row:
-                    return AbstractNode.objects.none()
-                return AbstractNode.objects.filter(id__in=row)
+        query = AbstractNode.objects.filter(
+            id__in=NodeClosure.objects.filter(ancestor_id=root.pk).values('descendant_id')
+        )
+        if active:
+            query = query.filter(is_deleted=False)
+        return query
 
     def can_view(self, user=None, private_link=None):
         qs = self.filter(is_public=True)
@@ -145,19 +106,18 @@ class AbstractNodeQuerySet(GuidMixinQuerySet):
             qs |= self.annotate(can_view=models.Exists(sqs)).filter(can_view=True)
             qs |= self.extra(where=['''
                 "osf_abstractnode".id in (
-                    WITH RECURSIVE implicit_read AS (
                         SELECT "osf_contributor"."node_id"
                         FROM "osf_contributor"
                         WHERE "osf_contributor"."user_id" = %s
                         AND "osf_contributor"."admin" is TRUE
                     UNION ALL
-                        SELECT "osf_noderelation"."child_id"
-                        FROM "implicit_read"
-                        LEFT JOIN "osf_noderelation" ON "osf_noderelation"."parent_id" = "implicit_read"."node_id"
-                        WHERE "osf_noderelation"."is_node_link" IS FALSE
-                    ) SELECT * FROM implicit_read
+                        SELECT "osf_nodeclosure"."descendant_id"
+                        FROM "osf_nodeclosure"
+                        JOIN "osf_contributor" ON "osf_contributor"."node_id" = "osf_nodeclosure"."ancestor_id"
+                        WHERE "osf_contributor"."user_id" = %s
+                        AND "osf_contributor"."admin" is TRUE
                 )
-            '''], params=(user, ))
+            '''], params=(user, user))
 
         return qs
 
@@ -235,6 +195,30 @@ class AbstractNode(DirtyFieldsMixin, TypedModel, AddonModelMixin, IdentifierMixi
         'wiki_pages_current',
     }
 
+    # Node fields that trigger an update of the node's published preprints on save
+    PREPRINT_UPDATE_FIELDS = {
+        'title',
+        'description',
+        'is_public',
+        'is_deleted',
+        'node_license',
+        'preprint_file',
+        '_is_preprint_orphan',
+        'spam_status',
+        # Tag and institution changes only save the date of their log
+        'last_logged',
+    }
+
+    # Side effects of saving a node, and the fields that trigger each of them. None matches
+    # every field. See website.project.tasks.enqueue_node_update
+    UPDATE_ROUTES = {
+        'search': SEARCH_UPDATE_FIELDS | {'spam_status'},
+        'preprints': PREPRINT_UPDATE_FIELDS,
+        'spam': SPAM_CHECK_FIELDS | {'is_public'},
+        'descendants': {'node_license'},
+        'bans': None,
+    }
+
     # Fields that are writable by Node.update
     WRITABLE_WHITELIST = [
         'title',
@@ -248,25 +232,16 @@ class AbstractNode(DirtyFieldsMixin, TypedModel, AddonModelMixin, IdentifierMixi
     PRIVATE = 'private'
     PUBLIC = 'public'
 
-    LICENSE_QUERY = re.sub('\s+', ' ', '''WITH RECURSIVE ascendants AS (
-            SELECT
-                N.node_license_id,
-                R.parent_id
-            FROM "{noderelation}" AS R
-                JOIN "{abstractnode}" AS N ON N.id = R.parent_id
-            WHERE R.is_node_link IS FALSE
-                AND R.child_id = %s
-        UNION ALL
-            SELECT
-                N.node_license_id,
-                R.parent_id
-            FROM ascendants AS D
-                JOIN "{noderelation}" AS R ON D.parent_id = R.child_id
-                JOIN "{abstractnode}" AS N ON N.id = R.parent_id
-            WHERE R.is_node_link IS FALSE
-            AND D.node_license_id IS NULL
-    ) SELECT {fields} FROM "{nodelicenserecord}"
-    WHERE id = (SELECT node_license_id FROM ascendants WHERE node_license_id IS NOT NULL) LIMIT 1;''')
+    LICENSE_QUERY = re.sub('\s+', ' ', '''SELECT {fields} FROM "{nodelicenserecord}"
+    WHERE id = (
+        SELECT N.node_license_id
+        FROM "{nodeclosure}" AS C
+            JOIN "{abstractnode}" AS N ON N.id = C.ancestor_id
+        WHERE C.descendant_id = %s
+            AND N.node_license_id IS NOT NULL
+        ORDER BY C.depth
+        LIMIT 1
+    ) LIMIT 1;''')
 
     affiliated_institutions = models.ManyToManyField('Institution', related_name='nodes')
     category = models.CharField(max_length=255,
@@ -682,20 +657,20 @@ class AbstractNode(DirtyFieldsMixin, TypedModel, AddonModelMixin, IdentifierMixi
         return csl
 
     @classmethod
-    def bulk_update_search(cls, nodes, index=None):
+    def bulk_update_search(cls, nodes, index=None, saved_fields=None):
         from website import search
         try:
-            serialize = functools.partial(search.search.update_node, index=index, bulk=True, async=False)
+            serialize = functools.partial(search.search.update_node, index=index, bulk=True, async=False, saved_fields=saved_fields)
             search.search.bulk_update_nodes(serialize, nodes, index=index)
         except search.exceptions.SearchUnavailableError as e:
             logger.exception(e)
             log_exception()
 
-    def update_search(self):
+    def update_search(self, saved_fields=None):
         from website import search
 
         try:
-            search.search.update_node(self, bulk=False, async=True)
+            search.search.update_node(self, bulk=False, async=True, saved_fields=saved_fields)
         except search.exceptions.SearchUnavailableError as e:
             logger.exception(e)
             log_exception()
@@ -858,12 +833,12 @@ class AbstractNode(DirtyFieldsMixin, TypedModel, AddonModelMixin, IdentifierMixi
         return False
 
     def is_admin_parent(self, user):
-        if self.has_permission(user, 'admin', check_parent=False):
-            return True
-        parent = self.parent_node
-        if parent:
-            return parent.is_admin_parent(user)
-        return False
+        if not user:
+            return False
+        return user.contributor_set.filter(
+            Q(node_id=self.pk) | Q(node_id__in=NodeClosure.objects.filter(descendant_id=self.pk).values('ancestor_id')),
+            admin=True,
+        ).exists()
 
     def find_readable_descendants(self, auth):
         """ Returns a generator of first descendant node(s) readable by <user>
@@ -882,9 +857,13 @@ class AbstractNode(DirtyFieldsMixin, TypedModel, AddonModelMixin, IdentifierMixi
 
     @property
     def parents(self):
-        if self.parent_node:
-            return [self.parent_node] + self.parent_node.parents
-        return []
+        """Ancestors of this node, nearest first."""
+        if not self.pk:
+            return []
+        return [
+            closure.ancestor for closure in
+            NodeClosure.objects.filter(descendant_id=self.pk).order_by('depth').select_related('ancestor')
+        ]
 
     @property
     def admin_contributor_ids(self):
@@ -997,10 +976,14 @@ class AbstractNode(DirtyFieldsMixin, TypedModel, AddonModelMixin, IdentifierMixi
     def license(self):
         if self.node_license_id:
             return self.node_license
+        return self._inherited_license
+
+    @shared_cached_property
+    def _inherited_license(self):
         with connection.cursor() as cursor:
             cursor.execute(self.LICENSE_QUERY.format(
                 abstractnode=AbstractNode._meta.db_table,
-                noderelation=NodeRelation._meta.db_table,
+                nodeclosure=NodeClosure._meta.db_table,
                 nodelicenserecord=NodeLicenseRecord._meta.db_table,
                 fields=', '.join('"{}"."{}"'.format(NodeLicenseRecord._meta.db_table, f.column) for f in NodeLicenseRecord._meta.concrete_fields)
             ), [self.id])
@@ -1444,6 +1427,7 @@ class AbstractNode(DirtyFieldsMixin, TypedModel, AddonModelMixin, IdentifierMixi
         old_index = contributor_ids.index(contributor.id)
         contributor_ids.insert(index, contributor_ids.pop(old_index))
         self.set_contributor_order(contributor_ids)
+        invalidate_node_cached_properties([self.pk])
         self.add_log(
             action=NodeLog.CONTRIB_REORDERED,
             params={
@@ -1580,57 +1564,26 @@ class AbstractNode(DirtyFieldsMixin, TypedModel, AddonModelMixin, IdentifierMixi
     def private_links_active(self):
         return self.private_links.filter(is_deleted=False)
 
-    @property
+    @shared_cached_property
     def private_link_keys_active(self):
-        return self.private_links.filter(is_deleted=False).values_list('key', flat=True)
+        return list(self.private_links.filter(is_deleted=False).values_list('key', flat=True))
 
     @property
     def private_link_keys_deleted(self):
         return self.private_links.filter(is_deleted=True).values_list('key', flat=True)
 
     def get_root(self):
-        sql = """
-            WITH RECURSIVE ascendants AS (
-              SELECT
-                parent_id,
-                child_id,
-                1 AS LEVEL,
-                ARRAY[child_id] as cids
-              FROM %s
-              WHERE is_node_link IS FALSE and child_id = %s
-              UNION ALL
-              SELECT
-                S.parent_id,
-                D.child_id,
-                D.level + 1,
-                D.cids || S.child_id
-              FROM ascendants AS D
-                JOIN %s AS S
-                  ON D.parent_id = S.child_id
-              WHERE S.is_node_link IS FALSE
-                AND %s = ANY(cids)
-            ) SELECT parent_id
-              FROM ascendants
-              WHERE child_id = %s
-              ORDER BY level DESC
-              LIMIT 1;
-        """
-        with connection.cursor() as cursor:
-            node_relation_table = AsIs(NodeRelation._meta.db_table)
-            cursor.execute(sql, [node_relation_table, self.pk, node_relation_table, self.pk, self.pk])
-            res = cursor.fetchone()
-            if res:
-                return AbstractNode.objects.get(pk=res[0])
-            return self
+        furthest = NodeClosure.objects.filter(descendant_id=self.pk).order_by('-depth').select_related('ancestor').first()
+        if furthest:
+            return furthest.ancestor
+        return self
 
     def find_readable_antecedent(self, auth):
         """ Returns first antecendant node readable by <user>.
         """
-        next_parent = self.parent_node
-        while next_parent:
-            if next_parent.can_view(auth):
-                return next_parent
-            next_parent = next_parent.parent_node
+        for parent in self.parents:
+            if parent.can_view(auth):
+                return parent
 
     def copy_contributors_from(self, node):
         """Copies the contibutors from node (including permissions and visibility) into this node."""
@@ -1641,13 +1594,18 @@ class AbstractNode(DirtyFieldsMixin, TypedModel, AddonModelMixin, IdentifierMixi
             contribs.append(contrib)
         Contributor.objects.bulk_create(contribs)
 
-    def register_node(self, schema, auth, data, parent=None):
-        """Make a frozen copy of a node.
+    def register_node(self, schema, auth, data, parent=None, archive=True):
+        """Make a frozen copy of a node and its primary descendants.
+
+        Registrations are saved one at a time, while their relations, contributors, tags,
+        institutions and schema are copied in bulk for the whole tree.
 
         :param schema: Schema object
         :param auth: All the auth information including user, API key.
         :param data: Form data
         :param parent Node: parent registration of registration to be created
+        :param bool archive: Archive the registration tree once it is created. Pass False
+            to call ``Registration.start_archive`` after committing instead.
         """
         # NOTE: Admins can register child nodes even if they don't have write access them
         if not self.can_edit(auth=auth) and not self.is_admin_parent(user=auth.user):
@@ -1657,78 +1615,93 @@ class AbstractNode(DirtyFieldsMixin, TypedModel, AddonModelMixin, IdentifierMixi
             )
         if self.is_collection:
             raise NodeStateError('Folders may not be registered')
-        original = self
 
         # Note: Cloning a node will clone each node wiki page version and add it to
         # `registered.wiki_pages_current` and `registered.wiki_pages_versions`.
-        if original.is_deleted:
+        if self.is_deleted:
             raise NodeStateError('Cannot register deleted node.')
 
-        registered = original.clone()
-        registered.recast('osf.registration')
+        def can_register(node, permissions):
+            if not (permissions[WRITE] or permissions[ADMIN]):
+                raise PermissionsError(
+                    'User {} does not have permission '
+                    'to register this node'.format(auth.user._id)
+                )
+            return True
 
-        registered.registered_date = timezone.now()
-        registered.registered_user = auth.user
-        registered.registered_from = original
-        if not registered.registered_meta:
-            registered.registered_meta = {}
-        registered.registered_meta[schema._id] = data
+        originals, relations = self._get_subtree(auth.user, can_register)
 
-        registered.forked_from = self.forked_from
-        registered.creator = self.creator
-        registered.node_license = original.license.copy() if original.license else None
-        registered.wiki_private_uuids = {}
+        # Parents come first, so the root registration exists before its components
+        when = timezone.now()
+        registrations = {}
+        for original in originals:
+            registered = original.clone()
+            registered.recast('osf.registration')
+
+            registered.registered_date = when
+            registered.registered_user = auth.user
+            registered.registered_from = original
+            if not registered.registered_meta:
+                registered.registered_meta = {}
+            registered.registered_meta[schema._id] = data
+
+            registered.forked_from_id = original.forked_from_id
+            registered.creator_id = original.creator_id
+            registered.node_license = original.license.copy() if original.license else None
+            registered.wiki_private_uuids = {}
+            registered.is_public = False
+
+            if original is self:
+                # Computed on save, unless registering under `parent`
+                registered.root = parent.root if parent else None
+            else:
+                registered.root = registrations[self.pk].root
+            registered.save()
+            registrations[original.pk] = registered
 
-        # Need to save here in order to set many-to-many fields
-        registered.save()
+        if parent:
+            node_relation = NodeRelation.objects.get(parent=parent.registered_from, child=self)
+            NodeRelation.objects.get_or_create(_order=node_relation._order, parent=parent, child=registrations[self.pk])
 
-        registered.registered_schema.add(schema)
-        registered.copy_contributors_from(self)
-        registered.tags.add(*self.all_tags.values_list('pk', flat=True))
-        registered.affiliated_institutions.add(*self.affiliated_institutions.values_list('pk', flat=True))
+        copy_node_relations(relations, registrations)
+        copy_many_to_many(AbstractNode, 'tags', registrations)
+        copy_many_to_many(AbstractNode, 'affiliated_institutions', registrations)
+        copy_many_to_many(type(registrations[self.pk]), 'registered_schema', registrations, related_ids=[schema.pk])
 
-        # Clone each log from the original node for this registration.
-        self.clone_logs(registered)
+        contributors = list(Contributor.objects.filter(node_id__in=registrations.keys()).order_by('node_id', '_order'))
+        for contributor in contributors:
+            contributor.id = None
+            contributor.node_id = registrations[contributor.node_id].pk
+        Contributor.objects.bulk_create(contributors)
 
-        registered.is_public = False
         # Copy unclaimed records to unregistered users for parent
-        registered.copy_unclaimed_records()
-
-        if parent:
-            node_relation = NodeRelation.objects.get(parent=parent.registered_from, child=original)
-            NodeRelation.objects.get_or_create(_order=node_relation._order, parent=parent, child=registered)
-
-        # After register callback
-        for addon in original.get_addons():
-            _, message = addon.after_register(original, registered, auth.user)
-            if message:
-                status.push_status_message(message, kind='info', trust=False)
-
-        for node_relation in original.node_relations.filter(child__is_deleted=False):
-            node_contained = node_relation.child
-            # Register child nodes
-            if not node_relation.is_node_link:
-                registered_child = node_contained.register_node(  # noqa
-                    schema=schema,
-                    auth=auth,
-                    data=data,
-                    parent=registered,
-                )
-            else:
-                # Copy linked nodes
-                NodeRelation.objects.get_or_create(
-                    is_node_link=True,
-                    parent=registered,
-                    child=node_contained
-                )
+        unregistered = {}
+        for contributor in Contributor.objects.filter(
+            node_id__in=registrations.keys(), user__is_registered=False
+        ).select_related('user'):
+            user = unregistered.get(contributor.user_id, contributor.user)
+            record = user.unclaimed_records.get(registrations[contributor.node_id].registered_from._id)
+            if record:
+                user.unclaimed_records[registrations[contributor.node_id]._id] = record
+                unregistered[user.pk] = user
+        for user in unregistered.values():
+            user.save()
 
-        registered.root = None  # Recompute root on save
+        # Clone each log from the original node for this registration.
+        NodeLog.clone_logs({original.pk: registrations[original.pk].pk for original in originals})
 
-        registered.save()
+        # After register callbacks
+        addons = self._get_addons_of(registrations.keys())
+        for original in originals:
+            for addon in addons[original.pk]:
+                _, message = addon.after_register(original, registrations[original.pk], auth.user)
+                if message:
+                    status.push_status_message(message, kind='info', trust=False)
 
-        if settings.ENABLE_ARCHIVER:
-            registered.refresh_from_db()
-            project_signals.after_create_registration.send(self, dst=registered, user=auth.user)
+        registered = registrations[self.pk]
+        registered.refresh_from_db()
+        if archive and settings.ENABLE_ARCHIVER:
+            registered.start_archive(auth.user)
 
         return registered
 
@@ -1831,12 +1804,17 @@ class AbstractNode(DirtyFieldsMixin, TypedModel, AddonModelMixin, IdentifierMixi
         return False
 
     # TODO: Optimize me (e.g. use bulk create)
-    def fork_node(self, auth, title=None, parent=None):
-        """Recursively fork a node.
+    def fork_node(self, auth, title=None, progress=None):
+        """Fork a node and each of its primary descendants that the user can read.
+
+        The subtree is computed up front. Forked nodes are saved one at a time so that
+        they go through the usual save hooks, while relations, tags, contributors and
+        logs are inserted in bulk.
 
         :param Auth auth: Consolidated authorization
         :param str title: Optional text to prepend to forked title
-        :param Node parent: Sets parent, should only be non-null when recursing
+        :param progress: Optional callable, called with the number of nodes completed
+            and the total number of nodes to fork
         :return: Forked node
         """
         Registration = apps.get_model('osf.Registration')
@@ -1849,130 +1827,166 @@ class AbstractNode(DirtyFieldsMixin, TypedModel, AddonModelMixin, IdentifierMixi
 
         when = timezone.now()
 
-        original = self
-
-        if original.is_deleted:
+        if self.is_deleted:
             raise NodeStateError('Cannot fork deleted node.')
 
-        # Note: Cloning a node will clone each node wiki page version and add it to
-        # `registered.wiki_pages_current` and `registered.wiki_pages_versions`.
-        forked = original.clone()
-        if isinstance(forked, Registration):
-            forked.recast('osf.node')
-
-        forked.is_fork = True
-        forked.forked_date = when
-        forked.forked_from = original
-        forked.creator = user
-        forked.node_license = original.license.copy() if original.license else None
-        forked.wiki_private_uuids = {}
-
-        # Forks default to private status
-        forked.is_public = False
-
-        # Need to save here in order to access m2m fields
-        forked.save()
-
-        if parent:
-            node_relation = NodeRelation.objects.get(parent=parent.forked_from, child=original)
-            NodeRelation.objects.get_or_create(_order=node_relation._order, parent=parent, child=forked)
-
-        forked.tags.add(*self.all_tags.values_list('pk', flat=True))
-        for node_relation in original.node_relations.filter(child__is_deleted=False):
-            node_contained = node_relation.child
-            # Fork child nodes
-            if not node_relation.is_node_link:
-                try:  # Catch the potential PermissionsError above
-                    forked_node = node_contained.fork_node(auth=auth, title='', parent=forked)
-                except PermissionsError:
-                    pass  # If this exception is thrown omit the node from the result set
-                    forked_node = None
-                if forked_node is not None:
-                    NodeRelation.objects.get_or_create(
-                        is_node_link=False,
-                        parent=forked,
-                        child=forked_node
-                    )
-                    forked_node.root = None
-                    forked_node.save()  # Recompute root on save()
-            else:
-                # Copy linked nodes
-                NodeRelation.objects.get_or_create(
-                    is_node_link=True,
-                    parent=forked,
-                    child=node_contained
-                )
-
-        if title is None:
-            forked.title = PREFIX + original.title
-        elif title == '':
-            forked.title = original.title
-        else:
-            forked.title = title
-
-        if len(forked.title) > 200:
-            forked.title = forked.title[:200]
-
-        forked.add_contributor(
-            contributor=user,
-            permissions=CREATOR_PERMISSIONS,
-            log=False,
-            save=False
+        originals, relations = self._get_subtree(
+            user, lambda node, permissions: node.is_public or permissions['read'] or permissions['admin']
         )
+        parents = {child_id: parent_id for parent_id, child_id, is_node_link, _ in relations if not is_node_link}
+        original_guids = {original.pk: original._id for original in originals}
+        if progress:
+            progress(0, len(originals))
+
+        # Parents come first, so the root fork exists before its components
+        forks = {}
+        for original in originals:
+            # Note: Cloning a node will clone each node wiki page version and add it to
+            # `registered.wiki_pages_current` and `registered.wiki_pages_versions`.
+            forked = original.clone()
+            if isinstance(forked, Registration):
+                forked.recast('osf.node')
+
+            forked.is_fork = True
+            forked.forked_date = when
+            forked.forked_from = original
+            forked.creator = user
+            forked.node_license = original.license.copy() if original.license else None
+            forked.wiki_private_uuids = {}
+
+            # Forks default to private status
+            forked.is_public = False
+
+            if original is not self or title == '':
+                forked.title = original.title
+            elif title is None:
+                forked.title = PREFIX + original.title
+            else:
+                forked.title = title
+
+            if len(forked.title) > 200:
+                forked.title = forked.title[:200]
+
+            # The root fork's root is computed on save
+            forked.root = forks[self.pk] if original is not self else None
+            forked.save()
+            forks[original.pk] = forked
+
+        copy_node_relations(relations, forks)
+        copy_many_to_many(AbstractNode, 'tags', forks)
+
+        # Creators are normally added on save, but not to recast registrations
+        fork_ids = [fork.pk for fork in forks.values()]
+        contributing = set(Contributor.objects.filter(user=user, node_id__in=fork_ids).values_list('node_id', flat=True))
+        Contributor.objects.bulk_create([
+            Contributor(user=user, node_id=pk, visible=True, read=True, write=True, admin=True, _order=0)
+            for pk in fork_ids if pk not in contributing
+        ])
+
+        NodeLog.objects.bulk_create([
+            NodeLog(
+                action=NodeLog.NODE_FORKED,
+                params={
+                    'parent_node': self.parent_id if original is self else original_guids[parents[original.pk]],
+                    'node': original._primary_key,
+                    'registration': forks[original.pk]._primary_key,  # TODO: Remove this in favor of 'fork'
+                    'fork': forks[original.pk]._primary_key,
+                },
+                user=user,
+                node=forks[original.pk],
+                original_node=original,
+                date=when,
+            )
+            for original in originals
+        ])
 
-        forked.root = None  # Recompute root on save
+        for original in originals:
+            forked = forks[original.pk]
+            # Need to call this after save for the notifications to be created with the _primary_key
+            project_signals.contributor_added.send(forked, contributor=user, auth=auth, email_template='false')
+            if user:
+                increment_user_activity_counters(user._primary_key, NodeLog.NODE_FORKED, when.isoformat())
 
-        forked.save()
+        # Clone each log from the original node for this fork.
+        NodeLog.clone_logs({original.pk: forks[original.pk].pk for original in originals})
 
-        # Need to call this after save for the notifications to be created with the _primary_key
-        project_signals.contributor_added.send(forked, contributor=user, auth=auth, email_template='false')
+        # After fork callbacks
+        addons = self._get_addons_of(forks.keys())
+        for count, original in enumerate(originals, 1):
+            for addon in addons[original.pk]:
+                addon.after_fork(original, forks[original.pk], user)
+            if progress:
+                progress(count, len(originals))
 
-        forked.add_log(
-            action=NodeLog.NODE_FORKED,
-            params={
-                'parent_node': original.parent_id,
-                'node': original._primary_key,
-                'registration': forked._primary_key,  # TODO: Remove this in favor of 'fork'
-                'fork': forked._primary_key,
-            },
-            auth=auth,
-            log_date=when,
-            save=False,
-        )
-
-        # Clone each log from the original node for this fork.
-        self.clone_logs(forked)
+        forked = forks[self.pk]
         forked.refresh_from_db()
+        return forked
 
-        # After fork callback
-        for addon in original.get_addons():
-            addon.after_fork(original, forked, user)
+    def _get_subtree(self, user, can_include):
+        """Return this node and its non-deleted primary descendants, parents before children,
+        and the relations among them as (parent_id, child_id, is_node_link, _order) tuples.
 
-        return forked
+        ``can_include(node, permissions)`` is called for each descendant with a dict of
+        ``user``'s contributor permissions on it, where 'admin' is also set if ``user``
+        administers any of its ancestors. Descendants it rejects are left out along with
+        their own descendants.
+        """
+        descendant_ids = list(NodeClosure.objects.filter(ancestor_id=self.pk).values_list('descendant_id', flat=True))
+        ancestor_ids = list(NodeClosure.objects.filter(descendant_id=self.pk).values_list('ancestor_id', flat=True))
+        nodes = AbstractNode.objects.in_bulk(descendant_ids)
+        relations = list(NodeRelation.objects.filter(
+            parent_id__in=[self.pk] + descendant_ids,
+            child__is_deleted=False,
+        ).order_by('parent_id', '_order').values_list('parent_id', 'child_id', 'is_node_link', '_order'))
+
+        permissions = {}
+        if user:
+            permissions = {
+                contributor['node_id']: contributor
+                for contributor in user.contributor_set.filter(
+                    node_id__in=[self.pk] + descendant_ids + ancestor_ids
+                ).values('node_id', READ, WRITE, ADMIN)
+            }
+        no_permissions = {READ: False, WRITE: False, ADMIN: False}
+        children = collections.defaultdict(list)
+        for parent_id, child_id, is_node_link, _ in relations:
+            if not is_node_link:
+                children[parent_id].append(child_id)
+
+        # Mirrors `has_permission(user, 'read')`, where admins of any ancestor can read
+        originals = [self]
+        queue = [(self.pk, any(permissions.get(pk, no_permissions)[ADMIN] for pk in ancestor_ids + [self.pk]))]
+        while queue:
+            parent_id, parent_admin = queue.pop(0)
+            for child_id in children[parent_id]:
+                child_permissions = dict(permissions.get(child_id, no_permissions))
+                child_permissions[ADMIN] = child_permissions[ADMIN] or parent_admin
+                if can_include(nodes[child_id], child_permissions):
+                    originals.append(nodes[child_id])
+                    queue.append((child_id, child_permissions[ADMIN]))
+
+        included = {node.pk for node in originals}
+        return originals, [
+            relation for relation in relations
+            if relation[0] in included and (relation[2] or relation[1] in included)
+        ]
+
+    def _get_addons_of(self, node_ids):
+        """Return the enabled add-on settings of each of ``node_ids`` in a dict keyed on node id,
+        loading each add-on's settings for all of the nodes at once.
+        """
+        addons = collections.defaultdict(list)
+        for config in self.ADDONS_AVAILABLE:
+            settings_model = self._settings_model(config.short_name, config=config)
+            if not settings_model:
+                continue
+            for addon in settings_model.objects.filter(owner_id__in=node_ids, deleted=False):
+                addons[addon.owner_id].append(addon)
+        return addons
 
-    def clone_logs(self, node, page_size=100):
-        paginator = Paginator(self.logs.order_by('pk').all(), page_size)
-        for page_num in paginator.page_range:
-            page = paginator.page(page_num)
-            # Instantiate NodeLogs "manually"
-            # because BaseModel#clone() is too slow for large projects
-            logs_to_create = [
-                NodeLog(
-                    _id=bson.ObjectId(),
-                    action=log.action,
-                    date=log.date,
-                    params=log.params,
-                    should_hide=log.should_hide,
-                    foreign_user=log.foreign_user,
-                    # Set foreign keys, not their objects
-                    # to speed things up
-                    node_id=node.pk,
-                    user_id=log.user_id,
-                    original_node_id=log.original_node_id
-                )
-                for log in page
-            ]
-            NodeLog.objects.bulk_create(logs_to_create)
+    def clone_logs(self, node):
+        """Copy each of this node's logs to ``node``. Returns the number of logs copied."""
+        return NodeLog.clone_logs({self.pk: node.pk})
 
     def use_as_template(self, auth, changes=None, top_level=True, parent=None):
         """Create a new project, using an existing project as a template.
@@ -2225,6 +2239,7 @@ class AbstractNode(DirtyFieldsMixin, TypedModel, AddonModelMixin, IdentifierMixi
                     each.id for each in sorted(self.contributor_set.all(), key=lambda c: user_ids.index(c.user._id))
                 ]
                 self.set_contributor_order(sorted_contrib_ids)
+                invalidate_node_cached_properties([self.pk])
                 self.add_log(
                     action=NodeLog.CONTRIB_REORDERED,
                     params={
@@ -2317,19 +2332,13 @@ class AbstractNode(DirtyFieldsMixin, TypedModel, AddonModelMixin, IdentifierMixi
         saved_fields = self.get_dirty_fields(check_relationship=True) or []
         ret = super(AbstractNode, self).save(*args, **kwargs)
         if saved_fields:
+            if not first_save:
+                invalidate_node_cached_properties([self.pk], descendants='node_license' in saved_fields)
             self.on_update(first_save, saved_fields)
 
-        if 'node_license' in saved_fields:
-            children = list(self.descendants.filter(node_license=None, is_public=True, is_deleted=False))
-            while len(children):
-                batch = children[:99]
-                self.bulk_update_search(batch)
-                children = children[99:]
-
         return ret
 
     def on_update(self, first_save, saved_fields):
-        User = apps.get_model('osf.OSFUser')
         request, user_id = get_request_and_user_id()
         request_headers = {}
         if not isinstance(request, DummyRequest):
@@ -2338,20 +2347,7 @@ class AbstractNode(DirtyFieldsMixin, TypedModel, AddonModelMixin, IdentifierMixi
                 for k, v in get_headers_from_request(request).items()
                 if isinstance(v, basestring)
             }
-        enqueue_task(node_tasks.on_node_updated.s(self._id, user_id, first_save, saved_fields, request_headers))
-
-        if self.preprint_file:
-            # avoid circular imports
-            from website.preprints.tasks import on_preprint_updated
-            PreprintService = apps.get_model('osf.PreprintService')
-            # .preprints wouldn't return a single deleted preprint
-            for preprint in PreprintService.objects.filter(node_id=self.id, is_published=True):
-                enqueue_task(on_preprint_updated.s(preprint._id))
-
-        user = User.load(user_id)
-        if user and self.check_spam(user, saved_fields, request_headers):
-            # Specifically call the super class save method to avoid recursion into model save method.
-            super(AbstractNode, self).save()
+        node_tasks.enqueue_node_update(self, user_id, first_save, saved_fields, request_headers)
 
     def _get_spam_content(self, saved_fields):
         NodeWikiPage = apps.get_model('addons_wiki.NodeWikiPage')
@@ -2979,7 +2975,117 @@ class Collection(AbstractNode):
         return super(Collection, self).save(*args, **kwargs)
 
 
+def copy_node_relations(relations, copies):
+    """Recreate ``relations``, (parent_id, child_id, is_node_link, _order) tuples between
+    the keys of ``copies``, among the copied nodes that are its values. Node links keep
+    pointing at their original child.
+    """
+    NodeRelation.objects.bulk_create([
+        NodeRelation(
+            parent=copies[parent_id],
+            child_id=child_id if is_node_link else copies[child_id].pk,
+            is_node_link=is_node_link,
+            _order=order,
+        )
+        for parent_id, child_id, is_node_link, order in relations
+    ])
+    # bulk_create skips the NodeRelation signal handlers that maintain the closure table
+    parents = {child_id: parent_id for parent_id, child_id, is_node_link, _ in relations if not is_node_link}
+    closure = []
+    for node_id in parents:
+        ancestor_id, depth = parents[node_id], 1
+        while ancestor_id is not None:
+            closure.append(NodeClosure(ancestor=copies[ancestor_id], descendant=copies[node_id], depth=depth))
+            ancestor_id, depth = parents.get(ancestor_id), depth + 1
+    NodeClosure.objects.bulk_create(closure)
+
+
+def copy_many_to_many(model, field_name, copies, related_ids=None):
+    """Copy the rows of the ``field_name`` many-to-many field of each node in the keys of
+    ``copies`` to the copied node it maps to. If ``related_ids`` is given, each copy is
+    related to those ids instead.
+    """
+    field = model._meta.get_field(field_name)
+    through = field.remote_field.through
+    source = '{}_id'.format(field.m2m_field_name())
+    target = '{}_id'.format(field.m2m_reverse_field_name())
+    if related_ids is not None:
+        rows = [(node_id, target_id) for node_id in copies for target_id in related_ids]
+    else:
+        rows = through.objects.filter(**{
+            '{}__in'.format(source): copies.keys()
+        }).order_by('pk').values_list(source, target)
+    through.objects.bulk_create([
+        through(**{source: copies[node_id].pk, target: target_id})
+        for node_id, target_id in rows
+    ])
+
+
+def invalidate_node_cached_properties(node_ids, descendants=False):
+    """Invalidate the shared cached properties of the given nodes and, optionally, of
+    all their descendants, whose inherited values (e.g. license) derive from them.
+    """
+    if get_shared_cache() is None or not node_ids:
+        return
+    node_ids = list(node_ids)
+    if descendants:
+        node_ids.extend(NodeClosure.objects.filter(ancestor_id__in=node_ids).values_list('descendant_id', flat=True))
+    invalidate_cached_properties(AbstractNode, node_ids)
+
+
 ##### Signal listeners #####
+@receiver(post_save, sender=NodeLicenseRecord)
+def invalidate_license_record_nodes(sender, instance, created, raw=False, **kwargs):
+    if raw or created or get_shared_cache() is None:
+        return
+    invalidate_node_cached_properties(instance.nodes.values_list('id', flat=True), descendants=True)
+
+
+@receiver(post_save, sender=NodeRelation)
+@receiver(post_delete, sender=NodeRelation)
+def invalidate_node_relation_descendants(sender, instance, raw=False, **kwargs):
+    if raw or instance.is_node_link:
+        return
+    invalidate_node_cached_properties([instance.child_id], descendants=True)
+
+
+@receiver(post_save, sender=PrivateLink)
+def invalidate_private_link_nodes(sender, instance, created, raw=False, **kwargs):
+    if raw or created or get_shared_cache() is None:
+        return
+    invalidate_node_cached_properties(instance.nodes.values_list('id', flat=True))
+
+
+@receiver(m2m_changed, sender=PrivateLink.nodes.through)
+def invalidate_private_link_node_changes(sender, instance, action, reverse, model, pk_set, **kwargs):
+    if reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            invalidate_node_cached_properties([instance.pk])
+    elif action in ('post_add', 'post_remove'):
+        invalidate_node_cached_properties(pk_set)
+    elif action == 'pre_clear' and get_shared_cache() is not None:
+        invalidate_node_cached_properties(instance.nodes.values_list('id', flat=True))
+
+
+@receiver(post_save, sender=Contributor)
+@receiver(post_delete, sender=Contributor)
+def invalidate_contributor_nodes(sender, instance, raw=False, **kwargs):
+    # Permissions on a node also grant access to its descendants, e.g. through admin parents
+    if raw:
+        return
+    invalidate_node_cached_properties([instance.node_id], descendants=True)
+
+
+@receiver(post_save, sender=Identifier)
+@receiver(post_delete, sender=Identifier)
+def invalidate_identifier_node(sender, instance, raw=False, **kwargs):
+    # Node citations include the node's DOI
+    if raw or get_shared_cache() is None:
+        return
+    if instance.content_type_id == ContentType.objects.get_for_model(AbstractNode).id:
+        invalidate_node_cached_properties([instance.object_id])
+
+
 @receiver(post_save, sender=Collection)
 @receiver(post_save, sender=Node)
 @receiver(post_save, sender='osf.QuickFilesNode')
@@ -1,4 +1,6 @@
-from django.db import models
+from django.db import connection, models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 
 from .base import BaseModel, ObjectIDMixin
 
@@ -25,3 +27,73 @@ class NodeRelation(ObjectIDMixin, BaseModel):
         index_together = (
             ('is_node_link', 'child', 'parent'),
         )
+
+
+class NodeClosure(models.Model):
+    """Transitive closure of the primary (non node link) node hierarchy.
+
+    One row exists for every (ancestor, descendant) pair, where ``depth`` is the
+    number of ``NodeRelation`` hops between them. Nodes are not their own ancestors,
+    so a root with no components has no rows. Rows are maintained by the
+    ``NodeRelation`` signal handlers below; never write to this table directly.
+    """
+    ancestor = models.ForeignKey('AbstractNode', related_name='+', on_delete=models.CASCADE)
+    descendant = models.ForeignKey('AbstractNode', related_name='+', on_delete=models.CASCADE)
+    depth = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ('ancestor', 'descendant')
+        index_together = (
+            ('descendant', 'depth', 'ancestor'),
+        )
+
+    def __unicode__(self):
+        return 'ancestor={}, descendant={}, depth={}'.format(self.ancestor_id, self.descendant_id, self.depth)
+
+    @classmethod
+    def link(cls, parent_id, child_id):
+        """Connect every ancestor of ``parent_id`` (inclusive) to every descendant of
+        ``child_id`` (inclusive).
+        """
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO "{table}" (ancestor_id, descendant_id, depth)
+                SELECT A.ancestor_id, D.descendant_id, A.depth + D.depth + 1
+                FROM (
+                    SELECT ancestor_id, depth FROM "{table}" WHERE descendant_id = %(parent)s
+                    UNION ALL SELECT %(parent)s, 0
+                ) AS A CROSS JOIN (
+                    SELECT descendant_id, depth FROM "{table}" WHERE ancestor_id = %(child)s
+                    UNION ALL SELECT %(child)s, 0
+                ) AS D
+                ON CONFLICT (ancestor_id, descendant_id) DO NOTHING;
+            """.format(table=cls._meta.db_table), {'parent': parent_id, 'child': child_id})
+
+    @classmethod
+    def unlink(cls, parent_id, child_id):
+        """Remove every path that passes through the ``parent_id`` -> ``child_id`` edge."""
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                DELETE FROM "{table}"
+                WHERE ancestor_id IN (
+                    SELECT ancestor_id FROM "{table}" WHERE descendant_id = %(parent)s
+                    UNION ALL SELECT %(parent)s
+                ) AND descendant_id IN (
+                    SELECT descendant_id FROM "{table}" WHERE ancestor_id = %(child)s
+                    UNION ALL SELECT %(child)s
+                );
+            """.format(table=cls._meta.db_table), {'parent': parent_id, 'child': child_id})
+
+
+@receiver(post_save, sender=NodeRelation)
+def add_node_closure(sender, instance, created, raw=False, **kwargs):
+    if raw or instance.is_node_link:
+        return
+    NodeClosure.link(instance.parent_id, instance.child_id)
+
+
+@receiver(post_delete, sender=NodeRelation)
+def remove_node_closure(sender, instance, **kwargs):
+    if instance.is_node_link:
+        return
+    NodeClosure.unlink(instance.parent_id, instance.child_id)
@@ -1,13 +1,18 @@
+import logging
+import time
+
 from include import IncludeManager
 
 from django.apps import apps
-from django.db import models
+from django.db import connection, models
 from django.utils import timezone
 from osf.models.base import BaseModel, ObjectIDMixin
 from osf.utils.datetime_aware_jsonfield import DateTimeAwareJSONField
 from osf.utils.fields import NonNaiveDateTimeField
 from website.util import api_v2_url
 
+logger = logging.getLogger(__name__)
+
 
 class NodeLog(ObjectIDMixin, BaseModel):
     FIELD_ALIASES = {
@@ -175,3 +180,35 @@ class NodeLog(ObjectIDMixin, BaseModel):
 
     def _natural_key(self):
         return self._id
+
+    @classmethod
+    def clone_logs(cls, node_ids):
+        """Copy the logs of each node whose id is a key of ``node_ids`` to the node whose id it
+        maps to, e.g. a fork or registration. Returns the number of logs copied.
+
+        Logs are copied by a single ``INSERT ... SELECT``, so they never leave the database.
+        New object ids are made up of the current timestamp and 16 random hex digits, like
+        those from ``bson.ObjectId``.
+        """
+        if not node_ids:
+            return 0
+        start = time.time()
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO "{table}" (_id, action, date, params, should_hide, foreign_user,
+                                       node_id, user_id, original_node_id, created, modified)
+                SELECT
+                    lpad(to_hex(extract(EPOCH FROM NOW())::int), 8, '0') || substr(md5(random()::text || L.id::text), 1, 16),
+                    L.action, L.date, L.params, L.should_hide, L.foreign_user,
+                    N.clone_id, L.user_id, L.original_node_id, NOW(), NOW()
+                FROM "{table}" AS L
+                    JOIN (SELECT unnest(%s::int[]) AS node_id, unnest(%s::int[]) AS clone_id) AS N
+                    ON L.node_id = N.node_id
+                ORDER BY L.id;
+            """.format(table=cls._meta.db_table), [list(node_ids.keys()), list(node_ids.values())])
+            count = cursor.rowcount
+        elapsed = time.time() - start
+        logger.info('Cloned {} logs of {} nodes in {:.2f}s ({:.0f} logs/s)'.format(
+            count, len(node_ids), elapsed, count / elapsed if elapsed else count
+        ))
+        return count
@@ -91,3 +91,8 @@ class NotificationDigest(ObjectIDMixin, BaseModel):
     message = models.TextField()
     # TODO: Could this be a m2m with or without an order field?
     node_lineage = ArrayField(models.CharField(max_length=5))
+
+    class Meta:
+        index_together = (
+            ('send_type', 'user'),
+        )
@@ -4,6 +4,8 @@ import uuid
 from website.util import api_v2_url
 
 from django.db import models
+from django.db.models.signals import post_save
+from django.dispatch import receiver
 from osf.models import base
 from website.security import random_string
 
@@ -69,6 +71,7 @@ class ApiOAuth2Application(base.ObjectIDMixin, base.BaseModel):
         client = cas.get_client()
         # Will raise a CasHttpError if deletion fails, which will also stop setting of active=False.
         resp = client.revoke_application_tokens(self.client_id, self.client_secret)  # noqa
+        cas.invalidate_profiles()
 
         self.is_active = False
 
@@ -83,6 +86,7 @@ class ApiOAuth2Application(base.ObjectIDMixin, base.BaseModel):
         """
         client = cas.get_client()
         client.revoke_application_tokens(self.client_id, self.client_secret)
+        cas.invalidate_profiles()
         self.client_secret = generate_client_secret()
 
         if save:
@@ -171,3 +175,10 @@ class ApiOAuth2PersonalToken(base.ObjectIDMixin, base.BaseModel):
     # used by django and DRF
     def get_absolute_url(self):
         return self.absolute_api_v2_url
+
+
+@receiver(post_save, sender=ApiOAuth2PersonalToken)
+def invalidate_personal_token_profile(sender, instance, created, raw=False, **kwargs):
+    # Scopes or active state may have changed, so CAS must be asked again
+    if not created:
+        cas.invalidate_profile(instance.token_id)
@@ -10,6 +10,7 @@ from framework.auth import Auth
 from framework.exceptions import PermissionsError
 from osf.utils.fields import NonNaiveDateTimeField
 from website.exceptions import NodeStateError
+from website.project import signals as project_signals
 from website.util import api_v2_url
 from website import settings
 
@@ -326,6 +327,13 @@ class Registration(AbstractNode):
             self.save()
         return retraction
 
+    def start_archive(self, user):
+        """Create archive jobs for this registration and its primary descendants, then start
+        archiving the tree. Jobs are created children first, so that the root's starts them all.
+        """
+        for registration in reversed(list(self.node_and_primary_descendants())):
+            project_signals.after_create_registration.send(registration.registered_from, dst=registration, user=user)
+
     def copy_unclaimed_records(self):
         """Copies unclaimed_records to unregistered contributors from the registered_from node"""
         registered_from_id = self.registered_from._id
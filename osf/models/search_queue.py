@@ -0,0 +1,56 @@
+from django.db import connection, models
+
+from osf.utils.fields import NonNaiveDateTimeField
+
+
+class PendingSearchUpdate(models.Model):
+    """A search document that needs to be reindexed.
+
+    Rows are deduplicated on (doc_type, doc_id), so a burst of saves of the same object
+    results in one reindex when ``website.search.elastic_search.flush_pending_updates``
+    next runs. ``version`` is bumped on every enqueue so that a flush only removes the
+    rows it actually processed.
+    """
+    NODE = 'node'
+    USER = 'user'
+    FILE = 'file'
+    DOC_TYPES = (
+        (NODE, 'Node'),
+        (USER, 'User'),
+        (FILE, 'File'),
+    )
+
+    doc_type = models.CharField(max_length=8, choices=DOC_TYPES)
+    doc_id = models.CharField(max_length=255)
+    reindex_files = models.BooleanField(default=False)
+    version = models.PositiveIntegerField(default=0)
+    created = NonNaiveDateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('doc_type', 'doc_id')
+
+    def __unicode__(self):
+        return '{}:{}'.format(self.doc_type, self.doc_id)
+
+    @classmethod
+    def enqueue(cls, doc_type, doc_id, reindex_files=False):
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO "{table}" (doc_type, doc_id, reindex_files, version, created)
+                VALUES (%s, %s, %s, 0, NOW())
+                ON CONFLICT (doc_type, doc_id) DO UPDATE SET
+                    reindex_files = "{table}".reindex_files OR EXCLUDED.reindex_files,
+                    version = "{table}".version + 1;
+            """.format(table=cls._meta.db_table), [doc_type, doc_id, reindex_files])
+
+    @classmethod
+    def acknowledge(cls, entries):
+        """Remove ``entries`` unless they were enqueued again since they were read."""
+        if not entries:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                DELETE FROM "{table}" AS Q
+                USING (SELECT unnest(%s::int[]) AS id, unnest(%s::int[]) AS version) AS D
+                WHERE Q.id = D.id AND Q.version = D.version;
+            """.format(table=cls._meta.db_table), [[entry.id for entry in entries], [entry.version for entry in entries]])
@@ -1,5 +1,14 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
 from osf.models.base import BaseModel, ObjectIDMixin
+from osf.utils.caching import delete_shared, get_shared_cache
 from osf.utils.datetime_aware_jsonfield import DateTimeAwareJSONField
+from website import settings
+
+
+def _user_id_cache_key(session_id):
+    return 'session_user:{}'.format(session_id)
 
 
 class Session(ObjectIDMixin, BaseModel):
@@ -12,3 +21,31 @@ class Session(ObjectIDMixin, BaseModel):
     @property
     def is_external_first_login(self):
         return 'auth_user_external_first_login' in self.data
+
+    @classmethod
+    def get_user_id(cls, session_id):
+        """Return the id of the user logged in to session `session_id`, or None.
+
+        Results are kept in the shared cache for `settings.SESSION_USER_CACHE_TIMEOUT`
+        seconds, and discarded when the session is saved or deleted.
+        """
+        cache = get_shared_cache()
+        if cache is None or not settings.SESSION_USER_CACHE_TIMEOUT:
+            session = cls.load(session_id)
+            return session.data.get('auth_user_id') if session else None
+
+        key = _user_id_cache_key(session_id)
+        user_id = cache.get(key)
+        if user_id is None:
+            session = cls.load(session_id)
+            user_id = (session.data.get('auth_user_id') if session else None) or ''
+            cache.set(key, user_id, settings.SESSION_USER_CACHE_TIMEOUT)
+        return user_id or None
+
+
+@receiver(post_save, sender=Session)
+@receiver(post_delete, sender=Session)
+def invalidate_session_user_id(sender, instance, **kwargs):
+    cache = get_shared_cache()
+    if cache is not None:
+        delete_shared(cache, [_user_id_cache_key(instance._id)])
@@ -0,0 +1,119 @@
+from django.db import connection, models
+from django.db.models import Count, Sum, Value
+from django.db.models.functions import Greatest
+
+from osf.utils.fields import NonNaiveDateTimeField
+
+
+LIVE_FILE_TYPE = 'osf.osfstoragefile'
+TRASHED_FILE_TYPE = 'osf.trashedfile'
+
+
+class NodeStorageUsage(models.Model):
+    """OSF Storage usage of a single node, not including its components.
+
+    ``file_count``, ``version_count`` and ``live_bytes`` cover the node's live files, and
+    ``trashed_bytes`` the versions of its deleted files. Versions with an unknown size count
+    as zero bytes. Rows are adjusted incrementally as versions are created and files are
+    deleted or restored, and recomputed from the file tables when files move between nodes.
+    Use ``get_subtree_usage`` for the usage of a node and all of its components.
+    """
+    node = models.OneToOneField('AbstractNode', primary_key=True, related_name='storage_usage', on_delete=models.CASCADE)
+    file_count = models.BigIntegerField(default=0)
+    version_count = models.BigIntegerField(default=0)
+    live_bytes = models.BigIntegerField(default=0)
+    trashed_bytes = models.BigIntegerField(default=0)
+    modified = NonNaiveDateTimeField(auto_now=True)
+
+    def __unicode__(self):
+        return '{}: {} live bytes, {} trashed bytes'.format(self.node_id, self.live_bytes, self.trashed_bytes)
+
+    @classmethod
+    def adjust(cls, node_id, file_count=0, version_count=0, live_bytes=0, trashed_bytes=0):
+        """Add the given deltas to the usage of ``node_id``."""
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO "{table}" (node_id, file_count, version_count, live_bytes, trashed_bytes, modified)
+                VALUES (%s, %s, %s, %s, %s, NOW())
+                ON CONFLICT (node_id) DO UPDATE SET
+                    file_count = "{table}".file_count + EXCLUDED.file_count,
+                    version_count = "{table}".version_count + EXCLUDED.version_count,
+                    live_bytes = "{table}".live_bytes + EXCLUDED.live_bytes,
+                    trashed_bytes = "{table}".trashed_bytes + EXCLUDED.trashed_bytes,
+                    modified = EXCLUDED.modified;
+            """.format(table=cls._meta.db_table), [node_id, file_count, version_count, live_bytes, trashed_bytes])
+
+    @classmethod
+    def adjust_for_trash(cls, file_node, restored=False):
+        """Move the versions of ``file_node`` from its node's live totals to its trashed
+        totals, or back when ``restored``.
+        """
+        totals = file_node.versions.aggregate(count=Count('id'), size=Sum(Greatest('size', Value(0))))
+        sign = 1 if restored else -1
+        size = totals['size'] or 0
+        cls.adjust(
+            file_node.node_id,
+            file_count=sign,
+            version_count=sign * totals['count'],
+            live_bytes=sign * size,
+            trashed_bytes=-sign * size,
+        )
+
+    @classmethod
+    def recompute(cls, node_ids):
+        """Recompute the usage of every node in ``node_ids`` from its files."""
+        from osf.models import BaseFileNode, FileVersion
+        node_ids = [node_id for node_id in set(node_ids) if node_id]
+        if not node_ids:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO "{table}" (node_id, file_count, version_count, live_bytes, trashed_bytes, modified)
+                SELECT N.id, COALESCE(U.file_count, 0), COALESCE(U.version_count, 0),
+                    COALESCE(U.live_bytes, 0), COALESCE(U.trashed_bytes, 0), NOW()
+                FROM unnest(%(node_ids)s::int[]) AS N(id)
+                LEFT JOIN (
+                    SELECT F.node_id,
+                        COUNT(DISTINCT F.id) FILTER (WHERE F.type = %(live)s) AS file_count,
+                        COUNT(V.id) FILTER (WHERE F.type = %(live)s) AS version_count,
+                        SUM(GREATEST(V.size, 0)) FILTER (WHERE F.type = %(live)s) AS live_bytes,
+                        SUM(GREATEST(V.size, 0)) FILTER (WHERE F.type = %(trashed)s) AS trashed_bytes
+                    FROM "{files}" AS F
+                        LEFT JOIN "{file_versions}" AS FV ON FV.basefilenode_id = F.id
+                        LEFT JOIN "{versions}" AS V ON V.id = FV.fileversion_id
+                    WHERE F.node_id = ANY(%(node_ids)s::int[])
+                        AND F.provider = 'osfstorage'
+                        AND F.type IN (%(live)s, %(trashed)s)
+                    GROUP BY F.node_id
+                ) AS U ON U.node_id = N.id
+                ON CONFLICT (node_id) DO UPDATE SET
+                    file_count = EXCLUDED.file_count,
+                    version_count = EXCLUDED.version_count,
+                    live_bytes = EXCLUDED.live_bytes,
+                    trashed_bytes = EXCLUDED.trashed_bytes,
+                    modified = EXCLUDED.modified;
+            """.format(
+                table=cls._meta.db_table,
+                files=BaseFileNode._meta.db_table,
+                file_versions=BaseFileNode.versions.through._meta.db_table,
+                versions=FileVersion._meta.db_table,
+            ), {'node_ids': node_ids, 'live': LIVE_FILE_TYPE, 'trashed': TRASHED_FILE_TYPE})
+
+    @classmethod
+    def get_subtree_usage(cls, node, components=None):
+        """Return the total usage of ``node`` and all of its components. If given, only the
+        components in the ``components`` queryset of nodes are counted.
+        """
+        from osf.models import NodeClosure
+        descendants = NodeClosure.objects.filter(ancestor_id=node.id).values('descendant_id')
+        if components is not None:
+            descendants = components.filter(id__in=descendants).values('id')
+        totals = cls.objects.filter(
+            models.Q(node_id=node.id) | models.Q(node_id__in=descendants)
+        ).aggregate(
+            file_count=Sum('file_count'),
+            version_count=Sum('version_count'),
+            live_bytes=Sum('live_bytes'),
+            trashed_bytes=Sum('trashed_bytes'),
+        )
+        return {key: value or 0 for key, value in totals.items()}
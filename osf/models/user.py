@@ -41,6 +41,7 @@ from osf.models.mixins import AddonModelMixin
 from osf.models.session import Session
 from osf.models.tag import Tag
 from osf.models.validators import validate_email, validate_social, validate_history_item
+from osf.utils.caching import invalidate_cached_properties
 from osf.utils.datetime_aware_jsonfield import DateTimeAwareJSONField
 from osf.utils.fields import NonNaiveDateTimeField, LowercaseEmailField
 from osf.utils.names import impute_names
@@ -132,6 +133,14 @@ class OSFUser(DirtyFieldsMixin, GuidMixin, BaseModel, AbstractBaseUser, Permissi
         'schools',
         'social',
     }
+    # User fields that appear in citations of the user's nodes
+    CITATION_NAME_FIELDS = {
+        'fullname',
+        'given_name',
+        'middle_names',
+        'family_name',
+        'suffix',
+    }
     TRACK_FIELDS = SEARCH_UPDATE_FIELDS.copy()
     TRACK_FIELDS.update({'password', 'last_login'})
 
@@ -806,6 +815,10 @@ class OSFUser(DirtyFieldsMixin, GuidMixin, BaseModel, AbstractBaseUser, Permissi
         if self.SEARCH_UPDATE_FIELDS.intersection(dirty_fields) and self.is_confirmed:
             self.update_search()
             self.update_search_nodes_contributors()
+        if self.CITATION_NAME_FIELDS.intersection(dirty_fields):
+            # Citations of the user's nodes include their name
+            from osf.models import AbstractNode
+            invalidate_cached_properties(AbstractNode, Contributor.objects.filter(user=self).values_list('node_id', flat=True))
         if 'fullname' in dirty_fields:
             from osf.models.quickfiles import get_quickfiles_project_title, QuickFilesNode
 
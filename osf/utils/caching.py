@@ -8,11 +8,19 @@ The property can also be safely set and deleted without interference.
 NOTE: Properties will *not* be cached if they return `None`. Use
 `django.utils.functional.cached_property` for properties that
 can return `None` and do not need a setter.
+
+`shared_cached_property` instead caches values across requests and processes in the
+Django cache named by `settings.CACHED_PROPERTY_BACKEND`. Keys include a per-object
+version stamp, and `invalidate_cached_properties` must be called whenever anything a
+shared property depends on changes.
 """
 from __future__ import unicode_literals
 
+import uuid
 from functools import wraps
 
+from website import settings
+
 # from https://github.com/etianen/django-optimizations/blob/master/src/optimizations/propertycache.py
 
 
@@ -65,3 +73,108 @@ class _CachedProperty(property):
 
 # Public name for the cached property decorator. Using a class as a decorator just looks plain ugly. :P
 cached_property = _CachedProperty
+
+
+_MISSING = object()
+
+
+def get_shared_cache():
+    """Return the cache backing `shared_cached_property`, or None if it is disabled."""
+    if not settings.CACHED_PROPERTY_BACKEND:
+        return None
+    from django.core.cache import caches
+    return caches[settings.CACHED_PROPERTY_BACKEND]
+
+
+def delete_shared(cache, keys):
+    """Delete `keys` from the shared `cache` now and again once the current transaction commits.
+
+    The second delete discards anything a concurrent request re-cached from the data as it
+    was before the commit.
+    """
+    from django.db import connection, transaction
+
+    keys = list(keys)
+    if not keys:
+        return
+    cache.delete_many(keys)
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def _version_key(model, pk):
+    return 'cached_property:{}:{}'.format(model._meta.concrete_model._meta.label_lower, pk)
+
+
+def _get_version(cache, obj):
+    key = _version_key(type(obj), obj.pk)
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(key, version, None):
+            version = cache.get(key) or version
+    return version
+
+
+def get_cache_version(obj):
+    """Return the shared cache version stamp of `obj`, or None if the cache is disabled.
+
+    Other caches may include the stamp in their keys to be invalidated along with `obj`.
+    """
+    cache = get_shared_cache()
+    if cache is None or obj.pk is None:
+        return None
+    return _get_version(cache, obj)
+
+
+def invalidate_cached_properties(model, pks):
+    """Discard the shared cached property values of the `model` instances with primary keys `pks`.
+
+    Rather than deleting every cached value, this drops the objects' version stamps, so the
+    next read starts a new version and stale values expire on their own.
+    """
+    cache = get_shared_cache()
+    if cache is None or not pks:
+        return
+    delete_shared(cache, [_version_key(model, pk) for pk in pks])
+
+
+class _SharedCachedProperty(property):
+    """A read-only property whose value is cached in a shared cache, keyed on the
+    object's model, primary key and version stamp.
+
+    Unlike `_CachedProperty`, values are not stored on the instance and `None` is cached.
+    Values must be picklable; querysets should be evaluated before they are returned.
+    """
+
+    def __init__(self, fget, timeout=None):
+        self._name = fget.__name__
+        self._timeout = timeout
+        super(_SharedCachedProperty, self).__init__(self._wrap_fget(fget), doc=fget.__doc__)
+
+    def _wrap_fget(self, fget):
+        @wraps(fget)
+        def do_fget(obj):
+            cache = get_shared_cache()
+            if cache is None or obj.pk is None:
+                return fget(obj)
+            key = '{}:{}:{}'.format(_version_key(type(obj), obj.pk), _get_version(cache, obj), self._name)
+            # Wrap values so that a cached `None` can be told apart from a miss
+            cached = cache.get(key, _MISSING)
+            if cached is not _MISSING:
+                return cached[0]
+            value = fget(obj)
+            cache.set(key, (value, ), self._timeout or settings.CACHED_PROPERTY_TIMEOUT)
+            return value
+
+        return do_fget
+
+
+def shared_cached_property(fget=None, timeout=None):
+    """Decorator for properties whose value is cached across requests, see `_SharedCachedProperty`.
+
+    Usable bare, `@shared_cached_property`, or with a timeout, `@shared_cached_property(timeout=60)`.
+    """
+    if fget is None:
+        return lambda fget: _SharedCachedProperty(fget, timeout=timeout)
+    return _SharedCachedProperty(fget, timeout=timeout)
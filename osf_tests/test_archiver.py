@@ -44,6 +44,7 @@ from website.util import waterbutler_api_url_for
 from website.util.sanitize import strip_html
 from osf.models import MetaSchema
 from addons.base.models import BaseStorageAddon
+from api_tests.utils import create_test_file, create_test_file_version
 
 from osf_tests import factories
 from tests.base import OsfTestCase, fake
@@ -150,6 +151,8 @@ FILE_TREE = {
     ],
 }
 
+FILE_TREE_FILES = [FILE_TREE['children'][0], FILE_TREE['children'][1]['children'][0]]
+
 WB_FILE_TREE = {
     'attributes': {
         'path': '/',
@@ -198,6 +201,9 @@ class MockAddon(object):
     def _get_file_tree(self, user, version):
         return FILE_TREE
 
+    def _iter_file_tree(self, user, version, workers=1):
+        return iter(FILE_TREE_FILES)
+
     def after_register(self, *args):
         return None, None
 
@@ -452,8 +458,36 @@ class TestStorageAddonBase(ArchiverTestCase):
         assert_false(any('/1234567' in url for url in requests_made))
         assert_false(any('/qwerty/asdfgh' in url for url in requests_made))
 
+    @httpretty.activate
+    def _test__iter_file_tree(self, addon_short_name):
+        requests_made = []
+        def callback(request, uri, headers):
+            requests_made.append(uri)
+            return (200, headers, json.dumps(self.get_resp(uri)))
+
+        for path in self.URLS:
+            url = waterbutler_api_url_for(
+                self.src._id,
+                addon_short_name,
+                meta=True,
+                path=path,
+                user=self.user,
+                view_only=True,
+                _internal=True,
+            )
+            httpretty.register_uri(httpretty.GET,
+                                   url,
+                                   body=callback,
+                                   content_type='applcation/json')
+        addon = self.src.get_or_add_addon(addon_short_name, auth=self.auth)
+        files = sorted(addon._iter_file_tree(user=self.user, workers=2), key=lambda f: f['path'])
+        assert_equal(files, FILE_TREE_FILES)
+        assert_equal(len(requests_made), 2)
+        assert_false(any('/1234567' in url for url in requests_made))
+
     def _test_addon(self, addon_short_name):
         self._test__get_file_tree(addon_short_name)
+        self._test__iter_file_tree(addon_short_name)
 
     # @pytest.mark.skip('Unskip when figshare addon is implemented')
     def test_addons(self):
@@ -482,18 +516,31 @@ class TestArchiverTasks(ArchiverTestCase):
             ]
         )
 
+    @use_fake_addons
     def test_stat_addon(self):
-        with mock.patch.object(BaseStorageAddon, '_get_file_tree') as mock_file_tree:
-            mock_file_tree.return_value = FILE_TREE
+        res = stat_addon('dropbox', self.archive_job._id)
+        assert_equal(res.target_name, 'dropbox')
+        assert_equal(res.disk_usage, 128 + 256)
+        assert_equal(res.num_files, 2)
+
+    def test_stat_addon_osfstorage(self):
+        root = self.src.get_addon('osfstorage').get_root()
+        test_file = create_test_file(self.src, self.user, filename='versioned', size=128)
+        create_test_file_version(test_file, self.user, size=512)
+        create_test_file(self.src, self.user, filename='nested', size=256, parent=root.append_folder('Folder'))
+        create_test_file(self.src, self.user, filename='deleted', size=1024).delete()
+
+        with mock.patch.object(BaseStorageAddon, '_iter_file_tree') as mock_iter_file_tree:
             res = stat_addon('osfstorage', self.archive_job._id)
+        assert_false(mock_iter_file_tree.called)
         assert_equal(res.target_name, 'osfstorage')
-        assert_equal(res.disk_usage, 128 + 256)
+        assert_equal(res.num_files, 2)
+        assert_equal(res.disk_usage, 512 + 256)
 
     @mock.patch('website.archiver.tasks.archive_addon.delay')
     def test_archive_node_pass(self, mock_archive_addon):
         settings.MAX_ARCHIVE_SIZE = 1024 ** 3
-        with mock.patch.object(BaseStorageAddon, '_get_file_tree') as mock_file_tree:
-            mock_file_tree.return_value = FILE_TREE
+        with mock.patch('addons.osfstorage.models.NodeSettings.get_file_stats', return_value=(2, 128 + 256)):
             results = [stat_addon(addon, self.archive_job._id) for addon in ['osfstorage']]
         with mock.patch.object(celery, 'group') as mock_group:
             archive_node(results, self.archive_job._id)
@@ -519,14 +566,9 @@ class TestArchiverTasks(ArchiverTestCase):
     def test_archive_node_does_not_archive_empty_addons(self, mock_archive_addon, mock_send):
         with mock.patch('osf.models.mixins.AddonModelMixin.get_addon') as mock_get_addon:
             mock_addon = MockAddon()
-            def empty_file_tree(user, version):
-                return {
-                    'path': '/',
-                    'kind': 'folder',
-                    'name': 'Fake',
-                    'children': []
-                }
-            setattr(mock_addon, '_get_file_tree', empty_file_tree)
+            def empty_file_tree(user, version, workers=1):
+                return iter([])
+            setattr(mock_addon, '_iter_file_tree', empty_file_tree)
             mock_get_addon.return_value = mock_addon
             results = [stat_addon(addon, self.archive_job._id) for addon in ['osfstorage']]
             archive_node(results, job_pk=self.archive_job._id)
@@ -539,9 +581,7 @@ class TestArchiverTasks(ArchiverTestCase):
         settings.MAX_ARCHIVE_SIZE = 100
         self.archive_job.initiator.add_system_tag(NO_ARCHIVE_LIMIT)
         self.archive_job.initiator.save()
-        with mock.patch.object(BaseStorageAddon, '_get_file_tree') as mock_file_tree:
-            mock_file_tree.return_value = FILE_TREE
-            results = [stat_addon(addon, self.archive_job._id) for addon in ['osfstorage', 'dropbox']]
+        results = [stat_addon(addon, self.archive_job._id) for addon in ['osfstorage', 'dropbox']]
         with mock.patch.object(celery, 'group') as mock_group:
             archive_node(results, self.archive_job._id)
         archive_dropbox_signature = archive_addon.si(
@@ -894,12 +934,6 @@ class TestArchiverUtils(ArchiverTestCase):
             call(**args_desk),
         ], any_order=True)
 
-    def test_aggregate_file_tree_metadata(self):
-        a_stat_result = archiver_utils.aggregate_file_tree_metadata('dropbox', FILE_TREE, self.user)
-        assert_equal(a_stat_result.disk_usage, 128 + 256)
-        assert_equal(a_stat_result.num_files, 2)
-        assert_equal(len(a_stat_result.targets), 2)
-
     @use_fake_addons
     def test_archive_provider_for(self):
         provider = self.src.get_addon(settings.ARCHIVE_PROVIDER)
@@ -979,6 +1013,51 @@ class TestArchiverUtils(ArchiverTestCase):
             archiver_utils.get_file_map(node)
             assert_equal(mock_get_file_tree.call_count, call_count)
 
+    def test_do_get_file_map_preserves_order(self):
+        file_tree = file_tree_factory(3, 3, 3)
+        file_map = archiver_utils._do_get_file_map(file_tree)
+        expected = []
+        stack = [file_tree]
+        while len(stack):
+            item = stack.pop(0)
+            if item['kind'] == 'file':
+                expected.append((item['extra']['hashes']['sha256'], item))
+            else:
+                stack = stack + item['children']
+        assert_equal(file_map, expected)
+
+    def test_file_map_cache_evicts_least_recently_used(self):
+        cache = archiver_utils.FileMapCache(max_size=2, timeout=60)
+        cache.set('a', [1])
+        cache.set('b', [2])
+        assert_equal(cache.get('a'), [1])
+        cache.set('c', [3])
+        assert_equal(len(cache), 2)
+        assert_is_none(cache.get('b'))
+        assert_equal(cache.get('a'), [1])
+        assert_equal(cache.get('c'), [3])
+
+    def test_file_map_cache_expires_entries(self):
+        cache = archiver_utils.FileMapCache(max_size=2, timeout=60)
+        with mock.patch('website.archiver.utils.time.time', return_value=1000):
+            cache.set('a', [1])
+        with mock.patch('website.archiver.utils.time.time', return_value=1059):
+            assert_equal(cache.get('a'), [1])
+        with mock.patch('website.archiver.utils.time.time', return_value=1061):
+            assert_is_none(cache.get('a'))
+        assert_equal(len(cache), 0)
+
+    def test_clear_file_map(self):
+        node = factories.NodeFactory()
+        comp = factories.NodeFactory(parent=node)
+        with mock.patch.object(BaseStorageAddon, '_get_file_tree') as mock_get_file_tree:
+            mock_get_file_tree.return_value = file_tree_factory(1, 1, 1)
+            list(archiver_utils.get_file_map(node))
+            assert_is_not_none(archiver_utils.file_map_cache.get(comp._id))
+            archiver_utils.clear_file_map(node)
+            assert_is_none(archiver_utils.file_map_cache.get(node._id))
+            assert_is_none(archiver_utils.file_map_cache.get(comp._id))
+
 
 class TestArchiverListeners(ArchiverTestCase):
 
@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+import os
+import tempfile
 import time
 import unittest
 import logging
@@ -15,8 +17,8 @@ from website import settings
 import website.search.search as search
 from website.search import elastic_search
 from website.search.util import build_query
-from website.search_migration.migrate import migrate
-from osf.models import Retraction, NodeLicense, Tag, QuickFilesNode
+from website.search_migration.migrate import migrate, load_checkpoint, save_checkpoint
+from osf.models import Retraction, NodeLicense, Tag, QuickFilesNode, PendingSearchUpdate
 from addons.osfstorage.models import OsfStorageFile
 
 from scripts.populate_institutions import main as populate_institutions
@@ -30,6 +32,8 @@ from tests.utils import mock_archive, run_celery_tasks
 TEST_INDEX = 'test'
 
 def query(term):
+    # Bulk indexing relies on the refresh interval rather than forcing a refresh
+    elastic_search.client().indices.refresh(index=elastic_search.INDEX)
     results = search.search(build_query(term), index=elastic_search.INDEX)
     return results
 
@@ -861,6 +865,30 @@ class TestSearchMigration(OsfTestCase):
             assert_equal(var[settings.ELASTIC_INDEX + '_v{}'.format(n + 1)]['aliases'].keys()[0], settings.ELASTIC_INDEX)
             assert not var.get(settings.ELASTIC_INDEX + '_v{}'.format(n))
 
+    def test_checkpoint_round_trip(self):
+        path = os.path.join(tempfile.mkdtemp(), 'checkpoint.json')
+        assert_is_none(load_checkpoint(path))
+        save_checkpoint(path, {'index': 'test_v2', 'completed': {'nodes': {0, 10000}}})
+        assert_equal(load_checkpoint(path), {'index': 'test_v2', 'completed': {'nodes': {0, 10000}}})
+
+    @mock.patch('website.search_migration.migrate.parallel_sql_migrate', return_value=0)
+    def test_parallel_migration_resumes_from_checkpoint(self, mock_migrate):
+        migrate(delete=False, remove=False, index=settings.ELASTIC_INDEX, app=self.app.app)
+        resumed_index = settings.ELASTIC_INDEX + '_v2'
+        search.create_index(index=resumed_index)
+        path = os.path.join(tempfile.mkdtemp(), 'checkpoint.json')
+        save_checkpoint(path, {'index': resumed_index, 'completed': {'nodes': {0}}})
+
+        migrate(delete=False, remove=False, index=settings.ELASTIC_INDEX, app=self.app.app, workers=2, checkpoint=path)
+
+        assert_equal(mock_migrate.call_count, 3)
+        for call in mock_migrate.call_args_list:
+            assert_equal(call[0][1], resumed_index)
+            assert_equal(call[1]['state']['completed']['nodes'], {0})
+        var = self.es.indices.get_aliases()
+        assert_equal(var[resumed_index]['aliases'].keys()[0], settings.ELASTIC_INDEX)
+        assert_false(os.path.exists(path))
+
     def test_migration_institutions(self):
         migrate(delete=True, index=settings.ELASTIC_INDEX, app=self.app.app)
         count_query = {}
@@ -879,6 +907,61 @@ class TestSearchMigration(OsfTestCase):
 
         assert_equal(institution_bucket_found, True)
 
+class TestPendingSearchUpdates(OsfTestCase):
+
+    def setUp(self):
+        super(TestPendingSearchUpdates, self).setUp()
+        search.delete_index(elastic_search.INDEX)
+        search.create_index(elastic_search.INDEX)
+        with run_celery_tasks():
+            self.project = factories.ProjectFactory(title='Jazz', is_public=True)
+
+    @mock.patch('website.search.search.settings.USE_CELERY', True)
+    def test_repeated_updates_are_coalesced(self):
+        for title in ('Blues', 'Soul', 'Funk'):
+            self.project.title = title
+            search.update_node(self.project, saved_fields=['title'])
+        search.update_node(self.project, saved_fields=['description'])
+
+        pending = PendingSearchUpdate.objects.get(doc_type=PendingSearchUpdate.NODE, doc_id=self.project._id)
+        assert_equal(pending.version, 3)
+        assert_true(pending.reindex_files)
+
+        self.project.save()
+        assert_equal(elastic_search.flush_pending_updates(), 1)
+        assert_false(PendingSearchUpdate.objects.exists())
+        assert_equal(len(query('Funk')['results']), 1)
+
+    @mock.patch('website.search.elastic_search.helpers.bulk')
+    def test_failed_updates_stay_queued(self, mock_bulk):
+        PendingSearchUpdate.objects.all().delete()
+        user = factories.UserFactory()
+        PendingSearchUpdate.enqueue(PendingSearchUpdate.NODE, self.project._id)
+        PendingSearchUpdate.enqueue(PendingSearchUpdate.USER, user._id)
+        mock_bulk.return_value = (1, [{'index': {'_id': user._id, 'status': 429, 'error': 'rejected'}}])
+
+        assert_equal(elastic_search.flush_pending_updates(), 1)
+        assert_equal(list(PendingSearchUpdate.objects.values_list('doc_id', flat=True)), [user._id])
+
+    @mock.patch('website.search.elastic_search.helpers.bulk')
+    def test_missing_deletes_are_not_failures(self, mock_bulk):
+        PendingSearchUpdate.objects.all().delete()
+        PendingSearchUpdate.enqueue(PendingSearchUpdate.FILE, 'notindexed')
+        mock_bulk.return_value = (0, [{'delete': {'_id': 'notindexed', 'status': 404}}])
+
+        assert_equal(elastic_search.flush_pending_updates(), 1)
+        assert_false(PendingSearchUpdate.objects.exists())
+
+    def test_reenqueued_entries_are_not_acknowledged(self):
+        PendingSearchUpdate.enqueue(PendingSearchUpdate.USER, 'abcde')
+        entries = list(PendingSearchUpdate.objects.all())
+        PendingSearchUpdate.enqueue(PendingSearchUpdate.USER, 'abcde')
+        PendingSearchUpdate.acknowledge(entries)
+        assert_true(PendingSearchUpdate.objects.filter(doc_id='abcde').exists())
+
+        PendingSearchUpdate.acknowledge(list(PendingSearchUpdate.objects.all()))
+        assert_false(PendingSearchUpdate.objects.exists())
+
 class TestSearchFiles(OsfTestCase):
 
     def setUp(self):
@@ -962,6 +1045,26 @@ class TestSearchFiles(OsfTestCase):
         find = query_file('The Dock of the Bay.mp3')['results']
         assert_equal(len(find), 0)
 
+    def test_change_node_title_reindexes_files(self):
+        self.root.append_file('Mr. Pitiful.mp3')
+        self.node.title = 'Otis Blue'
+        with run_celery_tasks():
+            self.node.save()
+        find = query_file('Mr. Pitiful.mp3')['results']
+        assert_equal(find[0]['node_title'], 'Otis Blue')
+
+    @mock.patch('website.search.elastic_search.bulk_update_node_files')
+    def test_change_node_description_does_not_reindex_files(self, mock_update_files):
+        self.node.description = 'Recorded at Stax'
+        with run_celery_tasks():
+            self.node.save()
+        assert_false(mock_update_files.called)
+
+        self.node.title = 'Dictionary of Soul'
+        with run_celery_tasks():
+            self.node.save()
+        assert_true(mock_update_files.called)
+
     def test_file_download_url_guid(self):
         file_ = self.root.append_file('Timber.mp3')
         file_guid = file_.get_guid(create=True)
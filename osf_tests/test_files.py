@@ -1,6 +1,6 @@
 import pytest
 
-from addons.osfstorage import settings as osfstorage_settings
+from api_tests.utils import create_test_file as api_create_test_file
 from osf.models import BaseFileNode, Folder, File
 from osf_tests.factories import (
     UserFactory,
@@ -20,26 +20,8 @@ def project(user):
 
 @pytest.fixture()
 def create_test_file(fake):
-    # TODO: Copied from api_tests/utils.py. DRY this up.
     def _create_test_file(node, user=None, filename=None, create_guid=True):
-        filename = filename or fake.file_name()
-        user = user or node.creator
-        osfstorage = node.get_addon('osfstorage')
-        root_node = osfstorage.get_root()
-        test_file = root_node.append_file(filename)
-
-        if create_guid:
-            test_file.get_guid(create=True)
-
-        test_file.create_version(user, {
-            'object': '06d80e',
-            'service': 'cloud',
-            osfstorage_settings.WATERBUTLER_RESOURCE: 'osf',
-        }, {
-            'size': 1337,
-            'contentType': 'img/png'
-        }).save()
-        return test_file
+        return api_create_test_file(node, user or node.creator, filename=filename or fake.file_name(), create_guid=create_guid)
     return _create_test_file
 
 
@@ -61,3 +43,19 @@ def test_folder_update_calls_folder_update_method(project, create_test_file):
     assert parent_folder.__class__.update != File.update
     # the file update method should be the File update method
     assert file.__class__.update == File.update
+
+def test_bulk_upsert_creates_file_nodes(project):
+    from addons.github.models import GithubFile
+    existing = GithubFile.create(node=project, path='/existing', name='existing', materialized_path='/existing')
+    existing.save()
+    conflicting = GithubFile.create(node=project, path='/existing', name='existing', materialized_path='/moved')
+    new = GithubFile.create(node=project, path='/new', name='new', materialized_path='/new')
+
+    GithubFile.bulk_upsert([conflicting, new])
+
+    assert conflicting.pk == existing.pk
+    assert conflicting._id == existing._id
+    assert conflicting.created == existing.created
+    assert GithubFile.objects.get(pk=existing.pk).materialized_path == '/moved'
+    assert GithubFile.objects.get(pk=new.pk).name == 'new'
+    assert GithubFile.objects.filter(node=project).count() == 2
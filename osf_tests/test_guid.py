@@ -8,6 +8,7 @@ from osf_tests.factories import AuthUserFactory, UserFactory, NodeFactory, NodeL
     RegistrationFactory, PreprintFactory, PreprintProviderFactory
 from tests.base import OsfTestCase
 from tests.test_websitefiles import TestFile
+from website import settings
 from website.settings import MFR_SERVER_URL, WATERBUTLER_URL
 
 @pytest.mark.django_db
@@ -311,3 +312,52 @@ class TestResolveGuid(OsfTestCase):
 
         res = self.app.get(pp.url + 'download', auth=non_contrib.auth, expect_errors=True)
         assert res.status_code == 410
+
+
+class TestResolveGuidCache(OsfTestCase):
+
+    def setUp(self):
+        super(TestResolveGuidCache, self).setUp()
+        from django.core.cache import caches
+        self.cache = caches['default']
+        self.cache.clear()
+        self.backend_patcher = mock.patch.object(settings, 'CACHED_PROPERTY_BACKEND', 'default')
+        self.backend_patcher.start()
+        self.node = NodeFactory()
+
+    def tearDown(self):
+        self.backend_patcher.stop()
+        self.cache.clear()
+        super(TestResolveGuidCache, self).tearDown()
+
+    def test_repeat_requests_skip_guid_load(self):
+        url = self.node.web_url_for('node_setting', _guid=True)
+        with mock.patch('website.views.Guid.load', wraps=Guid.load) as mock_load:
+            for _ in range(3):
+                res = self.app.get(url, auth=self.node.creator.auth)
+                assert res.status_code == 200
+        assert mock_load.call_count == 1
+
+    def test_unknown_guid_is_cached(self):
+        with mock.patch('website.views.Guid.load', wraps=Guid.load) as mock_load:
+            for _ in range(2):
+                res = self.app.get('/abcde/', expect_errors=True)
+                assert res.status_code == 404
+        assert mock_load.call_count == 1
+
+    def test_saving_referent_invalidates_resolution(self):
+        url = self.node.web_url_for('node_setting', _guid=True)
+        self.app.get(url, auth=self.node.creator.auth)
+        self.node.title = 'Changed'
+        self.node.save()
+        with mock.patch('website.views.Guid.load', wraps=Guid.load) as mock_load:
+            res = self.app.get(url, auth=self.node.creator.auth)
+        assert res.status_code == 200
+        assert mock_load.call_count == 1
+
+    def test_deleting_guid_invalidates_resolution(self):
+        url = self.node.web_url_for('node_setting', _guid=True)
+        self.app.get(url, auth=self.node.creator.auth)
+        Guid.load(self.node._id).delete()
+        res = self.app.get(url, auth=self.node.creator.auth, expect_errors=True)
+        assert res.status_code == 404
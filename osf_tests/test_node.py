@@ -1,3 +1,4 @@
+import bson
 import datetime
 
 from django.utils import timezone
@@ -16,7 +17,13 @@ from website.exceptions import NodeStateError
 from website.util import permissions, disconnected_from_listeners, api_url_for, web_url_for
 from website.citations.utils import datetime_to_csl
 from website import language, settings
-from website.project.tasks import on_node_updated
+from website.project.tasks import (
+    on_node_updated,
+    check_node_spam,
+    update_descendant_search,
+    fork_node as fork_node_task,
+    register_node as register_node_task,
+)
 
 from osf.models import (
     AbstractNode,
@@ -27,6 +34,7 @@ from osf.models import (
     MetaSchema,
     Sanction,
     NodeRelation,
+    NodeClosure,
     Registration,
     DraftRegistration,
     DraftRegistrationApproval,
@@ -250,6 +258,36 @@ class TestParentNode:
 
         assert 20 == len(Node.objects.get_children(root))
 
+    def test_node_closure_tracks_primary_hierarchy(self):
+        root = ProjectFactory()
+        child = NodeFactory(parent=root)
+        grandchild = NodeFactory(parent=child)
+
+        assert set(NodeClosure.objects.filter(descendant=grandchild).values_list('ancestor_id', 'depth')) == {
+            (child.id, 1),
+            (root.id, 2),
+        }
+        assert set(NodeClosure.objects.filter(ancestor=root).values_list('descendant_id', flat=True)) == {child.id, grandchild.id}
+        assert grandchild.parents == [child, root]
+
+    def test_node_closure_ignores_node_links(self):
+        root = ProjectFactory()
+        linked = ProjectFactory()
+        root.add_node_link(linked, auth=Auth(root.creator))
+
+        assert not NodeClosure.objects.filter(ancestor=root).exists()
+        assert not NodeClosure.objects.filter(descendant=linked).exists()
+
+    def test_node_closure_removed_with_relation(self):
+        root = ProjectFactory()
+        child = NodeFactory(parent=root)
+        grandchild = NodeFactory(parent=child)
+
+        NodeRelation.objects.get(parent=root, child=child).delete()
+
+        assert not NodeClosure.objects.filter(ancestor=root).exists()
+        assert NodeClosure.objects.filter(ancestor=child, descendant=grandchild, depth=1).exists()
+
     def test_get_roots(self):
         top_level1 = ProjectFactory(is_public=True)
         top_level2 = ProjectFactory(is_public=True)
@@ -1682,6 +1720,73 @@ class TestRegisterNode:
             assert r.registered_meta[meta_schema._id] == data
             assert r.registered_schema.first() == meta_schema
 
+    @mock.patch('website.project.signals.after_create_registration')
+    def test_register_node_copies_tree(self, mock_signal, user, auth):
+        root = ProjectFactory(creator=user)
+        child = NodeFactory(creator=user, parent=root)
+        grandchild = NodeFactory(creator=user, parent=child)
+        linked = ProjectFactory(creator=user)
+        root.add_node_link(linked, auth=auth)
+        contrib = UserFactory()
+        child.add_contributor(contrib, permissions=[READ], visible=False, save=True)
+        unregistered = child.add_unregistered_contributor(fullname='Unregistered', email='unreg@example.com', auth=auth, save=True)
+        institution = InstitutionFactory()
+        grandchild.affiliated_institutions.add(institution)
+        grandchild.add_tag('tagged', auth=auth)
+
+        registration = root.register_node(get_default_metaschema(), auth, '', None)
+
+        reg_child, reg_link = registration.get_nodes()
+        assert reg_child.registered_from == child
+        assert reg_link == linked
+        reg_grandchild = reg_child.get_nodes()[0]
+        assert reg_grandchild.registered_from == grandchild
+        assert reg_grandchild.root == registration
+        assert set(NodeClosure.objects.filter(descendant=reg_grandchild).values_list('ancestor_id', 'depth')) == {
+            (reg_child.id, 1), (registration.id, 2),
+        }
+
+        assert list(reg_child.contributor_set.values_list('user', 'read', 'write', 'admin', 'visible')) == list(
+            child.contributor_set.values_list('user', 'read', 'write', 'admin', 'visible')
+        )
+        unregistered.reload()
+        assert unregistered.unclaimed_records[reg_child._id] == unregistered.unclaimed_records[child._id]
+        assert list(reg_grandchild.affiliated_institutions.all()) == [institution]
+        assert list(reg_grandchild.tags.values_list('name', flat=True)) == ['tagged']
+        assert reg_grandchild.logs.count() == grandchild.logs.count()
+        for reg in (registration, reg_child, reg_grandchild):
+            assert list(reg.registered_schema.all()) == [get_default_metaschema()]
+
+    @mock.patch('website.project.signals.after_create_registration')
+    def test_register_node_requires_write_on_components(self, mock_signal, user, auth):
+        root = ProjectFactory(creator=user)
+        component = NodeFactory(creator=UserFactory(), parent=root)
+        component.add_contributor(user, permissions=[READ], save=True)
+        root.set_permissions(user, [READ, WRITE], validate=False)
+        root.add_contributor(component.creator, permissions=[READ, WRITE, ADMIN], save=True)
+
+        with pytest.raises(PermissionsError):
+            root.register_node(get_default_metaschema(), auth, '', None)
+        assert not Registration.objects.filter(registered_from=root).exists()
+
+    def test_register_node_archives_children_first(self, user, auth):
+        root = ProjectFactory(creator=user)
+        child = NodeFactory(creator=user, parent=root)
+        grandchild = NodeFactory(creator=user, parent=child)
+        with mock.patch('website.project.signals.after_create_registration.send') as mock_send:
+            with mock.patch.object(settings, 'ENABLE_ARCHIVER', True):
+                registration = root.register_node(get_default_metaschema(), auth, '', None)
+        assert [call[1]['dst'].registered_from for call in mock_send.call_args_list] == [grandchild, child, root]
+        assert mock_send.call_args_list[-1][1]['dst'] == registration
+
+    @mock.patch('website.project.signals.after_create_registration')
+    def test_register_node_task(self, mock_signal, user):
+        root = ProjectFactory(creator=user)
+        registration_id = register_node_task(root._id, user._id, get_default_metaschema()._id, {'some': 'data'})
+        registration = Registration.load(registration_id)
+        assert registration.registered_from == root
+        assert registration.registered_meta[get_default_metaschema()._id] == {'some': 'data'}
+
 
 # Copied from tests/test_models.py
 class TestAddUnregisteredContributor:
@@ -2052,6 +2157,83 @@ class TestPrivateLinks:
         assert proj == draft.branched_from
 
 
+class TestSharedCachedProperties:
+
+    @pytest.fixture(autouse=True)
+    def shared_cache(self):
+        from django.core.cache import caches
+        cache = caches['default']
+        cache.clear()
+        with mock.patch.object(settings, 'CACHED_PROPERTY_BACKEND', 'default'):
+            yield cache
+        cache.clear()
+
+    @pytest.mark.django_assert_num_queries
+    def test_private_link_keys_active_is_cached(self, django_assert_num_queries, node):
+        link = PrivateLinkFactory(key='cached')
+        link.nodes.add(node)
+        assert node.private_link_keys_active == ['cached']
+        with django_assert_num_queries(0):
+            assert node.private_link_keys_active == ['cached']
+
+    def test_private_link_keys_active_invalidated(self, node):
+        link = PrivateLinkFactory(key='first')
+        link.nodes.add(node)
+        assert node.private_link_keys_active == ['first']
+
+        other = PrivateLinkFactory(key='second')
+        node.private_links.add(other)
+        assert sorted(node.private_link_keys_active) == ['first', 'second']
+
+        link.is_deleted = True
+        link.save()
+        assert node.private_link_keys_active == ['second']
+
+        other.nodes.remove(node)
+        assert node.private_link_keys_active == []
+
+    def test_inherited_license_invalidated(self):
+        license_record = NodeLicenseRecordFactory()
+        project = ProjectFactory(node_license=license_record)
+        node = NodeFactory(parent=project)
+        assert node.license == license_record
+
+        license_record.year = '1999'
+        license_record.save()
+        assert node.license.year == '1999'
+
+        new_record = NodeLicenseRecordFactory()
+        project.node_license = new_record
+        project.save()
+        assert node.license == new_record
+
+    def test_deleted_node_relation_invalidates_child(self, shared_cache):
+        from osf.models import AbstractNode, NodeRelation
+        from osf.utils.caching import _version_key
+        project = ProjectFactory(node_license=NodeLicenseRecordFactory())
+        node = NodeFactory(parent=project)
+        assert node.license == project.node_license
+        key = _version_key(AbstractNode, node.pk)
+        assert shared_cache.get(key) is not None
+
+        NodeRelation.objects.get(parent=project, child=node).delete()
+        assert shared_cache.get(key) is None
+
+    def test_invalidation_is_repeated_on_commit(self, shared_cache, node):
+        from osf.models import AbstractNode
+        from osf.utils.caching import _version_key, invalidate_cached_properties
+        key = _version_key(AbstractNode, node.pk)
+        with mock.patch('django.db.transaction.on_commit') as mock_on_commit:
+            invalidate_cached_properties(AbstractNode, [node.pk])
+        assert shared_cache.get(key) is None
+
+        # A concurrent request re-caches the state from before the commit
+        node.private_link_keys_active
+        assert shared_cache.get(key) is not None
+        mock_on_commit.call_args[0][0]()
+        assert shared_cache.get(key) is None
+
+
 # copied from tests/test_models.py
 class TestManageContributors:
 
@@ -2847,6 +3029,95 @@ class TestForkNode:
         assert registration_wiki_version.node == fork
         assert registration_wiki_version._id != wiki._id
 
+    def test_fork_copies_hierarchy(self, user, auth):
+        project = ProjectFactory(creator=user)
+        first = NodeFactory(creator=user, parent=project, title='First')
+        linked = ProjectFactory(creator=user)
+        project.add_node_link(linked, auth=auth)
+        second = NodeFactory(creator=user, parent=project, title='Second')
+        grandchild = NodeFactory(creator=user, parent=second, title='Grandchild')
+
+        fork = project.fork_node(auth)
+
+        fork_first, fork_link, fork_second = fork.get_nodes()
+        assert (fork_first.forked_from, fork_link, fork_second.forked_from) == (first, linked, second)
+        fork_grandchild = fork_second.get_nodes()[0]
+        assert fork_grandchild.forked_from == grandchild
+        assert fork_grandchild.title == 'Grandchild'
+        assert fork_grandchild.root == fork
+        assert fork_grandchild.parent_node == fork_second
+        assert set(NodeClosure.objects.filter(descendant=fork_grandchild).values_list('ancestor_id', 'depth')) == {
+            (fork_second.id, 1), (fork.id, 2),
+        }
+        assert set(NodeClosure.objects.filter(ancestor=fork).values_list('descendant_id', flat=True)) == {
+            fork_first.id, fork_second.id, fork_grandchild.id,
+        }
+
+        log = fork_grandchild.logs.latest()
+        assert log.action == NodeLog.NODE_FORKED
+        assert log.params['parent_node'] == second._id
+        assert log.params['fork'] == fork_grandchild._id
+
+    def test_fork_includes_components_of_admin_parents(self, user, node):
+        admin = UserFactory()
+        node.add_contributor(admin, permissions=[READ, WRITE, ADMIN], save=True)
+        component = NodeFactory(creator=user, parent=node)
+        private_grandchild = NodeFactory(creator=UserFactory(), parent=NodeFactory(creator=UserFactory(), parent=node))
+
+        fork = node.fork_node(Auth(user=admin))
+
+        assert set(fork.nodes_primary.values_list('forked_from', flat=True)) == {component.id, private_grandchild.parent_node.id}
+        assert AbstractNode.objects.filter(forked_from=private_grandchild).exists()
+        assert set(NodeClosure.objects.filter(ancestor=fork).values_list('descendant__forked_from', flat=True)) == {
+            component.id, private_grandchild.parent_node.id, private_grandchild.id,
+        }
+
+    def test_fork_reports_progress(self, user, node, auth):
+        NodeFactory(creator=user, parent=node)
+        progress = mock.Mock()
+        node.fork_node(auth, progress=progress)
+        assert progress.call_args_list == [mock.call(0, 2), mock.call(1, 2), mock.call(2, 2)]
+
+    def test_fork_node_task(self, user, node):
+        fork_id = fork_node_task(node._id, user._id, title='Background fork')
+        fork = AbstractNode.load(fork_id)
+        assert fork.forked_from == node
+        assert fork.title == 'Background fork'
+        assert fork.get_permissions(user) == ['read', 'write', 'admin']
+
+
+class TestCloneLogs:
+
+    def test_clone_logs(self, node, user):
+        for _ in range(3):
+            NodeLogFactory(node=node, user=user, params={'node': node._id})
+        other = ProjectFactory()
+        NodeLogFactory(node=other, user=user, action=NodeLog.TAG_ADDED, params={'node': other._id, 'tag': 'cloned'})
+        target = ProjectFactory()
+        other_target = ProjectFactory()
+        pairs = ((node, target), (other, other_target))
+        existing = set(NodeLog.objects.filter(node__in=[target, other_target]).values_list('pk', flat=True))
+        fields = ('action', 'params', 'node_id', 'date', 'should_hide', 'user', 'original_node')
+
+        count = NodeLog.clone_logs({source.pk: clone.pk for source, clone in pairs})
+
+        assert count == sum(source.logs.count() for source, _ in pairs)
+        for source, clone in pairs:
+            sources = source.logs.order_by('pk')
+            cloned = clone.logs.exclude(pk__in=existing).order_by('pk')
+            assert [log.node_id for log in cloned] == [clone.id] * sources.count()
+            assert list(cloned.values_list(*fields)) == [
+                (log.action, log.params, clone.id, log.date, log.should_hide, log.user_id, log.original_node_id)
+                for log in sources
+            ]
+            for _id in cloned.values_list('_id', flat=True):
+                assert bson.ObjectId.is_valid(_id)
+            assert not set(cloned.values_list('_id', flat=True)) & set(sources.values_list('_id', flat=True))
+
+    def test_clone_logs_of_nothing(self):
+        assert NodeLog.clone_logs({}) == 0
+
+
 class TestContributorOrdering:
 
     def test_can_get_contributor_order(self, node):
@@ -3345,8 +3616,9 @@ class TestOnNodeUpdate:
     def teardown_method(self, method):
         handlers.celery_before_request()
 
-    @mock.patch('osf.models.node.enqueue_task')
+    @mock.patch('website.project.tasks.enqueue_task')
     def test_enqueue_called(self, enqueue_task, node, user, request_context):
+        handlers.celery_before_request()
         node.title = 'A new title'
         node.save()
 
@@ -3358,6 +3630,109 @@ class TestOnNodeUpdate:
         assert task.args[2] is False
         assert 'title' in task.args[3]
 
+    @mock.patch('website.project.tasks.enqueue_task')
+    def test_saves_within_a_request_are_coalesced(self, enqueue_task, node, request_context):
+        handlers.celery_before_request()
+        node.title = 'A new title'
+        node.save()
+        node.description = 'A new description'
+        node.save()
+
+        (task, ) = [call[0][0] for call in enqueue_task.call_args_list]
+        assert task.task == 'website.project.tasks.on_node_updated'
+        assert {'title', 'description'}.issubset(task.args[3])
+
+    @mock.patch('website.project.tasks.enqueue_task')
+    def test_unrouted_fields_do_not_enqueue(self, enqueue_task, node, request_context):
+        handlers.celery_before_request()
+        node.comment_level = 'private'
+        node.save()
+        assert not enqueue_task.called
+
+    @mock.patch('website.project.tasks.enqueue_task')
+    def test_node_license_reindexes_descendants_in_background(self, enqueue_task, node, request_context):
+        handlers.celery_before_request()
+        node.node_license = NodeLicenseRecordFactory()
+        node.save()
+
+        tasks = [call[0][0].task for call in enqueue_task.call_args_list]
+        assert 'website.project.tasks.update_descendant_search' in tasks
+
+    @mock.patch('website.project.tasks.enqueue_task')
+    def test_preprint_updates_enqueued(self, enqueue_task, node, request_context):
+        preprint = PreprintFactory(project=node, is_published=True)
+        handlers.celery_before_request()
+        node.description = 'A new description'
+        node.save()
+
+        tasks = [call[0][0] for call in enqueue_task.call_args_list]
+        (task, ) = [task for task in tasks if task.task == 'website.preprints.tasks.on_preprint_updated']
+        assert task.args == (preprint._id, )
+
+    @mock.patch('website.project.tasks.enqueue_task')
+    def test_preprint_updates_enqueued_for_tags(self, enqueue_task, node, request_context):
+        PreprintFactory(project=node, is_published=True)
+        handlers.celery_before_request()
+        node.add_tag('qatest', auth=Auth(node.creator))
+
+        tasks = [call[0][0].task for call in enqueue_task.call_args_list]
+        assert 'website.preprints.tasks.on_preprint_updated' in tasks
+
+    @mock.patch('website.project.tasks.enqueue_task')
+    def test_preprint_updates_not_enqueued_without_preprint(self, enqueue_task, node, request_context):
+        handlers.celery_before_request()
+        node.add_tag('qatest', auth=Auth(node.creator))
+
+        tasks = [call[0][0].task for call in enqueue_task.call_args_list]
+        assert 'website.preprints.tasks.on_preprint_updated' not in tasks
+
+    @mock.patch('website.project.tasks.settings.SPAM_CHECK_ENABLED', True)
+    @mock.patch('website.project.tasks.enqueue_task')
+    def test_spam_check_enqueued(self, enqueue_task, node, user, request_context):
+        handlers.celery_before_request()
+        node.title = 'A new title'
+        node.save()
+
+        tasks = [call[0][0] for call in enqueue_task.call_args_list]
+        (task, ) = [task for task in tasks if task.task == 'website.project.tasks.check_node_spam']
+        assert task.args[:2] == (node._id, user._id)
+        assert 'title' in task.args[2]
+
+    @mock.patch('website.project.tasks.settings.SPAM_CHECK_ENABLED', True)
+    @mock.patch('website.project.tasks.enqueue_task')
+    def test_spam_check_not_enqueued_for_unchecked_fields(self, enqueue_task, node, request_context):
+        handlers.celery_before_request()
+        node.category = 'data'
+        node.save()
+
+        tasks = [call[0][0].task for call in enqueue_task.call_args_list]
+        assert 'website.project.tasks.check_node_spam' not in tasks
+
+    @pytest.mark.parametrize('is_spam', [True, False])
+    @mock.patch('osf.models.Node.save')
+    @mock.patch('osf.models.AbstractNode.check_spam')
+    def test_check_node_spam(self, mock_check_spam, mock_save, node, user, is_spam):
+        mock_check_spam.return_value = is_spam
+        check_node_spam(node._id, user._id, ['title'], {'User-Agent': 'Mozilla'})
+
+        mock_check_spam.assert_called_once_with(user, ['title'], {'User-Agent': 'Mozilla'})
+        assert mock_save.called is is_spam
+
+    @mock.patch('osf.models.AbstractNode.check_spam')
+    def test_check_node_spam_without_user(self, mock_check_spam, node):
+        check_node_spam(node._id, 'nouser', ['title'])
+        assert not mock_check_spam.called
+
+    @mock.patch('osf.models.AbstractNode.bulk_update_search')
+    def test_update_descendant_search(self, mock_bulk_update_search, node):
+        child = NodeFactory(parent=node, is_public=True)
+        NodeFactory(parent=node, is_public=False)
+        update_descendant_search(node._id)
+
+        (nodes, ), kwargs = mock_bulk_update_search.call_args
+        assert nodes == [child]
+        assert kwargs['saved_fields'] == ['node_license']
+
     @mock.patch('website.project.tasks.settings.SHARE_URL', 'https://share.osf.io')
     @mock.patch('website.project.tasks.settings.SHARE_API_TOKEN', 'Token')
     @mock.patch('website.project.tasks.requests')
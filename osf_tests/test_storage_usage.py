@@ -0,0 +1,105 @@
+import pytest
+
+from addons.osfstorage import settings as osfstorage_settings
+from api_tests.utils import create_test_file, create_test_file_version
+from osf.models import NodeStorageUsage
+from osf_tests.factories import (
+    NodeFactory,
+    ProjectFactory,
+    UserFactory,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture()
+def user():
+    return UserFactory()
+
+@pytest.fixture()
+def project(user):
+    return ProjectFactory(creator=user)
+
+@pytest.fixture()
+def component(project, user):
+    return NodeFactory(parent=project, creator=user)
+
+@pytest.fixture()
+def create_file(fake, user):
+    def _create_file(node, size, *sizes, **kwargs):
+        test_file = create_test_file(node, user, filename=fake.file_name(), create_guid=False, size=size, parent=kwargs.get('parent'))
+        for size in sizes:
+            create_test_file_version(test_file, user, size=size)
+        return test_file
+    return _create_file
+
+
+def get_usage(node):
+    return NodeStorageUsage.objects.filter(node=node).values(
+        'file_count', 'version_count', 'live_bytes', 'trashed_bytes'
+    ).get()
+
+def assert_matches_recompute(*nodes):
+    tracked = [get_usage(node) for node in nodes]
+    NodeStorageUsage.recompute([node.id for node in nodes])
+    assert tracked == [get_usage(node) for node in nodes]
+
+
+class TestNodeStorageUsage:
+
+    def test_create_version(self, project, create_file):
+        create_file(project, 100, 50)
+        create_file(project, 10)
+        assert get_usage(project) == {'file_count': 2, 'version_count': 3, 'live_bytes': 160, 'trashed_bytes': 0}
+        assert_matches_recompute(project)
+
+    def test_unknown_size_counts_as_zero(self, project, create_file):
+        test_file = create_file(project, 100)
+        test_file.create_version(project.creator, {
+            'object': 'unknown',
+            'service': 'cloud',
+            osfstorage_settings.WATERBUTLER_RESOURCE: 'osf',
+        }).save()
+        assert get_usage(project)['live_bytes'] == 100
+        assert_matches_recompute(project)
+
+    def test_delete(self, project, create_file):
+        create_file(project, 10)
+        create_file(project, 100, 50).delete()
+        assert get_usage(project) == {'file_count': 1, 'version_count': 1, 'live_bytes': 10, 'trashed_bytes': 150}
+        assert_matches_recompute(project)
+
+    def test_delete_folder(self, project, create_file):
+        folder = project.get_addon('osfstorage').get_root().append_folder('Folder')
+        create_file(project, 100, parent=folder)
+        create_file(project, 10)
+        folder.delete()
+        assert get_usage(project) == {'file_count': 1, 'version_count': 1, 'live_bytes': 10, 'trashed_bytes': 100}
+        assert_matches_recompute(project)
+
+    def test_move_and_copy_across_nodes(self, project, component, create_file):
+        test_file = create_file(project, 100)
+        destination = component.get_addon('osfstorage').get_root()
+
+        test_file.copy_under(destination)
+        assert get_usage(project)['live_bytes'] == 100
+        assert get_usage(component)['live_bytes'] == 100
+
+        test_file.move_under(destination, name='moved')
+        assert get_usage(project) == {'file_count': 0, 'version_count': 0, 'live_bytes': 0, 'trashed_bytes': 0}
+        assert get_usage(component) == {'file_count': 2, 'version_count': 2, 'live_bytes': 200, 'trashed_bytes': 0}
+        assert_matches_recompute(project, component)
+
+    def test_get_subtree_usage(self, project, component, create_file):
+        create_file(project, 100)
+        create_file(component, 10).delete()
+        create_file(NodeFactory(parent=component, creator=project.creator), 1)
+        create_file(ProjectFactory(), 1000)
+
+        assert NodeStorageUsage.get_subtree_usage(project) == {
+            'file_count': 2,
+            'version_count': 2,
+            'live_bytes': 101,
+            'trashed_bytes': 10,
+        }
+        assert NodeStorageUsage.get_subtree_usage(component)['live_bytes'] == 1
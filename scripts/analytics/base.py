@@ -2,8 +2,12 @@ import time
 import logging
 import argparse
 import importlib
+from collections import defaultdict
 from datetime import datetime, timedelta
+
+import pytz
 from dateutil.parser import parse
+from django.db.models import Case, Count, F, Q, When
 from django.utils import timezone
 
 from website.app import init_app
@@ -13,6 +17,60 @@ from keen.client import KeenClient
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
+# Matches the nodes kept by `AbstractNodeQuerySet.get_roots`, for use in conditional counts
+ROOT_QUERY = Q(id=F('root_id')) & ~Q(type__in=['osf.collection', 'osf.quickfilesnode'])
+
+
+def get_date_window(date):
+    """Return the datetimes at midnight UTC at the start of `date` and of the following day."""
+    timestamp_datetime = datetime(date.year, date.month, date.day).replace(tzinfo=pytz.UTC)
+    return timestamp_datetime, timestamp_datetime + timedelta(days=1)
+
+
+def _flatten(conditions, path=()):
+    for key, value in conditions.items():
+        if isinstance(value, dict):
+            for item in _flatten(value, path + (key, )):
+                yield item
+        else:
+            yield path + (key, ), value
+
+
+def _unflatten(paths, values):
+    tree = {}
+    for path, value in zip(paths, values):
+        branch = tree
+        for key in path[:-1]:
+            branch = branch.setdefault(key, {})
+        branch[path[-1]] = value
+    return tree
+
+
+def count_conditions(queryset, conditions, group_by=None, distinct=False):
+    """Count the rows of `queryset` matching each of `conditions` in a single query.
+
+    `conditions` is a dict of Q objects, possibly nested, and the result has the same shape
+    with each Q replaced by its count. Every count is a conditional aggregate of one scan
+    (`COUNT(CASE WHEN ... END)`) rather than a query of its own. Pass `distinct` when the
+    conditions or `group_by` span multi-valued relations, so that joined rows are counted once.
+
+    With `group_by`, returns a dict of counts keyed by each value of that field; values
+    with no rows get zero counts.
+    """
+    paths, queries = zip(*_flatten(conditions)) if conditions else ((), ())
+    aggregates = {
+        'count_{}'.format(i): Count(Case(When(query, then=F('pk') if distinct else 1)), distinct=distinct)
+        for i, query in enumerate(queries)
+    }
+    names = ['count_{}'.format(i) for i in range(len(paths))]
+    if not group_by:
+        row = queryset.aggregate(**aggregates) if aggregates else {}
+        return _unflatten(paths, [row[name] for name in names])
+    results = defaultdict(lambda: _unflatten(paths, [0] * len(paths)))
+    for row in queryset.order_by().values(group_by).annotate(**aggregates):
+        results[row[group_by]] = _unflatten(paths, [row[name] for name in names])
+    return results
+
 
 class BaseAnalytics(object):
 
@@ -57,11 +115,15 @@ class SnapshotAnalytics(BaseAnalytics):
 
 class SummaryAnalytics(BaseAnalytics):
 
+    def __init__(self):
+        # (name, seconds) of each query run through `count_conditions`
+        self.query_timings = []
+
     @property
     def analytic_type(self):
         return 'summary'
 
-    def get_events(self, date):
+    def validate_date(self, date):
         # Date must be specified, must be a date (not a datetime), and must not be today or in the future
         if not date:
             raise AttributeError('Script must be called with a date to gather analytics.')
@@ -71,12 +133,43 @@ class SummaryAnalytics(BaseAnalytics):
         if type(date) != type(today):
             raise AttributeError('Please call the script using a date object, not a datetime object')
 
+    def get_events(self, date):
+        self.validate_date(date)
         logger.info('Gathering {} analytics for the {} collection for {}'.format(
             self.analytic_type,
             self.collection_name,
             date.isoformat()
         ))
 
+    def get_events_for_dates(self, dates):
+        """Gather the events of every date in `dates`, e.g. to backfill a range of dates.
+
+        Summaries that can count many dates in one pass override this.
+        """
+        events = []
+        for date in dates:
+            events.extend(self.get_events(date))
+        return events
+
+    def count_conditions(self, name, queryset, conditions, **kwargs):
+        """`count_conditions`, recording how long the query took under `name`."""
+        start = time.time()
+        counts = count_conditions(queryset, conditions, **kwargs)
+        elapsed = time.time() - start
+        self.query_timings.append((name, elapsed))
+        logger.info('Counted {} for the {} collection in {:.3f}s'.format(name, self.collection_name, elapsed))
+        return counts
+
+    def get_dates(self, args):
+        """Return the dates to gather analytics for given the parsed command line `args`."""
+        if args.yesterday:
+            return [(timezone.now() - timedelta(days=1)).date()]
+        if not args.date:
+            raise AttributeError('You must either specify a date or use the yesterday argument to gather analytics for yesterday.')
+        start = parse(args.date).date()
+        end = parse(args.end_date).date() if args.end_date else start
+        return [start + timedelta(days=days) for days in range((end - start).days + 1)]
+
     def parse_args(self):
         parser = argparse.ArgumentParser(
             description='Enter the date to gather {} analytics for the {} collection'.format(
@@ -85,6 +178,7 @@ class SummaryAnalytics(BaseAnalytics):
             )
         )
         parser.add_argument('-d', '--date', dest='date')
+        parser.add_argument('-e', '--end_date', dest='end_date', help='Backfill every date from --date through this date')
         parser.add_argument('-y', '--yesterday', dest='yesterday', action='store_true')
 
         return parser.parse_args()
@@ -1,18 +1,14 @@
 import django
 django.setup()
 
-import pytz
 import logging
-from dateutil.parser import parse
-from datetime import datetime, timedelta
 
 from django.db.models import Q
-from django.utils import timezone
 
 from framework.encryption import ensure_bytes
-from osf.models import Institution
+from osf.models import AbstractNode, Institution, OSFUser
 from website.app import init_app
-from scripts.analytics.base import SummaryAnalytics
+from scripts.analytics.base import ROOT_QUERY, SummaryAnalytics, get_date_window
 
 
 logger = logging.getLogger(__name__)
@@ -27,91 +23,107 @@ class InstitutionSummary(SummaryAnalytics):
 
     def get_events(self, date):
         super(InstitutionSummary, self).get_events(date)
+        return self.count_dates([date])
 
-        institutions = Institution.objects.all()
-        counts = []
+    def get_events_for_dates(self, dates):
+        for date in dates:
+            self.validate_date(date)
+        return self.count_dates(dates)
 
-        # Convert to a datetime at midnight for queries and the timestamp
-        timestamp_datetime = datetime(date.year, date.month, date.day).replace(tzinfo=pytz.UTC)
-        query_datetime = timestamp_datetime + timedelta(days=1)
-        daily_query = Q(created__gte=timestamp_datetime)
+    def count_dates(self, dates):
+        """Count the users, nodes and registrations of every institution for every date in `dates`,
+        with one query grouped by institution for each table.
+        """
         public_query = Q(is_public=True)
         private_query = Q(is_public=False)
-
-        # `embargoed` used private status to determine embargoes, but old registrations could be private and unapproved registrations can also be private
-        # `embargoed_v2` uses future embargo end dates on root
-        embargo_v2_query = Q(root__embargo__end_date__gt=query_datetime)
-
-        for institution in institutions:
-            node_qs = institution.nodes.filter(is_deleted=False, created__lt=query_datetime).exclude(type='osf.registration')
-            registration_qs = institution.nodes.filter(is_deleted=False, created__lt=query_datetime, type='osf.registration')
-
-            count = {
-                'institution': {
-                    'id': ensure_bytes(institution._id),
-                    'name': ensure_bytes(institution.name),
-                },
-                'users': {
-                    'total': institution.osfuser_set.filter(is_active=True).count(),
-                    'total_daily': institution.osfuser_set.filter(date_confirmed__gte=timestamp_datetime, date_confirmed__lt=query_datetime).count(),
-                },
-                'nodes': {
-                    'total': node_qs.count(),
-                    'public': node_qs.filter(public_query).count(),
-                    'private': node_qs.filter(private_query).count(),
-
-                    'total_daily': node_qs.filter(daily_query).count(),
-                    'public_daily': node_qs.filter(public_query & daily_query).count(),
-                    'private_daily': node_qs.filter(private_query & daily_query).count(),
-                },
-                # Projects use get_roots to remove children
-                'projects': {
-                    'total': node_qs.get_roots().count(),
-                    'public': node_qs.filter(public_query).get_roots().count(),
-                    'private': node_qs.filter(private_query).get_roots().count(),
-
-                    'total_daily': node_qs.filter(daily_query).get_roots().count(),
-                    'public_daily': node_qs.filter(public_query & daily_query).get_roots().count(),
-                    'private_daily': node_qs.filter(private_query & daily_query).get_roots().count(),
-                },
-                'registered_nodes': {
-                    'total': registration_qs.count(),
-                    'public': registration_qs.filter(public_query).count(),
-                    'embargoed': registration_qs.filter(private_query).count(),
-                    'embargoed_v2': registration_qs.filter(private_query & embargo_v2_query).count(),
-
-                    'total_daily': registration_qs.filter(daily_query).count(),
-                    'public_daily': registration_qs.filter(public_query & daily_query).count(),
-                    'embargoed_daily': registration_qs.filter(private_query & daily_query).count(),
-                    'embargoed_v2_daily': registration_qs.filter(private_query & daily_query & embargo_v2_query).count(),
-                },
-                'registered_projects': {
-                    'total': registration_qs.get_roots().count(),
-                    'public': registration_qs.filter(public_query).get_roots().count(),
-                    'embargoed': registration_qs.filter(private_query).get_roots().count(),
-                    'embargoed_v2': registration_qs.filter(private_query & embargo_v2_query).get_roots().count(),
-
-                    'total_daily': registration_qs.filter(daily_query).get_roots().count(),
-                    'public_daily': registration_qs.filter(public_query & daily_query).get_roots().count(),
-                    'embargoed_daily': registration_qs.filter(private_query & daily_query).get_roots().count(),
-                    'embargoed_v2_daily': registration_qs.filter(private_query & daily_query & embargo_v2_query).get_roots().count(),
-                },
-                'keen': {
-                    'timestamp': timestamp_datetime.isoformat()
-                }
+        registration_query = Q(type='osf.registration')
+
+        user_conditions = {}
+        node_conditions = {}
+        for date in dates:
+            # Convert to a datetime at midnight for queries and the timestamp
+            timestamp_datetime, query_datetime = get_date_window(date)
+            created_query = Q(created__lt=query_datetime)
+            daily_query = created_query & Q(created__gte=timestamp_datetime)
+
+            # `embargoed` used private status to determine embargoes, but old registrations could be private and unapproved registrations can also be private
+            # `embargoed_v2` uses future embargo end dates on root
+            embargo_v2_query = Q(root__embargo__end_date__gt=query_datetime)
+
+            user_conditions[date] = {
+                'total': Q(is_active=True),
+                'total_daily': Q(date_confirmed__gte=timestamp_datetime, date_confirmed__lt=query_datetime),
+            }
+            nodes = {
+                'total': created_query,
+                'public': created_query & public_query,
+                'private': created_query & private_query,
+
+                'total_daily': daily_query,
+                'public_daily': daily_query & public_query,
+                'private_daily': daily_query & private_query,
+            }
+            registered_nodes = {
+                'total': created_query,
+                'public': created_query & public_query,
+                'embargoed': created_query & private_query,
+                'embargoed_v2': created_query & private_query & embargo_v2_query,
+
+                'total_daily': daily_query,
+                'public_daily': daily_query & public_query,
+                'embargoed_daily': daily_query & private_query,
+                'embargoed_v2_daily': daily_query & private_query & embargo_v2_query,
+            }
+            node_conditions[date] = {
+                'nodes': {key: query & ~registration_query for key, query in nodes.items()},
+                # Projects only count roots to remove children
+                'projects': {key: query & ~registration_query & ROOT_QUERY for key, query in nodes.items()},
+                'registered_nodes': {key: query & registration_query for key, query in registered_nodes.items()},
+                'registered_projects': {key: query & registration_query & ROOT_QUERY for key, query in registered_nodes.items()},
             }
 
-            logger.info(
-                '{} Nodes counted. Nodes: {}, Projects: {}, Registered Nodes: {}, Registered Projects: {}'.format(
-                    count['institution']['name'],
-                    count['nodes']['total'],
-                    count['projects']['total'],
-                    count['registered_nodes']['total'],
-                    count['registered_projects']['total']
+        last_query_datetime = get_date_window(max(dates))[1]
+        user_counts = self.count_conditions(
+            'users',
+            OSFUser.objects.filter(affiliated_institutions__isnull=False),
+            user_conditions,
+            group_by='affiliated_institutions',
+        )
+        node_counts = self.count_conditions(
+            'nodes',
+            AbstractNode.objects.filter(affiliated_institutions__isnull=False, is_deleted=False, created__lt=last_query_datetime),
+            node_conditions,
+            group_by='affiliated_institutions',
+        )
+
+        institutions = list(Institution.objects.all())
+        counts = []
+        for date in dates:
+            for institution in institutions:
+                count = {
+                    'institution': {
+                        'id': ensure_bytes(institution._id),
+                        'name': ensure_bytes(institution.name),
+                    },
+                    'users': user_counts[institution.id][date],
+                    'keen': {
+                        'timestamp': get_date_window(date)[0].isoformat()
+                    }
+                }
+                count.update(node_counts[institution.id][date])
+
+                logger.info(
+                    '{} Nodes counted for {}. Nodes: {}, Projects: {}, Registered Nodes: {}, Registered Projects: {}'.format(
+                        count['institution']['name'],
+                        date.isoformat(),
+                        count['nodes']['total'],
+                        count['projects']['total'],
+                        count['registered_nodes']['total'],
+                        count['registered_projects']['total']
+                    )
                 )
-            )
 
-            counts.append(count)
+                counts.append(count)
         return counts
 
 
@@ -123,10 +135,5 @@ if __name__ == '__main__':
     init_app()
     institution_summary = InstitutionSummary()
     args = institution_summary.parse_args()
-    yesterday = args.yesterday
-    if yesterday:
-        date = (timezone.now() - timedelta(days=1)).date()
-    else:
-        date = parse(args.date).date() if args.date else None
-    events = institution_summary.get_events(date)
+    events = institution_summary.get_events_for_dates(institution_summary.get_dates(args))
     institution_summary.send_events(events)
@@ -2,14 +2,10 @@ import django
 django.setup()
 
 from django.db.models import Q
-import pytz
 import logging
-from dateutil.parser import parse
-from datetime import datetime, timedelta
-from django.utils import timezone
 
 from website.app import init_app
-from scripts.analytics.base import SummaryAnalytics
+from scripts.analytics.base import ROOT_QUERY, SummaryAnalytics, get_date_window
 
 
 logger = logging.getLogger(__name__)
@@ -24,87 +20,96 @@ class NodeSummary(SummaryAnalytics):
 
     def get_events(self, date):
         super(NodeSummary, self).get_events(date)
-        from osf.models import Node, Registration
+        return self.count_dates([date])
 
-        # Convert to a datetime at midnight for queries and the timestamp
-        timestamp_datetime = datetime(date.year, date.month, date.day).replace(tzinfo=pytz.UTC)
-        query_datetime = timestamp_datetime + timedelta(days=1)
+    def get_events_for_dates(self, dates):
+        for date in dates:
+            self.validate_date(date)
+        return self.count_dates(dates)
 
-        node_qs = Node.objects.filter(is_deleted=False, created__lte=query_datetime)
-        registration_qs = Registration.objects.filter(is_deleted=False, created__lte=query_datetime)
+    def count_dates(self, dates):
+        """Count the nodes and registrations of every date in `dates`, with one query for each table."""
+        from osf.models import Node, Registration
 
         public_query = Q(is_public=True)
         private_query = Q(is_public=False)
-
-        # node_query encompasses lte query_datetime
-        daily_query = Q(created__gte=timestamp_datetime)
         retracted_query = Q(retraction__isnull=False)
 
-        # `embargoed` used private status to determine embargoes, but old registrations could be private and unapproved registrations can also be private
-        # `embargoed_v2` uses future embargo end dates on root
-        embargo_v2_query = Q(root__embargo__end_date__gt=query_datetime)
+        node_conditions = {}
+        registration_conditions = {}
+        for date in dates:
+            # Convert to a datetime at midnight for queries and the timestamp
+            timestamp_datetime, query_datetime = get_date_window(date)
+            created_query = Q(created__lte=query_datetime)
+            daily_query = created_query & Q(created__gte=timestamp_datetime)
+
+            # `embargoed` used private status to determine embargoes, but old registrations could be private and unapproved registrations can also be private
+            # `embargoed_v2` uses future embargo end dates on root
+            embargo_v2_query = Q(root__embargo__end_date__gt=query_datetime)
 
-        totals = {
-            'keen': {
-                'timestamp': timestamp_datetime.isoformat()
-            },
             # Nodes - the number of projects and components
-            'nodes': {
-                'total': node_qs.count(),
-                'public': node_qs.filter(public_query).count(),
-                'private': node_qs.filter(private_query).count(),
-                'total_daily': node_qs.filter(daily_query).count(),
-                'public_daily': node_qs.filter(public_query & daily_query).count(),
-                'private_daily': node_qs.filter(private_query & daily_query).count(),
-            },
-            # Projects - the number of top-level only projects
-            'projects': {
-                'total': node_qs.get_roots().count(),
-                'public': node_qs.filter(public_query).get_roots().count(),
-                'private': node_qs.filter(private_query).get_roots().count(),
-                'total_daily': node_qs.filter(daily_query).get_roots().count(),
-                'public_daily': node_qs.filter(public_query & daily_query).get_roots().count(),
-                'private_daily': node_qs.filter(private_query & daily_query).get_roots().count(),
-            },
+            nodes = {
+                'total': created_query,
+                'public': created_query & public_query,
+                'private': created_query & private_query,
+                'total_daily': daily_query,
+                'public_daily': daily_query & public_query,
+                'private_daily': daily_query & private_query,
+            }
             # Registered Nodes - the number of registered projects and components
-            'registered_nodes': {
-                'total': registration_qs.count(),
-                'public': registration_qs.filter(public_query).count(),
-                'embargoed': registration_qs.filter(private_query).count(),
-                'embargoed_v2': registration_qs.filter(private_query & embargo_v2_query).count(),
-                'withdrawn': registration_qs.filter(retracted_query).count(),
-                'total_daily': registration_qs.filter(daily_query).count(),
-                'public_daily': registration_qs.filter(public_query & daily_query).count(),
-                'embargoed_daily': registration_qs.filter(private_query & daily_query).count(),
-                'embargoed_v2_daily': registration_qs.filter(private_query & daily_query & embargo_v2_query).count(),
-                'withdrawn_daily': registration_qs.filter(retracted_query & daily_query).count(),
-
-            },
-            # Registered Projects - the number of registered top level projects
-            'registered_projects': {
-                'total': registration_qs.get_roots().count(),
-                'public': registration_qs.filter(public_query).get_roots().count(),
-                'embargoed': registration_qs.filter(private_query).get_roots().count(),
-                'embargoed_v2': registration_qs.filter(private_query & embargo_v2_query).get_roots().count(),
-                'withdrawn': registration_qs.filter(retracted_query).get_roots().count(),
-                'total_daily': registration_qs.filter(daily_query).get_roots().count(),
-                'public_daily': registration_qs.filter(public_query & daily_query).get_roots().count(),
-                'embargoed_daily': registration_qs.filter(private_query & daily_query).get_roots().count(),
-                'embargoed_v2_daily': registration_qs.filter(private_query & daily_query & embargo_v2_query).get_roots().count(),
-                'withdrawn_daily': registration_qs.filter(retracted_query & daily_query).get_roots().count(),
+            registered_nodes = {
+                'total': created_query,
+                'public': created_query & public_query,
+                'embargoed': created_query & private_query,
+                'embargoed_v2': created_query & private_query & embargo_v2_query,
+                'withdrawn': created_query & retracted_query,
+                'total_daily': daily_query,
+                'public_daily': daily_query & public_query,
+                'embargoed_daily': daily_query & private_query,
+                'embargoed_v2_daily': daily_query & private_query & embargo_v2_query,
+                'withdrawn_daily': daily_query & retracted_query,
             }
-        }
-
-        logger.info(
-            'Nodes counted. Nodes: {}, Projects: {}, Registered Nodes: {}, Registered Projects: {}'.format(
-                totals['nodes']['total'],
-                totals['projects']['total'],
-                totals['registered_nodes']['total'],
-                totals['registered_projects']['total']
-            )
+            node_conditions[date] = {
+                'nodes': nodes,
+                # Projects - the number of top-level only projects
+                'projects': {key: query & ROOT_QUERY for key, query in nodes.items()},
+            }
+            registration_conditions[date] = {
+                'registered_nodes': registered_nodes,
+                # Registered Projects - the number of registered top level projects
+                'registered_projects': {key: query & ROOT_QUERY for key, query in registered_nodes.items()},
+            }
+
+        last_query_datetime = get_date_window(max(dates))[1]
+        node_counts = self.count_conditions(
+            'nodes', Node.objects.filter(is_deleted=False, created__lte=last_query_datetime), node_conditions
+        )
+        registration_counts = self.count_conditions(
+            'registrations', Registration.objects.filter(is_deleted=False, created__lte=last_query_datetime), registration_conditions
         )
 
-        return [totals]
+        events = []
+        for date in dates:
+            totals = {
+                'keen': {
+                    'timestamp': get_date_window(date)[0].isoformat()
+                },
+            }
+            totals.update(node_counts[date])
+            totals.update(registration_counts[date])
+
+            logger.info(
+                'Nodes counted for {}. Nodes: {}, Projects: {}, Registered Nodes: {}, Registered Projects: {}'.format(
+                    date.isoformat(),
+                    totals['nodes']['total'],
+                    totals['projects']['total'],
+                    totals['registered_nodes']['total'],
+                    totals['registered_projects']['total']
+                )
+            )
+            events.append(totals)
+
+        return events
 
 
 def get_class():
@@ -115,10 +120,5 @@ if __name__ == '__main__':
     init_app()
     node_summary = NodeSummary()
     args = node_summary.parse_args()
-    yesterday = args.yesterday
-    if yesterday:
-        date = (timezone.now() - timedelta(days=1)).date()
-    else:
-        date = parse(args.date).date() if args.date else None
-    events = node_summary.get_events(date)
+    events = node_summary.get_events_for_dates(node_summary.get_dates(args))
     node_summary.send_events(events)
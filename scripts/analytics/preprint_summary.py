@@ -2,9 +2,7 @@ import pytz
 
 import logging
 import requests
-from dateutil.parser import parse
 from datetime import datetime, timedelta
-from django.utils import timezone
 
 from website.app import init_app
 from scripts.analytics.base import SummaryAnalytics
@@ -84,10 +82,5 @@ if __name__ == '__main__':
 
     preprint_summary = PreprintSummary()
     args = preprint_summary.parse_args()
-    yesterday = args.yesterday
-    if yesterday:
-        date = (timezone.now() - timedelta(days=1)).date()
-    else:
-        date = parse(args.date).date() if args.date else None
-    events = preprint_summary.get_events(date)
+    events = preprint_summary.get_events_for_dates(preprint_summary.get_dates(args))
     preprint_summary.send_events(events)
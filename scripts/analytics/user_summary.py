@@ -4,20 +4,17 @@ import django
 django.setup()
 from keen import KeenClient
 import logging
-import pytz
 import requests
 
-from dateutil.parser import parse
-from datetime import datetime, timedelta
+from datetime import timedelta
 from django.db.models import Q
-from django.utils import timezone
 
 from osf.models import OSFUser
 from website.app import init_app
 from website import settings
 from framework.database import paginated
 from framework import sentry
-from scripts.analytics.base import SummaryAnalytics
+from scripts.analytics.base import SummaryAnalytics, get_date_window
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
@@ -74,8 +71,7 @@ class UserSummary(SummaryAnalytics):
         super(UserSummary, self).get_events(date)
 
         # Convert to a datetime at midnight for queries and the timestamp
-        timestamp_datetime = datetime(date.year, date.month, date.day).replace(tzinfo=pytz.UTC)
-        query_datetime = timestamp_datetime + timedelta(days=1)
+        timestamp_datetime, query_datetime = get_date_window(date)
 
         active_user_query = (
             Q(is_registered=True) &
@@ -97,21 +93,24 @@ class UserSummary(SummaryAnalytics):
                 depth_users += 1
             if user.social or user.schools or user.jobs:
                 profile_edited += 1
-        new_users = OSFUser.objects.filter(is_active=True, date_confirmed__gte=timestamp_datetime, date_confirmed__lt=query_datetime)
+        new_users_query = Q(is_active=True, date_confirmed__gte=timestamp_datetime, date_confirmed__lt=query_datetime)
+        status = self.count_conditions('users', OSFUser.objects.all(), {
+            'new_users_daily': new_users_query,
+            'new_users_with_institution_daily': new_users_query & Q(affiliated_institutions__isnull=False),
+            'unconfirmed': Q(date_registered__lt=query_datetime, date_confirmed__isnull=True),
+            'deactivated': Q(date_disabled__isnull=False, date_disabled__lt=query_datetime),
+            'merged': Q(date_registered__lt=query_datetime, merged_by__isnull=False),
+        }, distinct=True)
+        status.update({
+            'active': active_users,
+            'depth': depth_users,
+            'profile_edited': profile_edited,
+        })
         counts = {
             'keen': {
                 'timestamp': timestamp_datetime.isoformat()
             },
-            'status': {
-                'active': active_users,
-                'depth': depth_users,
-                'new_users_daily': new_users.count(),
-                'new_users_with_institution_daily': new_users.filter(affiliated_institutions__isnull=False).count(),
-                'unconfirmed': OSFUser.objects.filter(date_registered__lt=query_datetime, date_confirmed__isnull=True).count(),
-                'deactivated': OSFUser.objects.filter(date_disabled__isnull=False, date_disabled__lt=query_datetime).count(),
-                'merged': OSFUser.objects.filter(date_registered__lt=query_datetime, merged_by__isnull=False).count(),
-                'profile_edited': profile_edited,
-            }
+            'status': status,
         }
 
         try:
@@ -141,10 +140,5 @@ if __name__ == '__main__':
     init_app()
     user_summary = UserSummary()
     args = user_summary.parse_args()
-    yesterday = args.yesterday
-    if yesterday:
-        date = (timezone.now() - timedelta(days=1)).date()
-    else:
-        date = parse(args.date).date() if args.date else None
-    events = user_summary.get_events(date)
+    events = user_summary.get_events_for_dates(user_summary.get_dates(args))
     user_summary.send_events(events)
@@ -17,8 +17,6 @@ from collections import defaultdict
 import progressbar
 
 from framework.celery_tasks import app as celery_app
-from osf.models import TrashedFile
-
 from website import mails
 from website.app import init_app
 
@@ -27,7 +25,7 @@ from scripts import utils as scripts_utils
 # App must be init'd before django models are imported
 init_app(set_backends=True, routes=False)
 
-from osf.models import BaseFileNode, FileVersion, OSFUser, AbstractNode
+from osf.models import NodeStorageUsage, OSFUser, AbstractNode
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
@@ -58,14 +56,8 @@ def add_to_white_list(gtg):
 
 
 def get_usage(node):
-    vids = [each for each in BaseFileNode.active.filter(provider='osfstorage', node=node).values_list('versions', flat=True) if each]
-
-    t_vids = [each for eac in TrashedFile.objects.filter(provider='osfstorage', node=node).values_list('versions', flat=True) if each]
-
-    usage = sum([v.size or 0 for v in FileVersion.objects.filter(id__in=vids)])
-    trashed_usage = sum([v.size or 0 for v in FileVersion.objects.filter(id__in=t_vids)])
-
-    return map(sum, zip(*([(usage, trashed_usage)] + [get_usage(child) for child in node.nodes_primary])))  # Adds tuples together, map(sum, zip((a, b), (c, d))) -> (a+c, b+d)
+    usage = NodeStorageUsage.get_subtree_usage(node)
+    return usage['live_bytes'], usage['trashed_bytes']
 
 
 def limit_filter(limit, (item, usage)):
@@ -53,6 +53,21 @@ class TestNodeCount(OsfTestCase):
 
         self.results = NodeSummary().get_events(self.date.date())[0]
 
+    def test_backfill_dates(self):
+        summary = NodeSummary()
+        day_before = self.date.date() - datetime.timedelta(days=1)
+        before, results = summary.get_events_for_dates([day_before, self.date.date()])
+
+        assert_equal(results, self.results)
+        assert_equal(before['keen']['timestamp'], '{}T00:00:00+00:00'.format(day_before.isoformat()))
+        assert_equal(before['nodes']['total'], 0)
+        assert_equal(before['projects']['total'], 0)
+        assert_equal(before['registered_nodes']['total'], 0)
+        assert_equal(before['registered_projects']['total'], 0)
+
+        # One query per table for every date
+        assert_equal([name for name, _ in summary.query_timings], ['nodes', 'registrations'])
+
     def test_counts(self):
 
     # test_get_node_count
@@ -135,6 +135,88 @@ class TestAddonAuth(OsfTestCase):
         assert_equal(res.status_code, 403)
 
 
+
+class TestAddonAuthCache(TestAddonAuth):
+
+    def setUp(self):
+        super(TestAddonAuthCache, self).setUp()
+        from django.core.cache import caches
+        self.cache = caches['default']
+        self.cache.clear()
+        self.backend_patcher = mock.patch.object(settings, 'CACHED_PROPERTY_BACKEND', 'default')
+        self.backend_patcher.start()
+
+    def tearDown(self):
+        self.backend_patcher.stop()
+        self.cache.clear()
+        super(TestAddonAuthCache, self).tearDown()
+
+    def test_repeat_requests_skip_check_access(self):
+        url = self.build_url()
+        with mock.patch('addons.base.views.check_access', wraps=views.check_access) as mock_check:
+            for _ in range(3):
+                res = self.app.get(url, auth=self.user.auth)
+                assert_equal(res.status_code, 200)
+        assert_equal(mock_check.call_count, 1)
+        data = jwt.decode(jwe.decrypt(res.json['payload'].encode('utf-8'), self.JWE_KEY), settings.WATERBUTLER_JWT_SECRET, algorithm=settings.WATERBUTLER_JWT_ALGORITHM)['data']
+        assert_equal(data['auth'], views.make_auth(self.user))
+
+    def test_cached_cookie_decision_resolves_user(self):
+        url = self.build_url(cookie=self.cookie)
+        self.app.get(url)
+        with mock.patch('addons.base.views.OSFUser.from_cookie') as mock_from_cookie:
+            res = self.app.get(url)
+        assert_false(mock_from_cookie.called)
+        data = jwt.decode(jwe.decrypt(res.json['payload'].encode('utf-8'), self.JWE_KEY), settings.WATERBUTLER_JWT_SECRET, algorithm=settings.WATERBUTLER_JWT_ALGORITHM)['data']
+        assert_equal(data['auth'], views.make_auth(self.user))
+
+    def test_removing_contributor_invalidates_decision(self):
+        contrib = AuthUserFactory()
+        self.node.add_contributor(contrib, auth=self.auth_obj, save=True)
+        url = self.build_url()
+        assert_equal(self.app.get(url, auth=contrib.auth).status_code, 200)
+
+        self.node.remove_contributor(contrib, auth=self.auth_obj)
+        res = self.app.get(url, auth=contrib.auth, expect_errors=True)
+        assert_equal(res.status_code, 403)
+
+    def test_removing_parent_contributor_invalidates_component_decision(self):
+        component = ProjectFactory(creator=self.user, parent=self.node)
+        contrib = AuthUserFactory()
+        self.node.add_contributor(contrib, permissions=['read', 'write', 'admin'], auth=self.auth_obj, save=True)
+        url = self.build_url(nid=component._id, provider='osfstorage')
+        assert_equal(self.app.get(url, auth=contrib.auth).status_code, 200)
+
+        self.node.remove_contributor(contrib, auth=self.auth_obj)
+        res = self.app.get(url, auth=contrib.auth, expect_errors=True)
+        assert_equal(res.status_code, 403)
+
+    def test_making_private_invalidates_decision(self):
+        self.node.set_privacy('public', auth=self.auth_obj)
+        url = self.build_url()
+        assert_equal(self.app.get(url).status_code, 200)
+
+        self.node.set_privacy('private', auth=self.auth_obj)
+        res = self.app.get(url, expect_errors=True)
+        assert_equal(res.status_code, 401)
+
+    @mock.patch('addons.base.views.cas.get_client')
+    def test_bearer_token_profile_is_cached(self, mock_cas_client):
+        mock_profile = mock.Mock(return_value=cas.CasResponse(
+            authenticated=True, user=self.user._id,
+            attributes={'accessTokenScope': {'osf.full_read'}}
+        ))
+        mock_cas_client.return_value = mock.Mock(profile=mock_profile)
+        url = self.build_url()
+        for _ in range(2):
+            res = self.app.get(url, headers={'Authorization': 'Bearer valid_access_token'})
+            assert_equal(res.status_code, 200)
+        assert_equal(mock_profile.call_count, 1)
+
+        cas.invalidate_profile('valid_access_token')
+        self.app.get(url, headers={'Authorization': 'Bearer valid_access_token'})
+        assert_equal(mock_profile.call_count, 2)
+
 class TestAddonLogs(OsfTestCase):
 
     def setUp(self):
@@ -9,7 +9,7 @@ from nose.tools import *  # noqa PEP8 asserts
 from framework.auth import Auth
 from osf.models import Comment, NotificationDigest, NotificationSubscription, Guid, OSFUser
 
-from website.notifications.tasks import get_users_emails, send_users_email, group_by_node, remove_notifications
+from website.notifications.tasks import get_users_emails, get_users_emails_chunks, send_users_email, group_by_node, remove_notifications
 from website.notifications import constants
 from website.notifications import emails
 from website.notifications import utils
@@ -1601,6 +1601,33 @@ class TestSendEmails(NotificationTestCase):
         node_lineage = emails.get_node_lineage(self.node)
         assert_equal(node_lineage, [self.project._id, self.node._id])
 
+    def test_store_emails_creates_digest_per_recipient(self):
+        timestamp = timezone.now()
+        sender = factories.UserFactory()
+        recipients = [factories.UserFactory(), factories.UserFactory()]
+        disabled = factories.UserFactory()
+        disabled.is_disabled = True
+        disabled.save()
+        recipient_ids = [user._id for user in recipients] + [sender._id, disabled._id]
+        with mock.patch('website.notifications.emails.mails.render_message', return_value='message') as mock_render:
+            emails.store_emails(recipient_ids, 'email_digest', 'comments', sender, self.node, timestamp,
+                                content='hello', gravatar_url='', url='')
+        # Recipients with the same timezone and locale share a rendered message
+        assert_equal(mock_render.call_count, 1)
+        digests = NotificationDigest.objects.filter(event='comments', send_type='email_digest')
+        assert_equal(set(digests.values_list('user_id', flat=True)), {user.id for user in recipients})
+        for digest in digests:
+            assert_equal(digest.message, 'message')
+            assert_equal(digest.node_lineage, [self.project._id, self.node._id])
+
+    def test_store_emails_renders_per_recipient_if_template_uses_recipient(self):
+        sender = factories.UserFactory()
+        recipients = [factories.UserFactory(), factories.UserFactory()]
+        with mock.patch('website.notifications.emails.mails.render_message', return_value='message') as mock_render:
+            emails.store_emails([user._id for user in recipients], 'email_digest', 'reviews_submission_status',
+                                sender, self.node, timezone.now())
+        assert_equal(mock_render.call_count, 2)
+
     def test_fix_locale(self):
         assert emails.fix_locale('en') == 'en'
         assert emails.fix_locale('de_DE') == 'de_DE'
@@ -1766,6 +1793,71 @@ class TestSendDigest(OsfTestCase):
         digest_ids = [d._id, d2._id, d3._id]
         remove_notifications(email_notification_ids=digest_ids)
 
+    def test_get_users_emails_chunks(self):
+        send_type = 'email_transactional'
+        for user in (self.user_1, self.user_2, self.user_2):
+            factories.NotificationDigestFactory(
+                user=user,
+                send_type=send_type,
+                timestamp=self.timestamp,
+                message='Hello',
+                node_lineage=[self.project._id]
+            )
+        chunks = list(get_users_emails_chunks(send_type, chunk_size=1))
+        assert_equal(len(chunks), 2)
+        assert_equal([[user_id for user_id, _ in chunk] for chunk in chunks], [[self.user_1.id], [self.user_2.id]])
+        assert_equal(len(chunks[1][0][1]['info']), 2)
+
+    @mock.patch('website.mails.send_mail')
+    def test_send_users_email_removes_sent_digests(self, mock_send_mail):
+        send_type = 'email_transactional'
+        for user in (self.user_1, self.user_2):
+            factories.NotificationDigestFactory(
+                user=user,
+                send_type=send_type,
+                timestamp=self.timestamp,
+                message='Hello',
+                node_lineage=[self.project._id]
+            )
+        pending = factories.NotificationDigestFactory(
+            user=self.user_1,
+            send_type='email_digest',
+            timestamp=self.timestamp,
+            message='Hello',
+            node_lineage=[self.project._id]
+        )
+        with mock.patch.object(settings, 'NOTIFICATION_DIGEST_CHUNK_SIZE', 1):
+            send_users_email(send_type)
+        assert_equal(mock_send_mail.call_count, 2)
+        assert_equal(list(NotificationDigest.objects.values_list('_id', flat=True)), [pending._id])
+
+    @mock.patch('website.notifications.tasks.log_exception')
+    @mock.patch('website.mails.send_mail')
+    def test_send_users_email_keeps_digests_that_failed_to_send(self, mock_send_mail, mock_log_exception):
+        send_type = 'email_transactional'
+        digests = {}
+        for user in (self.user_1, self.user_2):
+            digests[user.username] = factories.NotificationDigestFactory(
+                user=user,
+                send_type=send_type,
+                timestamp=self.timestamp,
+                message='Hello',
+                node_lineage=[self.project._id]
+            )
+
+        def send_mail(to_addr, **kwargs):
+            if to_addr == self.user_1.username:
+                raise IOError('Connection refused')
+        mock_send_mail.side_effect = send_mail
+
+        send_users_email(send_type)
+        assert_equal(mock_send_mail.call_count, 2)
+        assert_true(mock_log_exception.called)
+        assert_equal(
+            list(NotificationDigest.objects.values_list('_id', flat=True)),
+            [digests[self.user_1.username]._id]
+        )
+
     @mock.patch('website.mails.send_mail')
     def test_send_users_email_called_with_correct_args(self, mock_send_mail):
         send_type = 'email_transactional'
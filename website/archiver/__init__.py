@@ -29,14 +29,14 @@ NO_ARCHIVE_LIMIT = 'high_upload_limit'
 
 class StatResult(dict):
     """
-    Helper class to collect metadata about a single file
+    Helper class to collect metadata about a single file, or the totals of a file tree
+    that was not walked file by file
     """
-    num_files = 1
-
-    def __init__(self, target_id, target_name, disk_usage=0):
+    def __init__(self, target_id, target_name, disk_usage=0, num_files=1):
         self.target_id = target_id
         self.target_name = target_name
         self.disk_usage = float(disk_usage)
+        self.num_files = num_files
 
         self.update({
             'target_id': self.target_id,
@@ -129,7 +129,7 @@ def stat_addon(addon_short_name, job_pk):
         # Addon enabled but not configured - no file trees, nothing to archive.
         return AggregateStatResult(src_addon._id, addon_short_name)
     try:
-        file_tree = src_addon._get_file_tree(user=user, version=version)
+        stat_result = utils.stat_file_tree(addon_short_name, src_addon, user, version=version)
     except HTTPError as e:
         dst.archive_job.update_target(
             addon_short_name,
@@ -140,7 +140,7 @@ def stat_addon(addon_short_name, job_pk):
     result = AggregateStatResult(
         src_addon._id,
         addon_short_name,
-        targets=[utils.aggregate_file_tree_metadata(addon_short_name, file_tree, user)],
+        targets=[stat_result],
     )
     return result
 
@@ -290,9 +290,10 @@ def archive_success(dst_pk, job_pk):
 
     note:: At first glance this task makes redundant calls to utils.get_file_map (which
     returns a generator yielding  (<sha256>, <file_metadata>) pairs) on the dst Node. Two
-    notes about utils.get_file_map: 1) this function memoizes previous results to reduce
-    overhead and 2) this function returns a generator that lazily fetches the file metadata
-    of child Nodes (it is possible for a selected file to belong to a child Node) using a
+    notes about utils.get_file_map: 1) this function caches previous results in the
+    bounded utils.file_map_cache to reduce overhead (entries for dst are dropped once
+    this task is done with them) and 2) this function returns a generator that lazily
+    fetches the file metadata of child Nodes (it is possible for a selected file to belong to a child Node) using a
     non-recursive DFS. Combined this allows for a relatively effient implementation with
     seemingly redundant calls.
     """
@@ -303,9 +304,12 @@ def archive_success(dst_pk, job_pk):
     # questions. These files are references to files on the unregistered Node, and
     # consequently we must migrate those file paths after archiver has run. Using
     # sha256 hashes is a convenient way to identify files post-archival.
-    for schema in dst.registered_schema.all():
-        if schema.has_files:
-            utils.migrate_file_metadata(dst, schema)
+    try:
+        for schema in dst.registered_schema.all():
+            if schema.has_files:
+                utils.migrate_file_metadata(dst, schema)
+    finally:
+        utils.clear_file_map(dst)
     job = ArchiveJob.load(job_pk)
     if not job.sent:
         job.sent = True
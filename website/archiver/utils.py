@@ -1,9 +1,12 @@
 import functools
+import threading
+import time
+from collections import OrderedDict, deque
 
 from framework.auth import Auth
 
 from website.archiver import (
-    StatResult, AggregateStatResult,
+    StatResult,
     ARCHIVER_NETWORK_ERROR,
     ARCHIVER_SIZE_EXCEEDED,
     ARCHIVER_FILE_NOT_FOUND,
@@ -142,29 +145,28 @@ def link_archive_provider(node, user):
         addon.on_add()
     node.save()
 
-def aggregate_file_tree_metadata(addon_short_name, fileobj_metadata, user):
-    """Recursively traverse the addon's file tree and collect metadata in AggregateStatResult
+def stat_file_tree(addon_short_name, src_addon, user, version=None):
+    """Total the number of files and disk usage of an addon without holding its file tree
 
+    :param addon_short_name: AddonConfig.short_name of the addon being examined
     :param src_addon: AddonNodeSettings instance of addon being examined
-    :param fileobj_metadata: file or folder metadata of current point of reference
-    in file tree
     :param user: archive initatior
-    :return: top-most recursive call returns AggregateStatResult containing addon file tree metadata
+    :param version: version of the addon's files to examine, if the addon is versioned
+    :return: StatResult containing the totals for the whole addon
     """
-    disk_usage = fileobj_metadata.get('size')
-    if fileobj_metadata['kind'] == 'file':
-        result = StatResult(
-            target_name=fileobj_metadata['name'],
-            target_id=fileobj_metadata['path'].lstrip('/'),
-            disk_usage=disk_usage or 0,
-        )
-        return result
+    if hasattr(src_addon, 'get_file_stats'):
+        num_files, disk_usage = src_addon.get_file_stats()
     else:
-        return AggregateStatResult(
-            target_id=fileobj_metadata['path'].lstrip('/'),
-            target_name=fileobj_metadata['name'],
-            targets=[aggregate_file_tree_metadata(addon_short_name, child, user) for child in fileobj_metadata.get('children', [])],
-        )
+        num_files, disk_usage = 0, 0
+        for fileobj_metadata in src_addon._iter_file_tree(user=user, version=version, workers=settings.ARCHIVER_STAT_WORKERS):
+            num_files += 1
+            disk_usage += float(fileobj_metadata.get('size') or 0)
+    return StatResult(
+        target_id='',
+        target_name=addon_short_name,
+        disk_usage=disk_usage,
+        num_files=num_files,
+    )
 
 def before_archive(node, user):
     from osf.models import ArchiveJob
@@ -180,26 +182,78 @@ def _do_get_file_map(file_tree):
     """Reduces a tree of folders and files into a list of (<sha256>, <file_metadata>) pairs
     """
     file_map = []
-    stack = [file_tree]
-    while len(stack):
-        tree_node = stack.pop(0)
+    queue = deque([file_tree])
+    while queue:
+        tree_node = queue.popleft()
         if tree_node['kind'] == 'file':
             file_map.append((tree_node['extra']['hashes']['sha256'], tree_node))
         else:
-            stack = stack + tree_node['children']
+            queue.extend(tree_node['children'])
     return file_map
 
+
+class FileMapCache(object):
+    """Thread-safe LRU cache of node file maps, keyed on node ``_id``.
+
+    At most ``max_size`` file maps are kept, and each expires ``timeout`` seconds
+    after it was stored, so long-lived workers do not accumulate file trees.
+    """
+    def __init__(self, max_size, timeout):
+        self.max_size = max_size
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.time():
+                return None
+            self._entries[key] = entry
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.time() + self.timeout, value)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+file_map_cache = FileMapCache(settings.ARCHIVER_FILE_MAP_CACHE_SIZE, settings.ARCHIVER_FILE_MAP_CACHE_TIMEOUT)
+
 def _memoize_get_file_map(func):
-    cache = {}
     @functools.wraps(func)
     def wrapper(node):
-        if node._id not in cache:
+        file_map = file_map_cache.get(node._id)
+        if file_map is None:
             osf_storage = node.get_addon('osfstorage')
             file_tree = osf_storage._get_file_tree(user=node.creator)
-            cache[node._id] = _do_get_file_map(file_tree)
-        return func(node, cache[node._id])
+            file_map = _do_get_file_map(file_tree)
+            file_map_cache.set(node._id, file_map)
+        return func(node, file_map)
     return wrapper
 
+def clear_file_map(node):
+    """Drop the cached file maps of ``node`` and its primary descendants"""
+    file_map_cache.delete(node._id)
+    for descendant in node.get_descendants_recursive(primary_only=True):
+        file_map_cache.delete(descendant._id)
+
 @_memoize_get_file_map
 def get_file_map(node, file_map):
     """
@@ -14,6 +14,8 @@ def copy_files(src, target_node, parent=None, name=None):
     cloned.node = target_node
     cloned.name = name or cloned.name
     cloned.copied_from = src
+    # Downloads are counted per file
+    cloned.download_count = 0
 
     cloned.save()
 
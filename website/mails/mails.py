@@ -73,6 +73,16 @@ def render_message(tpl_name, **context):
     return tpl.render(**context)
 
 
+def template_uses(tpl_name, name):
+    """Return whether rendering ``tpl_name`` may read ``name`` from its context.
+
+    This errs on the side of True: any mention of ``name`` in the template source counts,
+    and templates that pull in other templates are assumed to use every name.
+    """
+    source = _tpl_lookup.get_template(tpl_name).source
+    return name in source or any(tag in source for tag in ('<%include', '<%inherit', '<%namespace'))
+
+
 def send_mail(to_addr, mail, mimetype='plain', from_addr=None, mailer=None, celery=True,
             username=None, password=None, callback=None, attachment_name=None, attachment_content=None, **context):
     """Send an email from the OSF.
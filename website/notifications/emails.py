@@ -94,26 +94,33 @@ def store_emails(recipient_ids, notification_type, event, user, node, timestamp,
     # user whose action triggered email sending
     context['user'] = user
     node_lineage_ids = get_node_lineage(node) if node else []
+    # Unless the template addresses the recipient directly, recipients who share a timezone
+    # and locale get identical messages, so each distinct message is only rendered once
+    per_recipient = mails.template_uses(template, 'recipient')
+    messages = {}
 
-    for recipient_id in recipient_ids:
-        if recipient_id == user._id:
-            continue
-        recipient = OSFUser.load(recipient_id)
-        if recipient.is_disabled:
-            continue
-        context['localized_timestamp'] = localize_timestamp(timestamp, recipient)
-        context['recipient'] = recipient
-        message = mails.render_message(template, **context)
+    recipients = OSFUser.objects.filter(
+        guids___id__in=[recipient_id for recipient_id in recipient_ids if recipient_id != user._id],
+        date_disabled__isnull=True,
+    ).order_by('id')
+
+    digests = []
+    for recipient in recipients:
+        key = recipient.id if per_recipient else (recipient.timezone, recipient.locale)
+        if key not in messages:
+            context['localized_timestamp'] = localize_timestamp(timestamp, recipient)
+            context['recipient'] = recipient
+            messages[key] = mails.render_message(template, **context)
 
-        digest = NotificationDigest(
+        digests.append(NotificationDigest(
             timestamp=timestamp,
             send_type=notification_type,
             event=event,
             user=recipient,
-            message=message,
+            message=messages[key],
             node_lineage=node_lineage_ids
-        )
-        digest.save()
+        ))
+    NotificationDigest.objects.bulk_create(digests)
 
 
 def compile_subscriptions(node, event_type, event=None, level=0):
@@ -2,6 +2,8 @@
 Tasks for making even transactional emails consolidated.
 """
 import itertools
+import logging
+from multiprocessing.pool import ThreadPool
 
 from django.db import connection
 
@@ -9,36 +11,66 @@ from framework.celery_tasks import app as celery_app
 from framework.sentry import log_exception
 from osf.models import OSFUser
 from osf.models import NotificationDigest
-from website import mails
+from website import mails, settings
 from website.notifications.utils import NotificationsDict
 
+logger = logging.getLogger(__name__)
+
 
 @celery_app.task(name='website.notifications.tasks.send_users_email', max_retries=0)
 def send_users_email(send_type):
     """Find pending Emails and amalgamates them into a single Email.
 
+    Digests are processed in chunks of users, and each chunk's digests are deleted as soon as
+    they have been sent, so a run that dies partway through resumes with the remaining users.
+    Digests whose email fails to send are kept for the next run.
+
     :param send_type
     :return:
     """
-    grouped_emails = get_users_emails(send_type)
-    for group in grouped_emails:
-        user = OSFUser.load(group['user_id'])
-        if not user:
-            log_exception()
-            continue
-        info = group['info']
-        notification_ids = [message['_id'] for message in info]
-        sorted_messages = group_by_node(info)
-        if sorted_messages:
-            if not user.is_disabled:
-                mails.send_mail(
-                    to_addr=user.username,
-                    mimetype='html',
-                    mail=mails.DIGEST,
-                    name=user.fullname,
-                    message=sorted_messages,
-                )
+    pool = ThreadPool(settings.NOTIFICATION_DIGEST_SEND_WORKERS)
+    try:
+        for chunk in get_users_emails_chunks(send_type):
+            users = OSFUser.objects.in_bulk([user_id for user_id, _ in chunk])
+            notification_ids = []
+            messages = []
+            for user_id, group in chunk:
+                user = users.get(user_id)
+                if not user:
+                    log_exception()
+                    continue
+                info = group['info']
+                sorted_messages = group_by_node(info)
+                if sorted_messages:
+                    ids = [message['_id'] for message in info]
+                    if user.is_disabled:
+                        notification_ids.extend(ids)
+                    else:
+                        messages.append((user, sorted_messages, ids))
+            for sent_ids in pool.map(_send_digest, messages):
+                notification_ids.extend(sent_ids)
             remove_notifications(email_notification_ids=notification_ids)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def _send_digest(args):
+    """Send one user's digest. Returns the ids of the digests sent, or none if sending failed."""
+    user, sorted_messages, notification_ids = args
+    try:
+        mails.send_mail(
+            to_addr=user.username,
+            mimetype='html',
+            mail=mails.DIGEST,
+            name=user.fullname,
+            message=sorted_messages,
+        )
+    except Exception:
+        logger.exception('Failed to send notification digest to user {}'.format(user._id))
+        log_exception()
+        return []
+    return notification_ids
 
 
 def get_users_emails(send_type):
@@ -62,29 +94,53 @@ def get_users_emails(send_type):
             }
         }
     """
+    return (group for _, group in itertools.chain.from_iterable(get_users_emails_chunks(send_type)))
+
+
+def get_users_emails_chunks(send_type, chunk_size=None):
+    """Get emails that need to be sent, grouped by user, in chunks of ``chunk_size`` users.
+
+    Chunks are read lazily in order of user primary key, so only one chunk is held in memory.
+
+    :param send_type: from NOTIFICATION_TYPES
+    :return: Iterable of lists of ``(user primary key, group)`` tuples, where ``group`` is a
+        dict in the form returned by ``get_users_emails``
+    """
+    chunk_size = chunk_size or settings.NOTIFICATION_DIGEST_CHUNK_SIZE
 
     sql = """
-    SELECT json_build_object(
+    SELECT nd.user_id, json_build_object(
             'user_id', osf_guid._id,
             'info', json_agg(
                 json_build_object(
                     'message', nd.message,
                     'node_lineage', nd.node_lineage,
                     '_id', nd._id
-                )
+                ) ORDER BY nd.id
             )
         )
     FROM osf_notificationdigest AS nd
-      LEFT JOIN osf_guid ON nd.user_id = osf_guid.object_id
-    WHERE send_type = %s
+      INNER JOIN osf_guid ON nd.user_id = osf_guid.object_id
+    WHERE nd.send_type = %s
     AND osf_guid.content_type_id = (SELECT id FROM django_content_type WHERE model = 'osfuser')
-    GROUP BY osf_guid.id
-    ORDER BY osf_guid.id ASC
+    AND nd.user_id = ANY(%s)
+    GROUP BY nd.user_id, osf_guid.id
+    ORDER BY nd.user_id ASC
     """
 
-    with connection.cursor() as cursor:
-        cursor.execute(sql, [send_type, ])
-        return itertools.chain.from_iterable(cursor.fetchall())
+    last_user_id = 0
+    while True:
+        user_ids = list(
+            NotificationDigest.objects.filter(send_type=send_type, user_id__gt=last_user_id)
+            .order_by('user_id').values_list('user_id', flat=True).distinct()[:chunk_size]
+        )
+        if not user_ids:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [send_type, user_ids])
+            chunk = cursor.fetchall()
+        yield chunk
+        last_user_id = user_ids[-1]
 
 
 def group_by_node(notifications, limit=15):
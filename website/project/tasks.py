@@ -1,10 +1,14 @@
 from django.apps import apps
+from django.db import transaction
 import logging
+import threading
 import urlparse
 import random
 import requests
 
+from framework.auth.core import Auth
 from framework.celery_tasks import app as celery_app
+from framework.celery_tasks.handlers import enqueue_task, in_request_context, queue as celery_queue
 
 from website import settings, mails
 from website.util.share import GraphNode, format_contributor
@@ -12,6 +16,81 @@ from website.util.share import GraphNode, format_contributor
 
 logger = logging.getLogger(__name__)
 
+_local = threading.local()
+
+# Number of descendants reindexed per bulk request by update_descendant_search
+DESCENDANT_SEARCH_BATCH_SIZE = 99
+
+
+class PendingNodeUpdate(object):
+    """The fields saved on a node during the current request, and the side effects
+    already enqueued for them.
+    """
+    def __init__(self):
+        self.saved_fields = []
+        self.routes = set()
+
+
+def pending_node_updates():
+    # Celery queues are replaced at the start of every request, so updates are scoped to it
+    tasks = celery_queue()
+    if getattr(_local, 'queue', None) is not tasks:
+        _local.queue = tasks
+        _local.updates = {}
+    return _local.updates
+
+
+def get_update_routes(node, saved_fields):
+    return {
+        route for route, fields in node.UPDATE_ROUTES.items()
+        if fields is None or fields.intersection(saved_fields)
+    }
+
+
+def enqueue_node_update(node, user_id, first_save, saved_fields, request_headers=None):
+    """Enqueue the side effects of saving ``saved_fields`` on ``node``, as routed by
+    ``AbstractNode.UPDATE_ROUTES``.
+
+    Within a request, every save of a node shares one list of saved fields and each side
+    effect is enqueued at most once. Tasks are dispatched after the request, so they see
+    every field saved during it.
+    """
+    from api.caching.tasks import ban_url
+
+    if in_request_context():
+        pending = pending_node_updates().setdefault(node._id, PendingNodeUpdate())
+        pending.saved_fields.extend(field for field in saved_fields if field not in pending.saved_fields)
+    else:
+        pending = PendingNodeUpdate()
+        pending.saved_fields.extend(saved_fields)
+    saved_fields = pending.saved_fields
+    routes = get_update_routes(node, saved_fields) - pending.routes
+
+    if 'search' in routes:
+        enqueue_task(on_node_updated.s(node._id, user_id, first_save, saved_fields, request_headers))
+    if 'preprints' in routes:
+        if node.preprint_file_id:
+            enqueue_preprint_updates(node)
+        else:
+            # A preprint file saved later in the request still needs the update
+            routes.discard('preprints')
+    if 'spam' in routes and user_id and settings.SPAM_CHECK_ENABLED:
+        enqueue_task(check_node_spam.s(node._id, user_id, saved_fields, request_headers))
+    if 'descendants' in routes:
+        enqueue_task(update_descendant_search.s(node._id))
+    if 'bans' in routes:
+        ban_url(node)
+    pending.routes.update(routes)
+
+
+def enqueue_preprint_updates(node):
+    # avoid circular imports
+    from website.preprints.tasks import on_preprint_updated
+    PreprintService = apps.get_model('osf.PreprintService')
+    # .preprints wouldn't return a single deleted preprint
+    for preprint_id in PreprintService.objects.filter(node_id=node.id, is_published=True).values_list('guids___id', flat=True):
+        enqueue_task(on_preprint_updated.s(preprint_id))
+
 
 @celery_app.task(ignore_results=True)
 def on_node_updated(node_id, user_id, first_save, saved_fields, request_headers=None):
@@ -31,9 +110,71 @@ def on_node_updated(node_id, user_id, first_save, saved_fields, request_headers=
         need_update = False
 
     if need_update:
-        node.update_search()
+        node.update_search(saved_fields=saved_fields)
         update_node_share(node)
 
+@celery_app.task(ignore_results=True)
+def check_node_spam(node_id, user_id, saved_fields, request_headers=None):
+    AbstractNode = apps.get_model('osf.AbstractNode')
+    OSFUser = apps.get_model('osf.OSFUser')
+    node = AbstractNode.load(node_id)
+    user = OSFUser.load(user_id)
+    if not user:
+        return
+
+    with transaction.atomic():
+        if node.check_spam(user, saved_fields, request_headers):
+            node.save()
+
+@celery_app.task(ignore_results=True)
+def update_descendant_search(node_id):
+    """Reindex the public descendants of a node that inherit its license."""
+    AbstractNode = apps.get_model('osf.AbstractNode')
+    node = AbstractNode.load(node_id)
+    children = list(node.descendants.filter(node_license=None, is_public=True, is_deleted=False))
+    for i in range(0, len(children), DESCENDANT_SEARCH_BATCH_SIZE):
+        node.bulk_update_search(children[i:i + DESCENDANT_SEARCH_BATCH_SIZE], saved_fields=['node_license'])
+
+@celery_app.task(bind=True, ignore_result=False)
+def fork_node(self, node_id, user_id, title=None):
+    """Fork a node in the background, for subtrees too large to fork within a request.
+
+    While running, the task's state is PROGRESS with ``{'done': ..., 'total': ...}`` node
+    counts as its info. Its result is the fork's guid.
+    """
+    AbstractNode = apps.get_model('osf.AbstractNode')
+    OSFUser = apps.get_model('osf.OSFUser')
+    node = AbstractNode.load(node_id)
+    auth = Auth(user=OSFUser.load(user_id))
+
+    def progress(done, total):
+        if not self.request.called_directly:
+            self.update_state(state='PROGRESS', meta={'done': done, 'total': total})
+
+    with transaction.atomic():
+        fork = node.fork_node(auth, title=title, progress=progress)
+    return fork._id
+
+
+@celery_app.task(ignore_result=False)
+def register_node(node_id, user_id, schema_id, data):
+    """Register a node tree in the background. Archiving starts once the registrations are
+    committed. The task's result is the root registration's guid.
+    """
+    AbstractNode = apps.get_model('osf.AbstractNode')
+    MetaSchema = apps.get_model('osf.MetaSchema')
+    OSFUser = apps.get_model('osf.OSFUser')
+    node = AbstractNode.load(node_id)
+    auth = Auth(user=OSFUser.load(user_id))
+    schema = MetaSchema.load(schema_id)
+
+    with transaction.atomic():
+        registration = node.register_node(schema, auth, data, archive=False)
+    if settings.ENABLE_ARCHIVER:
+        registration.start_archive(auth.user)
+    return registration._id
+
+
 def update_node_share(node):
     # Wrapper that ensures share_url and token exist
     if settings.SHARE_URL:
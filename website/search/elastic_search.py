@@ -8,6 +8,7 @@ import functools
 import logging
 import math
 import re
+import time
 import unicodedata
 from framework import sentry
 
@@ -15,7 +16,8 @@ import six
 
 from django.apps import apps
 from django.core.paginator import Paginator
-from django.db.models import Q
+from django.db.models import Min, Q
+from django.utils import timezone
 from elasticsearch import (ConnectionError, Elasticsearch, NotFoundError,
                            RequestError, TransportError, helpers)
 from framework.celery_tasks import app as celery_app
@@ -302,6 +304,14 @@ def load_parent(parent_id):
 
 COMPONENT_CATEGORIES = set(settings.NODE_CATEGORY_MAP.keys())
 
+# Node fields copied into (or deciding the visibility of) the documents of the node's files
+FILE_DENORMALIZED_NODE_FIELDS = {
+    'title',
+    'is_public',
+    'is_deleted',
+    'retraction',
+}
+
 def get_doctype_from_node(node):
     if node.is_registration:
         return 'registration'
@@ -316,11 +326,11 @@ def get_doctype_from_node(node):
         return node.category
 
 @celery_app.task(bind=True, max_retries=5, default_retry_delay=60)
-def update_node_async(self, node_id, index=None, bulk=False):
+def update_node_async(self, node_id, index=None, bulk=False, saved_fields=None):
     AbstractNode = apps.get_model('osf.AbstractNode')
     node = AbstractNode.load(node_id)
     try:
-        update_node(node=node, index=index, bulk=bulk, async=True)
+        update_node(node=node, index=index, bulk=bulk, async=True, saved_fields=saved_fields)
     except Exception as exc:
         self.retry(exc=exc)
 
@@ -333,6 +343,103 @@ def update_user_async(self, user_id, index=None):
     except Exception as exc:
         self.retry(exc)
 
+@celery_app.task(ignore_results=True)
+def flush_pending_updates(batch_size=None, max_batches=None):
+    """Reindex everything in the ``PendingSearchUpdate`` queue through the bulk API.
+
+    Runs periodically (see ``SEARCH_UPDATE_FLUSH_INTERVAL``), so every save of an object
+    within one interval is written to elasticsearch once. Writes do not force a refresh;
+    documents become searchable after the index's refresh interval.
+    """
+    PendingSearchUpdate = apps.get_model('osf.PendingSearchUpdate')
+    batch_size = batch_size or settings.SEARCH_UPDATE_FLUSH_BATCH_SIZE
+    max_batches = max_batches or settings.SEARCH_UPDATE_FLUSH_MAX_BATCHES
+
+    flushed = 0
+    failed = 0
+    last_id = 0
+    start = time.time()
+    for _ in range(max_batches):
+        # Entries that fail stay queued for the next run, so page past them rather than retrying now
+        entries = list(PendingSearchUpdate.objects.filter(id__gt=last_id).order_by('id')[:batch_size])
+        if not entries:
+            break
+        last_id = entries[-1].id
+        failed_ids = _flush_entries(entries)
+        PendingSearchUpdate.acknowledge([entry for entry in entries if entry.doc_id not in failed_ids])
+        flushed += len(entries)
+        failed += len([entry for entry in entries if entry.doc_id in failed_ids])
+        if len(entries) < batch_size:
+            break
+
+    if flushed:
+        oldest = PendingSearchUpdate.objects.aggregate(oldest=Min('created'))['oldest']
+        logger.info('Flushed {} pending search updates ({} failed) in {:.3f}s; queue depth is now {}, lag {:.0f}s'.format(
+            flushed - failed, failed, time.time() - start, PendingSearchUpdate.objects.count(),
+            (timezone.now() - oldest).total_seconds() if oldest else 0
+        ))
+    return flushed - failed
+
+def _bulk(actions):
+    """Send ``actions`` through the bulk API and return the ids of the documents whose action failed.
+
+    Deleting a document that was never indexed 404s; that is expected and not a failure.
+    """
+    _, errors = helpers.bulk(client(), actions, chunk_size=settings.ELASTIC_BULK_CHUNK_SIZE, raise_on_error=False)
+    failures = []
+    for error in errors:
+        op_type, item = error.items()[0]
+        if op_type == 'delete' and item.get('status') == 404:
+            continue
+        failures.append(item)
+    if failures:
+        logger.error('{} elasticsearch bulk actions failed, e.g. {}'.format(len(failures), failures[0]))
+    return {item['_id'] for item in failures}
+
+def _flush_entries(entries, index=None):
+    from addons.osfstorage.models import OsfStorageFile
+    index = index or INDEX
+    PendingSearchUpdate = apps.get_model('osf.PendingSearchUpdate')
+    by_type = {doc_type: {} for doc_type, _ in PendingSearchUpdate.DOC_TYPES}
+    for entry in entries:
+        by_type[entry.doc_type][entry.doc_id] = entry
+
+    actions = []
+    failed_ids = set()
+
+    pending_nodes = by_type[PendingSearchUpdate.NODE]
+    for node in AbstractNode.objects.filter(guids___id__in=pending_nodes.keys()):
+        if pending_nodes[node._id].reindex_files and bulk_update_node_files(node, index=index):
+            failed_ids.add(node._id)
+        if is_node_indexable(node):
+            category = get_doctype_from_node(node)
+            actions.append({'_op_type': 'index', '_index': index, '_type': category, '_id': node._id, '_source': serialize_node(node, category)})
+        else:
+            actions.append({'_op_type': 'delete', '_index': index, '_type': get_delete_doctype_from_node(node), '_id': node._id})
+
+    for user in OSFUser.objects.filter(guids___id__in=by_type[PendingSearchUpdate.USER].keys()):
+        if user.is_active:
+            actions.append({'_op_type': 'index', '_index': index, '_type': 'user', '_id': user._id, '_source': serialize_user(user)})
+        else:
+            # Disabled users may also need their quickfiles removed; not worth batching
+            update_user(user, index=index)
+
+    pending_files = set(by_type[PendingSearchUpdate.FILE].keys())
+    for file_ in OsfStorageFile.objects.filter(_id__in=pending_files):
+        pending_files.discard(file_._id)
+        file_doc = serialize_file(file_)
+        if file_doc is None:
+            actions.append({'_op_type': 'delete', '_index': index, '_type': 'file', '_id': file_._id})
+        else:
+            actions.append({'_op_type': 'index', '_index': index, '_type': 'file', '_id': file_._id, '_source': file_doc})
+    # Whatever is left was deleted (trashed) since it was enqueued
+    for file_id in pending_files:
+        actions.append({'_op_type': 'delete', '_index': index, '_type': 'file', '_id': file_id})
+
+    if actions:
+        failed_ids.update(_bulk(actions))
+    return failed_ids
+
 def serialize_node(node, category):
     NodeWikiPage = apps.get_model('addons_wiki.NodeWikiPage')
 
@@ -384,15 +491,22 @@ def serialize_node(node, category):
 
     return elastic_document
 
+def is_qa_node(node):
+    return bool(set(settings.DO_NOT_INDEX_LIST['tags']).intersection(node.tags.all().values_list('name', flat=True))) or any(substring in node.title for substring in settings.DO_NOT_INDEX_LIST['titles'])
+
+def is_node_indexable(node):
+    return not (node.is_deleted or not node.is_public or node.archiving or (node.is_spammy and settings.SPAM_FLAGGED_REMOVE_FROM_SEARCH) or node.is_quickfiles or is_qa_node(node))
+
 @requires_search
-def update_node(node, index=None, bulk=False, async=False):
-    from addons.osfstorage.models import OsfStorageFile
+def update_node(node, index=None, bulk=False, async=False, saved_fields=None):
+    """Reindex ``node``. Its files are only reindexed if ``saved_fields`` is None or
+    contains one of ``FILE_DENORMALIZED_NODE_FIELDS``.
+    """
     index = index or INDEX
-    for file_ in paginated(OsfStorageFile, Q(node=node)):
-        update_file(file_, index=index)
+    if saved_fields is None or FILE_DENORMALIZED_NODE_FIELDS.intersection(saved_fields):
+        bulk_update_node_files(node, index=index)
 
-    is_qa_node = bool(set(settings.DO_NOT_INDEX_LIST['tags']).intersection(node.tags.all().values_list('name', flat=True))) or any(substring in node.title for substring in settings.DO_NOT_INDEX_LIST['titles'])
-    if node.is_deleted or not node.is_public or node.archiving or (node.is_spammy and settings.SPAM_FLAGGED_REMOVE_FROM_SEARCH) or node.is_quickfiles or is_qa_node:
+    if not is_node_indexable(node):
         delete_doc(node._id, node, index=index)
     else:
         category = get_doctype_from_node(node)
@@ -449,28 +563,7 @@ def update_contributors_async(self, user_id):
     for page_num in p.page_range:
         bulk_update_contributors(p.page(page_num).object_list)
 
-@requires_search
-def update_user(user, index=None):
-
-    index = index or INDEX
-    if not user.is_active:
-        try:
-            client().delete(index=index, doc_type='user', id=user._id, refresh=True, ignore=[404])
-            # update files in their quickfiles node if the user has been marked as spam
-            if 'spam_confirmed' in user.system_tags:
-                quickfiles = QuickFilesNode.objects.get_for_user(user)
-                for quickfile_id in quickfiles.files.values_list('_id', flat=True):
-                    client().delete(
-                        index=index,
-                        doc_type='file',
-                        id=quickfile_id,
-                        refresh=True,
-                        ignore=[404]
-                    )
-        except NotFoundError:
-            pass
-        return
-
+def serialize_user(user):
     names = dict(
         fullname=user.fullname,
         given_name=user.given_name,
@@ -488,7 +581,7 @@ def update_user(user, index=None):
                 pass  # This is fine, will only happen in 2.x if val is already unicode
             normalized_names[key] = unicodedata.normalize('NFKD', val).encode('ascii', 'ignore')
 
-    user_doc = {
+    return {
         'id': user._id,
         'user': user.fullname,
         'normalized_user': normalized_names['fullname'],
@@ -505,23 +598,41 @@ def update_user(user, index=None):
         'boost': 2,  # TODO(fabianvf): Probably should make this a constant or something
     }
 
-    client().index(index=index, doc_type='user', body=user_doc, id=user._id, refresh=True)
-
 @requires_search
-def update_file(file_, index=None, delete=False):
+def update_user(user, index=None):
+
     index = index or INDEX
+    if not user.is_active:
+        try:
+            client().delete(index=index, doc_type='user', id=user._id, refresh=True, ignore=[404])
+            # update files in their quickfiles node if the user has been marked as spam
+            if 'spam_confirmed' in user.system_tags:
+                quickfiles = QuickFilesNode.objects.get_for_user(user)
+                for quickfile_id in quickfiles.files.values_list('_id', flat=True):
+                    client().delete(
+                        index=index,
+                        doc_type='file',
+                        id=quickfile_id,
+                        refresh=True,
+                        ignore=[404]
+                    )
+        except NotFoundError:
+            pass
+        return
 
+    user_doc = serialize_user(user)
+    client().index(index=index, doc_type='user', body=user_doc, id=user._id, refresh=True)
+
+def serialize_file(file_, node_is_qa=None):
+    """Return the search document for ``file_``, or None if it should not be indexed.
+
+    :param bool node_is_qa: Precomputed ``is_qa_node(file_.node)``, when serializing many files of one node
+    """
+    if node_is_qa is None:
+        node_is_qa = is_qa_node(file_.node)
     # TODO: Can remove 'not file_.name' if we remove all base file nodes with name=None
-    file_node_is_qa = bool(set(settings.DO_NOT_INDEX_LIST['tags']).intersection(file_.node.tags.all().values_list('name', flat=True))) or any(substring in file_.node.title for substring in settings.DO_NOT_INDEX_LIST['titles'])
-    if not file_.name or not file_.node.is_public or delete or file_.node.is_deleted or file_.node.archiving or file_node_is_qa:
-        client().delete(
-            index=index,
-            doc_type='file',
-            id=file_._id,
-            refresh=True,
-            ignore=[404]
-        )
-        return
+    if not file_.name or not file_.node.is_public or file_.node.is_deleted or file_.node.archiving or node_is_qa:
+        return None
 
     # We build URLs manually here so that this function can be
     # run outside of a Flask request context (e.g. in a celery task)
@@ -550,6 +661,22 @@ def update_file(file_, index=None, delete=False):
         'is_retracted': file_.node.is_retracted,
         'extra_search_terms': clean_splitters(file_.name),
     }
+    return file_doc
+
+@requires_search
+def update_file(file_, index=None, delete=False):
+    index = index or INDEX
+    file_doc = None if delete else serialize_file(file_)
+
+    if file_doc is None:
+        client().delete(
+            index=index,
+            doc_type='file',
+            id=file_._id,
+            refresh=True,
+            ignore=[404]
+        )
+        return
 
     client().index(
         index=index,
@@ -559,6 +686,27 @@ def update_file(file_, index=None, delete=False):
         refresh=True
     )
 
+@requires_search
+def bulk_update_node_files(node, index=None):
+    """Reindex every osfstorage file of ``node`` through the bulk API, without forcing a refresh.
+    Returns the ids of the files that failed to be reindexed.
+    """
+    from addons.osfstorage.models import OsfStorageFile
+    index = index or INDEX
+    node_is_qa = is_qa_node(node)
+
+    def actions():
+        for file_ in paginated(OsfStorageFile, Q(node=node), increment=settings.ELASTIC_BULK_CHUNK_SIZE):
+            # Share the already-loaded node (and its cached parent_node) between files
+            file_.node = node
+            file_doc = serialize_file(file_, node_is_qa=node_is_qa)
+            if file_doc is None:
+                yield {'_op_type': 'delete', '_index': index, '_type': 'file', '_id': file_._id}
+            else:
+                yield {'_op_type': 'index', '_index': index, '_type': 'file', '_id': file_._id, '_source': file_doc}
+
+    return _bulk(actions())
+
 @requires_search
 def update_institution(institution, index=None):
     index = index or INDEX
@@ -639,16 +787,18 @@ def create_index(index=None):
             mapping['properties'].update(fields)
         client().indices.put_mapping(index=index, doc_type=type_, body=mapping, ignore=[400, 404])
 
+def get_delete_doctype_from_node(node):
+    if node.is_registration:
+        return 'registration'
+    elif node.is_preprint:
+        return 'preprint'
+    return node.project_or_component
+
 @requires_search
 def delete_doc(elastic_document_id, node, index=None, category=None):
     index = index or INDEX
     if not category:
-        if node.is_registration:
-            category = 'registration'
-        elif node.is_preprint:
-            category = 'preprint'
-        else:
-            category = node.project_or_component
+        category = get_delete_doctype_from_node(node)
     client().delete(index=index, doc_type=category, id=elastic_document_id, refresh=True, ignore=[404])
 
 
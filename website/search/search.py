@@ -1,6 +1,7 @@
 import logging
 
 from framework.celery_tasks.handlers import enqueue_task
+from osf.models.search_queue import PendingSearchUpdate
 
 from website import settings
 
@@ -28,10 +29,17 @@ def search(query, index=None, doc_type=None, raw=None):
 def update_node(node, index=None, bulk=False, async=True, saved_fields=None):
     kwargs = {
         'index': index,
-        'bulk': bulk
+        'bulk': bulk,
+        'saved_fields': list(saved_fields) if saved_fields is not None else None,
     }
     if async:
         node_id = node._id
+        if settings.USE_CELERY and index is None and not bulk:
+            # Coalesced with any other update of this node until the next flush. The queue
+            # row commits with the request, so the flush always sees the saved node.
+            reindex_files = saved_fields is None or bool(search_engine.FILE_DENORMALIZED_NODE_FIELDS.intersection(saved_fields))
+            PendingSearchUpdate.enqueue(PendingSearchUpdate.NODE, node_id, reindex_files=reindex_files)
+            return
         # We need the transaction to be committed before trying to run celery tasks.
         # For example, when updating a Node's privacy, is_public must be True in the
         # database in order for method that updates the Node's elastic search document
@@ -69,6 +77,9 @@ def update_contributors_async(user_id):
 
 @requires_search
 def update_user(user, index=None, async=True):
+    if async and settings.USE_CELERY and index is None:
+        PendingSearchUpdate.enqueue(PendingSearchUpdate.USER, user._id)
+        return
     index = index or settings.ELASTIC_INDEX
     if async:
         user_id = user.id
@@ -81,6 +92,10 @@ def update_user(user, index=None, async=True):
 
 @requires_search
 def update_file(file_, index=None, delete=False):
+    if settings.USE_CELERY and index is None:
+        # The flush works out from the file's state whether to index or delete it
+        PendingSearchUpdate.enqueue(PendingSearchUpdate.FILE, file_._id)
+        return
     index = index or settings.ELASTIC_INDEX
     search_engine.update_file(file_, index=index, delete=delete)
 
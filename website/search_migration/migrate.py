@@ -4,12 +4,17 @@
 from __future__ import absolute_import
 from math import ceil
 
+import json
 import logging
+import multiprocessing
+import os
+import time
 
-from django.db import connection
+from django.db import connection, connections
 from elasticsearch import helpers
 
 import website.search.search as search
+from website.search import elastic_search
 from website.search.elastic_search import client
 from website.search_migration import (
     JSON_UPDATE_NODES_SQL, JSON_DELETE_NODES_SQL,
@@ -66,67 +71,183 @@ def sql_migrate(index, sql, max_id, increment, es_args=None, **kwargs):
         page_start = page_end
     return total_objs
 
-def migrate_nodes(index, delete, increment=10000):
+def load_checkpoint(path):
+    """Load the reindex state saved at ``path``, or None if there is no checkpoint."""
+    if not path or not os.path.exists(path):
+        return None
+    with open(path) as fp:
+        state = json.load(fp)
+    state['completed'] = {
+        name: set(starts)
+        for name, starts in state.get('completed', {}).items()
+    }
+    return state
+
+def save_checkpoint(path, state):
+    """Atomically write ``state`` to ``path`` so a crash never leaves a partial checkpoint."""
+    if not path:
+        return
+    tmp_path = '{}.tmp'.format(path)
+    with open(tmp_path, 'w') as fp:
+        json.dump({
+            'index': state['index'],
+            'completed': {name: sorted(starts) for name, starts in state['completed'].items()},
+        }, fp)
+    os.rename(tmp_path, path)
+
+def _init_worker():
+    # Connections inherited from the parent process must not be shared across the fork
+    connections.close_all()
+    elastic_search.CLIENT = None
+
+def _migrate_range(args):
+    sql, page_start, page_end, threads, es_args, fmt_kwargs = args
+    with connection.cursor() as cursor:
+        cursor.execute(sql.format(page_start=page_start, page_end=page_end, **fmt_kwargs))
+        ser_objs = cursor.fetchone()[0]
+    if not ser_objs:
+        return page_start, 0, 0
+    failed = 0
+    for ok, _ in helpers.parallel_bulk(client(), ser_objs, thread_count=threads, **es_args):
+        if not ok:
+            failed += 1
+    return page_start, len(ser_objs), failed
+
+def parallel_sql_migrate(name, index, sql, max_id, increment, workers, threads=4,
+                         state=None, checkpoint=None, es_args=None, **kwargs):
+    """ Like `sql_migrate`, but page ranges are serialized by a pool of `workers` processes,
+    each of which sends its documents to elastic with `helpers.parallel_bulk`.
+
+    Completed ranges are recorded in `state` under `name` and written to `checkpoint`, so a
+    rerun with the same `state` skips them.
+
+    :param str name: Key under which completed ranges are checkpointed, e.g. 'nodes'
+    :param int workers: Number of worker processes
+    :param int threads: Number of `parallel_bulk` threads per worker
+    :param dict state: Checkpoint state, as returned by `load_checkpoint`
+    :param str checkpoint: Path to write the checkpoint state to
+
+    :return int: Number of migrated objects
+    """
+    es_args = dict(es_args or {})
+    es_args.setdefault('chunk_size', settings.ELASTIC_BULK_CHUNK_SIZE)
+    if state is None:
+        state = {'index': index, 'completed': {}}
+    completed = state['completed'].setdefault(name, set())
+    fmt_kwargs = dict(kwargs, index=index)
+    # An extra page is included to cover objects created during runtime, see `sql_migrate`
+    ranges = [
+        (sql, page_start, page_start + increment, threads, es_args, fmt_kwargs)
+        for page_start in range(0, max_id + increment + 1, increment)
+        if page_start not in completed
+    ]
+    total_pages = len(ranges) + len(completed)
+    logger.info('Migrating {} pages of {} ({} already completed) with {} workers'.format(
+        len(ranges), name, len(completed), workers))
+
+    total_objs = 0
+    total_failed = 0
+    started = time.time()
+    # Workers must open their own connections rather than inherit ours
+    connections.close_all()
+    pool = multiprocessing.Pool(workers, initializer=_init_worker)
+    try:
+        for page_start, count, failed in pool.imap_unordered(_migrate_range, ranges):
+            completed.add(page_start)
+            save_checkpoint(checkpoint, state)
+            total_objs += count
+            total_failed += failed
+            elapsed = time.time() - started
+            logger.info('{}: {} / {} pages, {} docs ({} failed), {:.1f} docs/sec'.format(
+                name, len(completed), total_pages, total_objs, total_failed, total_objs / max(elapsed, 1e-6)))
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+    return total_objs
+
+def _sql_migrate(name, index, sql, max_id, increment, workers=None, state=None, checkpoint=None, es_args=None, **kwargs):
+    if workers:
+        return parallel_sql_migrate(
+            name, index, sql, max_id, increment, workers,
+            state=state, checkpoint=checkpoint, es_args=es_args, **kwargs)
+    return sql_migrate(index, sql, max_id, increment, es_args=es_args, **kwargs)
+
+def migrate_nodes(index, delete, increment=10000, workers=None, state=None, checkpoint=None):
     logger.info('Migrating nodes to index: {}'.format(index))
     max_nid = AbstractNode.objects.last().id
-    total_nodes = sql_migrate(
+    total_nodes = _sql_migrate(
+        'nodes',
         index,
         JSON_UPDATE_NODES_SQL,
         max_nid,
         increment,
+        workers=workers, state=state, checkpoint=checkpoint,
         spam_flagged_removed_from_search=settings.SPAM_FLAGGED_REMOVE_FROM_SEARCH)
     logger.info('{} nodes migrated'.format(total_nodes))
     if delete:
         logger.info('Preparing to delete old node documents')
         max_nid = AbstractNode.objects.last().id
-        total_nodes = sql_migrate(
+        total_nodes = _sql_migrate(
+            'nodes_delete',
             index,
             JSON_DELETE_NODES_SQL,
             max_nid,
             increment,
+            workers=workers, state=state, checkpoint=checkpoint,
             es_args={'raise_on_error': False},  # ignore 404s
             spam_flagged_removed_from_search=settings.SPAM_FLAGGED_REMOVE_FROM_SEARCH)
         logger.info('{} nodes marked deleted'.format(total_nodes))
 
-def migrate_files(index, delete, increment=10000):
+def migrate_files(index, delete, increment=10000, workers=None, state=None, checkpoint=None):
     logger.info('Migrating files to index: {}'.format(index))
     max_fid = BaseFileNode.objects.last().id
-    total_files = sql_migrate(
+    total_files = _sql_migrate(
+        'files',
         index,
         JSON_UPDATE_FILES_SQL,
         max_fid,
         increment,
+        workers=workers, state=state, checkpoint=checkpoint,
         spam_flagged_removed_from_search=settings.SPAM_FLAGGED_REMOVE_FROM_SEARCH)
     logger.info('{} files migrated'.format(total_files))
     if delete:
         logger.info('Preparing to delete old file documents')
         max_fid = BaseFileNode.objects.last().id
-        total_files = sql_migrate(
+        total_files = _sql_migrate(
+            'files_delete',
             index,
             JSON_DELETE_FILES_SQL,
             max_fid,
             increment,
+            workers=workers, state=state, checkpoint=checkpoint,
             es_args={'raise_on_error': False},  # ignore 404s
             spam_flagged_removed_from_search=settings.SPAM_FLAGGED_REMOVE_FROM_SEARCH)
         logger.info('{} files marked deleted'.format(total_files))
 
-def migrate_users(index, delete, increment=10000):
+def migrate_users(index, delete, increment=10000, workers=None, state=None, checkpoint=None):
     logger.info('Migrating users to index: {}'.format(index))
     max_uid = OSFUser.objects.last().id
-    total_users = sql_migrate(
+    total_users = _sql_migrate(
+        'users',
         index,
         JSON_UPDATE_USERS_SQL,
         max_uid,
-        increment)
+        increment,
+        workers=workers, state=state, checkpoint=checkpoint)
     logger.info('{} users migrated'.format(total_users))
     if delete:
         logger.info('Preparing to delete old user documents')
         max_uid = OSFUser.objects.last().id
-        total_users = sql_migrate(
+        total_users = _sql_migrate(
+            'users_delete',
             index,
             JSON_DELETE_USERS_SQL,
             max_uid,
             increment,
+            workers=workers, state=state, checkpoint=checkpoint,
             es_args={'raise_on_error': False})  # ignore 404s
         logger.info('{} users marked deleted'.format(total_users))
 
@@ -134,13 +255,16 @@ def migrate_institutions(index):
     for inst in Institution.objects.filter(is_deleted=False):
         update_institution(inst, index)
 
-def migrate(delete, remove=False, index=None, app=None):
+def migrate(delete, remove=False, index=None, app=None, workers=None, checkpoint=None):
     """Reindexes relevant documents in ES
 
     :param bool delete: Delete documents that should not be indexed
     :param bool remove: Removes old index after migrating
     :param str index: index alias to version and migrate
     :param App app: Flask app for context
+    :param int workers: Reindex with a pool of this many processes instead of serially
+    :param str checkpoint: Path of a file to record progress in when using `workers`.
+        If it already exists, the interrupted migration it describes is resumed.
     """
     index = index or settings.ELASTIC_INDEX
     app = app or init_app('website.settings', set_backends=True, routes=True)
@@ -152,15 +276,25 @@ def migrate(delete, remove=False, index=None, app=None):
     ctx = app.test_request_context()
     ctx.push()
 
-    new_index = set_up_index(index)
+    state = load_checkpoint(checkpoint) if workers else None
+    if state:
+        new_index = state['index']
+        logger.info('Resuming migration to {} from {}'.format(new_index, checkpoint))
+    else:
+        new_index = set_up_index(index)
+        state = {'index': new_index, 'completed': {}}
+        if workers:
+            save_checkpoint(checkpoint, state)
 
     if settings.ENABLE_INSTITUTIONS:
         migrate_institutions(new_index)
-    migrate_nodes(new_index, delete=delete)
-    migrate_files(new_index, delete=delete)
-    migrate_users(new_index, delete=delete)
+    migrate_nodes(new_index, delete=delete, workers=workers, state=state, checkpoint=checkpoint)
+    migrate_files(new_index, delete=delete, workers=workers, state=state, checkpoint=checkpoint)
+    migrate_users(new_index, delete=delete, workers=workers, state=state, checkpoint=checkpoint)
 
     set_up_alias(index, new_index)
+    if workers and checkpoint:
+        os.remove(checkpoint)
 
     if remove:
         remove_old_index(new_index)
@@ -100,6 +100,13 @@ SEARCH_ENGINE = 'elastic'  # Can be 'elastic', or None
 ELASTIC_URI = 'localhost:9200'
 ELASTIC_TIMEOUT = 10
 ELASTIC_INDEX = 'website'
+# Documents sent per request by bulk indexing operations
+ELASTIC_BULK_CHUNK_SIZE = 500
+# Seconds between flushes of the coalesced search update queue (osf.models.PendingSearchUpdate)
+SEARCH_UPDATE_FLUSH_INTERVAL = 10
+# Queue entries read per flush batch, and batches per flush
+SEARCH_UPDATE_FLUSH_BATCH_SIZE = 1000
+SEARCH_UPDATE_FLUSH_MAX_BATCHES = 50
 ELASTIC_KWARGS = {
     # 'use_ssl': False,
     # 'verify_certs': True,
@@ -108,6 +115,16 @@ ELASTIC_KWARGS = {
     # 'client_key': None
 }
 
+# Name of the Django cache that backs osf.utils.caching.shared_cached_property, e.g. 'default'.
+# Shared property caching is disabled when None.
+CACHED_PROPERTY_BACKEND = None
+# Seconds a shared cached property value is kept
+CACHED_PROPERTY_TIMEOUT = 60 * 60
+# Seconds a GUID resolution is kept in the shared cache; 0 disables caching GUID resolutions
+GUID_CACHE_TIMEOUT = 60 * 60
+# Seconds an unknown GUID is remembered as missing
+GUID_NEGATIVE_CACHE_TIMEOUT = 60
+
 # Sessions
 COOKIE_NAME = 'osf'
 # TODO: Override OSF_COOKIE_DOMAIN in local.py in production
@@ -132,6 +149,11 @@ USE_CDN_FOR_CLIENT_LIBS = True
 USE_EMAIL = True
 FROM_EMAIL = 'openscienceframework-noreply@osf.io'
 
+# Users whose pending notification digests are read, sent and deleted together
+NOTIFICATION_DIGEST_CHUNK_SIZE = 500
+# Threads rendering and sending digest emails within a chunk
+NOTIFICATION_DIGEST_SEND_WORKERS = 4
+
 # support email
 OSF_SUPPORT_EMAIL = 'support@osf.io'
 
@@ -352,6 +374,12 @@ SHARE_URL = None
 SHARE_API_TOKEN = None  # Required to send project updates to SHARE
 
 CAS_SERVER_URL = 'http://localhost:8080'
+# Seconds a CAS profile response for a bearer token is kept in the shared cache, 0 to disable
+CAS_PROFILE_CACHE_TIMEOUT = 30
+# Connections kept open to the CAS server by each process
+CAS_CONNECTION_POOL_SIZE = 10
+# Seconds the user of a session is kept in the shared cache for API session authentication, 0 to disable
+SESSION_USER_CACHE_TIMEOUT = 60
 MFR_SERVER_URL = 'http://localhost:7778'
 
 ###### ARCHIVER ###########
@@ -364,6 +392,12 @@ ARCHIVE_TIMEOUT_TIMEDELTA = timedelta(1)  # 24 hours
 
 ENABLE_ARCHIVER = True
 
+# Number of node file maps the archiver keeps in memory per worker, and for how many seconds
+ARCHIVER_FILE_MAP_CACHE_SIZE = 16
+ARCHIVER_FILE_MAP_CACHE_TIMEOUT = 60 * 10
+# Number of folder listings requested from WaterButler at once when sizing a non-osfstorage addon
+ARCHIVER_STAT_WORKERS = 4
+
 JWT_SECRET = 'changeme'
 JWT_ALGORITHM = 'HS256'
 
@@ -463,6 +497,7 @@ class CeleryConfig:
     imports = (
         'framework.celery_tasks',
         'framework.email.tasks',
+        'api.caching.tasks',
         'website.mailchimp_utils',
         'website.notifications.tasks',
         'website.archiver.tasks',
@@ -597,6 +632,10 @@ class CeleryConfig:
                 'task': 'scripts.generate_prereg_csv',
                 'schedule': crontab(minute=0, hour=10, day_of_week=0),  # Sunday 5:00 a.m.
             },
+            'flush_pending_search_updates': {
+                'task': 'website.search.elastic_search.flush_pending_updates',
+                'schedule': SEARCH_UPDATE_FLUSH_INTERVAL,  # Seconds
+            },
         }
 
         # Tasks that need metrics and release requirements
@@ -650,6 +689,8 @@ WATERBUTLER_JWE_SECRET = 'CirclesAre4Squares'
 WATERBUTLER_JWT_SECRET = 'ILiekTrianglesALot'
 WATERBUTLER_JWT_ALGORITHM = 'HS256'
 WATERBUTLER_JWT_EXPIRATION = 15
+# Seconds a granted WaterButler authorization is kept in the shared cache, 0 to disable
+WATERBUTLER_AUTH_CACHE_TIMEOUT = 30
 
 SENSITIVE_DATA_SALT = 'yusaltydough'
 SENSITIVE_DATA_SECRET = 'TrainglesAre5Squares'
@@ -663,6 +704,9 @@ ENABLE_INSTITUTIONS = True
 ENABLE_VARNISH = False
 ENABLE_ESI = False
 VARNISH_SERVERS = []  # This should be set in local.py or cache invalidation won't work
+# Seconds before a ban request to a Varnish server times out, and surrogate keys per ban request
+VARNISH_BAN_TIMEOUT = 5
+VARNISH_BAN_BATCH_SIZE = 100
 ESI_MEDIA_TYPES = {'application/vnd.api+json', 'application/json'}
 
 # Used for gathering meta information about the current build
@@ -1911,4 +1955,13 @@ CUSTOM_CITATIONS = {
     'bluebook-inline': 'bluebook'
 }
 
+# Parsed citation styles kept in memory by each API process
+CITATION_STYLE_CACHE_SIZE = 64
+# Citation styles parsed when the API starts
+CITATION_STYLES_PRELOAD = ['apa', 'modern-language-association', 'chicago-author-date']
+# Seconds a rendered citation is kept in the shared cache, 0 to disable
+CITATION_CACHE_TIMEOUT = 60 * 60 * 24
+# Maximum number of styles rendered by one request for a node's citations
+MAX_CITATION_STYLES_PER_REQUEST = 20
+
 PREPRINTS_ASSETS = '/static/img/preprints_assets/'
@@ -8,6 +8,7 @@ import requests
 import urllib
 
 from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
 from django.db.models import Count
 from flask import request, send_from_directory, Response, stream_with_context
 
@@ -24,6 +25,8 @@ from website import settings
 from website.institutions.views import serialize_institution
 
 from osf.models import BaseFileNode, Guid, Institution, PreprintService, AbstractNode, Node
+from osf.models.base import get_current_referent_version, get_referent_version, guid_resolution_cache_key
+from osf.utils.caching import get_shared_cache
 from website.settings import EXTERNAL_EMBER_APPS, PROXY_EMBER_APPS, EXTERNAL_EMBER_SERVER_TIMEOUT, INSTITUTION_DISPLAY_NODE_THRESHOLD, DOMAIN
 from website.project.model import has_anonymous_link
 from website.util import permissions
@@ -232,6 +235,71 @@ def resolve_guid_download(guid, suffix=None, provider=None):
     return resolve_guid(guid, suffix='download')
 
 
+def _get_guid_resolution(guid):
+    guid_object = Guid.load(guid)
+    if not guid_object:
+        # GUID not found; note whether the lower-cased GUID exists
+        return {'missing': True, 'lower': guid.lower() != guid and bool(Guid.load(guid.lower()))}
+    resolution = {
+        'content_type_id': guid_object.content_type_id,
+        'object_id': guid_object.object_id,
+        'deep_url': None,
+        'is_preprint': False,
+        'is_quickfile': False,
+    }
+    cache = get_shared_cache()
+    if cache is not None and guid_object.content_type_id:
+        resolution['version'] = get_referent_version(cache, guid_object.content_type_id, guid_object.object_id)
+
+    referent = guid_object.referent
+    # verify that the object implements a GuidStoredObject-like interface. If a model
+    #   was once GuidStoredObject-like but that relationship has changed, it's
+    #   possible to have referents that are instances of classes that don't
+    #   have a deep_url attribute or otherwise don't behave as
+    #   expected.
+    if referent is not None and not hasattr(referent, 'deep_url'):
+        sentry.log_message(
+            'Guid resolved to an object with no deep_url', dict(guid=guid)
+        )
+    elif referent is None:
+        logger.error('Referent of GUID {0} not found'.format(guid))
+    else:
+        resolution['deep_url'] = referent.deep_url
+        resolution['is_preprint'] = isinstance(referent, PreprintService)
+        resolution['is_quickfile'] = isinstance(referent, BaseFileNode) and referent.is_file and referent.node.is_quickfiles
+    return resolution
+
+
+def get_guid_resolution(guid):
+    """Return what `resolve_guid` needs to know about `guid`: its referent's content type,
+    id and deep_url, and whether it is a preprint or a QuickFiles file. Unknown GUIDs
+    resolve to `{'missing': True, 'lower': <whether the lower-cased GUID exists>}`.
+
+    Resolutions are kept in the shared cache, for `settings.GUID_CACHE_TIMEOUT` seconds or
+    until the GUID or its referent is saved or deleted. Unknown GUIDs are kept for
+    `settings.GUID_NEGATIVE_CACHE_TIMEOUT` seconds.
+    """
+    cache = get_shared_cache()
+    if cache is None or not settings.GUID_CACHE_TIMEOUT:
+        return _get_guid_resolution(guid)
+
+    key = guid_resolution_cache_key(guid)
+    resolution = cache.get(key)
+    if resolution is not None:
+        if resolution.get('missing'):
+            return resolution
+        if resolution.get('version') and resolution['version'] == get_current_referent_version(
+                cache, resolution['content_type_id'], resolution['object_id']):
+            return resolution
+
+    resolution = _get_guid_resolution(guid)
+    if resolution.get('missing'):
+        cache.set(key, resolution, settings.GUID_NEGATIVE_CACHE_TIMEOUT)
+    elif resolution.get('version') and resolution['deep_url']:
+        cache.set(key, resolution, settings.GUID_CACHE_TIMEOUT)
+    return resolution
+
+
 def resolve_guid(guid, suffix=None):
     """Load GUID by primary key, look up the corresponding view function in the
     routing table, and return the return value of the view function without
@@ -243,32 +311,26 @@ def resolve_guid(guid, suffix=None):
     """
     try:
         # Look up
-        guid_object = Guid.load(guid)
+        resolution = get_guid_resolution(guid)
     except KeyError as e:
         if e.message == 'osfstorageguidfile':  # Used when an old detached OsfStorageGuidFile object is accessed
             raise HTTPError(http.NOT_FOUND)
         else:
             raise e
-    if guid_object:
-        # verify that the object implements a GuidStoredObject-like interface. If a model
-        #   was once GuidStoredObject-like but that relationship has changed, it's
-        #   possible to have referents that are instances of classes that don't
-        #   have a deep_url attribute or otherwise don't behave as
-        #   expected.
-        if not hasattr(guid_object.referent, 'deep_url'):
-            sentry.log_message(
-                'Guid resolved to an object with no deep_url', dict(guid=guid)
-            )
-            raise HTTPError(http.NOT_FOUND)
-        referent = guid_object.referent
-        if referent is None:
-            logger.error('Referent of GUID {0} not found'.format(guid))
-            raise HTTPError(http.NOT_FOUND)
-        if not referent.deep_url:
+    if not resolution.get('missing'):
+        if not resolution['deep_url']:
             raise HTTPError(http.NOT_FOUND)
 
+        is_download = suffix and suffix.rstrip('/').lower() == 'download'
+        if not (is_download or resolution['is_preprint'] or resolution['is_quickfile']):
+            # Most GUIDs are proxied to their referent's page, which needs no further lookups
+            url = _build_guid_url(urllib.unquote(resolution['deep_url']), suffix)
+            return proxy_url(url)
+
+        referent = ContentType.objects.get_for_id(resolution['content_type_id']).get_object_for_this_type(pk=resolution['object_id'])
+
         # Handle file `/download` shortcut with supported types.
-        if suffix and suffix.rstrip('/').lower() == 'download':
+        if is_download:
             file_referent = None
             if isinstance(referent, PreprintService) and referent.primary_file:
                 if not referent.is_published:
@@ -317,8 +379,7 @@ def resolve_guid(guid, suffix=None):
         return proxy_url(url)
 
     # GUID not found; try lower-cased and redirect if exists
-    guid_object_lower = Guid.load(guid.lower())
-    if guid_object_lower:
+    if resolution['lower']:
         return redirect(
             _build_guid_url(guid.lower(), suffix)
         )